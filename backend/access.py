@@ -0,0 +1,17 @@
+"""
+Role checks for JWT-protected routes, shared by app.py and the blueprints.
+
+Admins and researchers are user ids listed in ADMIN_USER_IDS and
+RESEARCHER_USER_IDS; User.role is self-service and never grants access.
+Call these only inside a ``@jwt_required()`` view.
+"""
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+
+
+def current_user_is_admin():
+    return int(get_jwt_identity()) in current_app.config['ADMIN_USER_IDS']
+
+
+def current_user_is_researcher():
+    return current_user_is_admin() or int(get_jwt_identity()) in current_app.config['RESEARCHER_USER_IDS']
@@ -1,8 +1,10 @@
-from flask import Flask, request, jsonify, send_from_directory
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from flask_cors import CORS
-from flask_mail import Mail, Message
+from flask_mail import Message
 import os
 from datetime import datetime, timedelta
 import bcrypt
@@ -14,14 +16,43 @@ import random
 import string
 import secrets
 from dotenv import load_dotenv
-from flask_migrate import Migrate
 from google.oauth2 import id_token
 from google.auth.transport import requests
-from werkzeug.utils import secure_filename
 from flask import send_from_directory
 from groq import Groq
-import sqlite3
+import threading
+import time
+from functools import wraps
+import mimetypes
+import click
+from werkzeug.middleware.proxy_fix import ProxyFix
+from contextlib import contextmanager
+from werkzeug.security import safe_join
 from twilio.rest import Client
+from extensions import db, jwt, mail, migrate
+from access import current_user_is_admin, current_user_is_researcher
+from models.equality_models import Company, CompanyAlias, Feedback
+from services import post_search
+from services.like_buffer import LikeBuffer
+from services.upserts import insert_ignore, upsert_increment
+from services.image_pipeline import ImagePipeline, InvalidImage, content_digest
+from services.trending import TrendingIndex, to_timestamp
+from services.chat_stream import sse_event
+from services.answer_cache import AnswerCache
+from services import intent_classifier
+from services.scheme_query import SchemeQueryEngine
+from services.scheme_retrieval import SchemeIndex
+from services.chat_context import build_messages, summarize_turns
+from services.llm_gateway import LLMGateway, LLMError, OpenAICompatibleProvider, StubProvider, CircuitBreaker, estimate_tokens
+from services.usage_meter import UsageMeter, seconds_until_utc_midnight, utc_today
+from services.company_sectors import OTHER as OTHER_SECTOR, classify_sector
+from services.company_names import display_name, normalize_company_name
+from services.company_suggest import CompanySuggestIndex
+from services.leaderboard import Leaderboard, METRICS, SORT_FIELDS, prior_means, priors_drifted
+from services.snapshot import Snapshot
+from services.exports import FORMATS as EXPORT_FORMATS, encode_rows
+from services.rating_trends import WINDOWS as TREND_WINDOWS, month_start, monthly_series, window_summaries
+from services.equality_scoring import DEFAULT_WEIGHTS as DEFAULT_EQUALITY_SCORE_WEIGHTS, equality_score, parse_weights
 
 
 # Load environment variables
@@ -35,6 +66,11 @@ app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'jwt-secret-key')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'uploads')
+# Upload offloading: '' (Flask streams the file), 'x-sendfile' (Apache/lighttpd) or 'x-accel' (nginx)
+app.config['UPLOADS_OFFLOAD'] = os.getenv('UPLOADS_OFFLOAD', '').lower()
+app.config['UPLOADS_ACCEL_PREFIX'] = os.getenv('UPLOADS_ACCEL_PREFIX', '/protected-uploads')
+app.config['USE_X_SENDFILE'] = app.config['UPLOADS_OFFLOAD'] == 'x-sendfile'
 
 # Email configuration
 app.config['MAIL_SERVER'] = 'smtp.gmail.com'
@@ -44,8 +80,64 @@ app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
 app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
 
 
-# OpenAI configuration
-openai.api_key = os.getenv('OPENAI_API_KEY')
+# LLM configuration
+# 'openai' or 'fake' (local deterministic stub for development and tests); only picks the default provider list
+app.config['CHATBOT_LLM'] = os.getenv('CHATBOT_LLM', 'openai').lower()
+# Providers tried in order (openai, groq, stub); ones without an API key are skipped
+app.config['LLM_PROVIDERS'] = os.getenv('LLM_PROVIDERS', 'stub' if app.config['CHATBOT_LLM'] == 'fake' else 'openai,groq')
+app.config['LLM_TIMEOUT'] = float(os.getenv('LLM_TIMEOUT', '20'))      # per request, seconds
+app.config['LLM_DEADLINE'] = float(os.getenv('LLM_DEADLINE', '30'))    # per call including failover
+app.config['LLM_MAX_CONCURRENCY'] = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # in-flight requests per provider
+app.config['LLM_HEDGE_MS'] = int(os.getenv('LLM_HEDGE_MS', '0'))       # race the next provider after this long; 0 disables
+# Daily LLM token quotas (prompt + completion, UTC day) for signed-in users and anonymous /ask callers; 0 is unlimited
+app.config['LLM_DAILY_TOKENS_USER'] = int(os.getenv('LLM_DAILY_TOKENS_USER', '50000'))
+app.config['LLM_DAILY_TOKENS_ANON'] = int(os.getenv('LLM_DAILY_TOKENS_ANON', '10000'))
+app.config['LLM_USAGE_FLUSH_INTERVAL'] = float(os.getenv('LLM_USAGE_FLUSH_INTERVAL', '15'))  # seconds
+# Reverse proxies in front of the app (Render has one) whose X-Forwarded-For hop is trusted for the client IP, so
+# anonymous callers each get their own quota instead of sharing the proxy's address; 0 when serving directly
+app.config['TRUSTED_PROXY_HOPS'] = int(os.getenv('TRUSTED_PROXY_HOPS', '1'))
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'],
+                            x_proto=app.config['TRUSTED_PROXY_HOPS'])
+# /ask intent classifier: shipped model, and where LLM fallback decisions are logged for retraining ('' disables)
+app.config['INTENT_MODEL_PATH'] = os.getenv('INTENT_MODEL_PATH', os.path.join(app.root_path, 'data', 'intent_model.json'))
+app.config['INTENT_LOG_PATH'] = os.getenv('INTENT_LOG_PATH', os.path.join(app.instance_path, 'intent_log.jsonl'))
+# Below this confidence the local decision is discarded and Groq classifies the query
+app.config['INTENT_THRESHOLD'] = float(os.getenv('INTENT_THRESHOLD', '0.85'))
+# Retrieved scheme context added to chatbot prompts: token budget and minimum BM25 score for general chat
+app.config['SCHEME_CONTEXT_TOKENS'] = int(os.getenv('SCHEME_CONTEXT_TOKENS', '600'))
+app.config['SCHEME_CONTEXT_MIN_SCORE'] = float(os.getenv('SCHEME_CONTEXT_MIN_SCORE', '1.0'))
+# Chat threads: prompt budget, unsummarized turns kept per thread, summary budget, turns left verbatim after folding
+app.config['CHAT_CONTEXT_TOKENS'] = int(os.getenv('CHAT_CONTEXT_TOKENS', '2000'))
+app.config['CHAT_CONTEXT_TURNS'] = int(os.getenv('CHAT_CONTEXT_TURNS', '12'))
+app.config['CHAT_SUMMARY_TOKENS'] = int(os.getenv('CHAT_SUMMARY_TOKENS', '300'))
+app.config['CHAT_SUMMARY_KEEP'] = int(os.getenv('CHAT_SUMMARY_KEEP', '6'))
+# Equality dashboard snapshot lifetime; rating writes in this process refresh it sooner
+app.config['EQUALITY_DASHBOARD_TTL'] = int(os.getenv('EQUALITY_DASHBOARD_TTL', '60'))
+# Trending posts index: rebuilt from the DB this often, so every worker converges on the others' posts, likes
+# and comments (each worker only records the events it handled itself in between)
+app.config['TRENDING_REFRESH'] = int(os.getenv('TRENDING_REFRESH', '120'))
+# Company autocomplete index: rebuilt in the background this often to pick up other processes' writes
+app.config['COMPANY_SUGGEST_REFRESH'] = int(os.getenv('COMPANY_SUGGEST_REFRESH', '600'))
+# Company leaderboard: prior weight in ratings (must be positive), global-average drift that triggers a
+# full rescore, in-memory reload interval, and rows per ordering served from memory before falling back to SQL
+app.config['LEADERBOARD_PRIOR_WEIGHT'] = float(os.getenv('LEADERBOARD_PRIOR_WEIGHT', '10'))
+app.config['LEADERBOARD_PRIOR_DRIFT'] = float(os.getenv('LEADERBOARD_PRIOR_DRIFT', '0.05'))
+app.config['LEADERBOARD_REFRESH'] = int(os.getenv('LEADERBOARD_REFRESH', '300'))
+app.config['LEADERBOARD_TOP_K'] = int(os.getenv('LEADERBOARD_TOP_K', '100'))
+# Admin endpoints (cache, LLM stats and usage, exports): comma-separated user ids. Not a user-writable field,
+# unlike User.role, which registration and profile updates let users choose
+app.config['ADMIN_USER_IDS'] = frozenset(
+    int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()
+)
+# Research exports: user ids (besides admins) allowed to download ratings, rows per server-side cursor batch
+app.config['RESEARCHER_USER_IDS'] = frozenset(
+    int(user_id) for user_id in os.getenv('RESEARCHER_USER_IDS', '').split(',') if user_id.strip()
+)
+app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+# Company.gender_equality_score job (`flask score-companies`): metric weights and companies updated per chunk
+app.config['EQUALITY_SCORE_WEIGHTS'] = parse_weights(os.getenv('EQUALITY_SCORE_WEIGHTS', DEFAULT_EQUALITY_SCORE_WEIGHTS))
+app.config['EQUALITY_SCORE_BATCH_SIZE'] = int(os.getenv('EQUALITY_SCORE_BATCH_SIZE', '500'))
 
 account_sid = os.getenv("TWILIO_ACCOUNT_SID")
 auth_token = os.getenv("TWILIO_AUTH_TOKEN")
@@ -55,9 +147,9 @@ twilio_client = Client(account_sid, auth_token)
 
 
 # Initialize extensions
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
-mail = Mail(app)
+db.init_app(app)
+jwt.init_app(app)
+mail.init_app(app)
 # Configure CORS - Allow all origins for development
 CORS(app, 
      origins=[
@@ -73,7 +165,7 @@ CORS(app,
      allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Credentials"],
      supports_credentials=True,
      expose_headers=["Content-Type", "Authorization"])
-migrate = Migrate(app, db)
+migrate.init_app(app, db)
 
 
 # Database Models
@@ -82,7 +174,7 @@ class User(db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), default='User')  # User, Volunteer, Mentor
+    role = db.Column(db.String(20), default='User')  # one of SELF_SERVICE_ROLES; grants no privileges
     aadhaar = db.Column(db.String(12), unique=True, nullable=True)
     pan = db.Column(db.String(10), unique=True, nullable=True)
     phone = db.Column(db.String(15), nullable=True)
@@ -115,8 +207,9 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     is_anonymous = db.Column(db.Boolean, default=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     likes = db.relationship('Like', backref='post', lazy='dynamic', cascade='all, delete-orphan')
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # maintained by the like buffer flush
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     image_url = db.Column(db.String(300), nullable=True)
     # Relationships
@@ -124,7 +217,7 @@ class Post(db.Model):
     
     @property
     def likes_count(self):
-        return self.likes.count()
+        return like_buffer.count(self.id, self.like_count)
 
     def to_dict(self, current_user_id=None):
         return {
@@ -137,8 +230,9 @@ class Post(db.Model):
             "created_at": self.created_at.isoformat(),
             "comments_count": self.comments.count(),
             "likes": self.likes_count,
-            "liked_by_me": bool(self.likes.filter_by(user_id=current_user_id).first()) if current_user_id else False,
+            "liked_by_me": is_liked_by(current_user_id, self.id) if current_user_id else False,
             "image_url": self.image_url,
+            "image_variants": image_pipeline.variant_urls(self.image_url),
         "comments": [
             {
                 "id": c.id,
@@ -180,16 +274,101 @@ class Connection(db.Model):
     user = db.relationship('User', foreign_keys=[user_id], backref='outgoing_connections')
     connected_user = db.relationship('User', foreign_keys=[connected_user_id], backref='incoming_connections')
 
+    __table_args__ = (
+        db.Index('ix_connection_user_status', 'user_id', 'status'),
+        db.Index('ix_connection_connected_user_status', 'connected_user_id', 'status'),
+    )
+
+class TimelineEntry(db.Model):
+    """A post fanned out to the "following" timeline of one of its author's accepted connections"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)  # timeline owner
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # (user_id, post_id) doubles as the index serving the timeline range scan
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='uq_timeline_user_post'),
+        db.Index('ix_timeline_entry_post_id', 'post_id'),
+    )
+
+class ChatThread(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    # Rolling summary of every message with id <= summarized_until_id
+    summary = db.Column(db.Text, nullable=True)
+    summarized_until_id = db.Column(db.Integer, nullable=False, default=0)
+    # Id of the newest message; orders the thread list by recent activity
+    last_message_id = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_chat_thread_user_last_message', 'user_id', 'last_message_id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 class ChatMessage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    thread_id = db.Column(db.Integer, db.ForeignKey('chat_thread.id'), nullable=True)
     message = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_chat_message_thread_id_id', 'thread_id', 'id'),
+        db.Index('ix_chat_message_user_id_id', 'user_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'thread_id': self.thread_id,
+            'message': self.message,
+            'response': self.response,
+            'created_at': self.created_at.isoformat()
+        }
+
+class LLMUsage(db.Model):
+    """Daily LLM token totals per subject ('user:<id>' or 'ip:<address>') and endpoint"""
+    __tablename__ = 'llm_usage'
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(64), nullable=False)
+    endpoint = db.Column(db.String(64), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    requests = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('subject', 'endpoint', 'day', name='uq_llm_usage_subject_endpoint_day'),
+        db.Index('ix_llm_usage_day', 'day'),
+    )
+
+    def to_dict(self):
+        return {
+            'endpoint': self.endpoint,
+            'day': self.day.isoformat(),
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'requests': self.requests
+        }
+
 class CompanyRating(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    # Canonical registry name once resolved; company_id is NULL only before `flask merge-company-names`
     company_name = db.Column(db.String(200), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=True)
     safety_rating = db.Column(db.Float, nullable=False)
     pay_equality_rating = db.Column(db.Float, nullable=False)
     culture_rating = db.Column(db.Float, nullable=False)
@@ -198,6 +377,60 @@ class CompanyRating(db.Model):
     is_anonymous = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_company_rating_company_id_user_id', 'company_id', 'user_id'),
+    )
+
+class CompanyStats(db.Model):
+    """Per-company rating count and metric sums, kept in step with CompanyRating by rate_company"""
+    __tablename__ = 'company_stats'
+    company_name = db.Column(db.String(200), primary_key=True)
+    total_ratings = db.Column(db.Integer, nullable=False, default=0)
+    safety_sum = db.Column(db.Float, nullable=False, default=0.0)
+    pay_equality_sum = db.Column(db.Float, nullable=False, default=0.0)
+    culture_sum = db.Column(db.Float, nullable=False, default=0.0)
+    # Classified by rate_company when the row is created (assign_company_sectors backfills); NULL until then
+    sector = db.Column(db.String(100), nullable=True)
+    # Bumped by every add_company_stats; score_companies rescores companies whose Company.scored_revision differs
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    # Bayesian-smoothed averages (services.leaderboard), written by rescore_companies
+    safety_score = db.Column(db.Float, nullable=False, default=0.0)
+    pay_equality_score = db.Column(db.Float, nullable=False, default=0.0)
+    culture_score = db.Column(db.Float, nullable=False, default=0.0)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_company_stats_score', 'score'),
+        db.Index('ix_company_stats_safety_score', 'safety_score'),
+        db.Index('ix_company_stats_pay_equality_score', 'pay_equality_score'),
+        db.Index('ix_company_stats_culture_score', 'culture_score'),
+        db.Index('ix_company_stats_total_ratings', 'total_ratings'),
+    )
+
+    def to_dict(self):
+        total = self.total_ratings
+        return {
+            'name': self.company_name,
+            'total_ratings': total,
+            'avg_safety': round(self.safety_sum / total, 1) if total else 0,
+            'avg_pay_equality': round(self.pay_equality_sum / total, 1) if total else 0,
+            'avg_culture': round(self.culture_sum / total, 1) if total else 0
+        }
+
+class CompanyRatingDaily(db.Model):
+    """CompanyStats per UTC day of CompanyRating.created_at, for the trend views; maintained by add_company_stats"""
+    __tablename__ = 'company_rating_daily'
+    company_name = db.Column(db.String(200), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_ratings = db.Column(db.Integer, nullable=False, default=0)
+    safety_sum = db.Column(db.Float, nullable=False, default=0.0)
+    pay_equality_sum = db.Column(db.Float, nullable=False, default=0.0)
+    culture_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index('ix_company_rating_daily_day', 'day'),
+    )
+
 class EmergencyContact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -321,6 +554,12 @@ class UserBadge(db.Model):
     user = db.relationship('User', backref='badges')
 
 # Helper functions
+SELF_SERVICE_ROLES = ('User', 'Volunteer', 'Mentor')
+
+def self_service_role(requested, current='User'):
+    """The role a user asked for when it is one they may pick themselves, else ``current``"""
+    return requested if requested in SELF_SERVICE_ROLES else current
+
 def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
@@ -331,6 +570,56 @@ def hash_password(password):
 def verify_password(password, hashed):
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def flush_likes(changes):
+    """Persist buffered like toggles in one transaction and recount the touched posts"""
+    with app.app_context():
+        post_ids = {post_id for _, post_id, _ in changes}
+        live_post_ids = {post_id for (post_id,) in db.session.query(Post.id).filter(Post.id.in_(post_ids))}
+        likes = [{'user_id': user_id, 'post_id': post_id}
+                 for user_id, post_id, liked in changes if liked and post_id in live_post_ids]
+        unlikes = [(user_id, post_id) for user_id, post_id, liked in changes if not liked]
+
+        like_table = Like.__table__
+        if likes:
+            db.session.execute(insert_ignore(db.session.connection(), like_table, ['user_id', 'post_id']), likes)
+        if unlikes:
+            db.session.execute(like_table.delete().where(
+                db.tuple_(like_table.c.user_id, like_table.c.post_id).in_(unlikes)
+            ))
+        if live_post_ids:
+            post_table = Post.__table__
+            db.session.execute(post_table.update().where(post_table.c.id.in_(live_post_ids)).values(
+                like_count=db.select(db.func.count(like_table.c.id))
+                .where(like_table.c.post_id == post_table.c.id)
+                .scalar_subquery()
+            ))
+        db.session.commit()
+
+like_buffer = LikeBuffer(flush_likes, interval=int(os.getenv('LIKE_FLUSH_INTERVAL_MS', '250')) / 1000)
+
+def has_persisted_like(user_id, post_id):
+    return db.session.query(Like.id).filter_by(user_id=user_id, post_id=post_id).first() is not None
+
+def is_liked_by(user_id, post_id):
+    return like_buffer.is_liked(user_id, post_id, lambda: has_persisted_like(user_id, post_id))
+
+def liked_post_ids(user_id, post_ids):
+    """Post ids among ``post_ids`` liked by ``user_id``: one query plus the buffered taps"""
+    post_ids = list(post_ids)
+    if not user_id or not post_ids:
+        return set()
+    liked = {post_id for (post_id,) in db.session.query(Like.post_id).filter(
+        Like.user_id == user_id, Like.post_id.in_(post_ids)
+    )}
+    for post_id, state in like_buffer.buffered_likes(user_id, post_ids).items():
+        if state:
+            liked.add(post_id)
+        else:
+            liked.discard(post_id)
+    return liked
+
+image_pipeline = ImagePipeline(app.config['UPLOAD_FOLDER'], max_workers=int(os.getenv('IMAGE_WORKERS', '2')))
+
 def send_otp_email(email, otp):
     try:
         msg = Message('OTP Verification - Women Safety App',
@@ -368,39 +657,316 @@ def send_password_reset_email(email: str, token: str) -> bool:
         print(f"Password reset email error: {e}")
         return False
 
-def get_ai_response(message):
+@contextmanager
+def timed_stage(name):
+    """Add the wall time of the block to this request's Server-Timing header (nested repeats count once)"""
+    if not has_request_context():
+        yield
+        return
+    active = g.setdefault('active_stages', set())
+    if name in active:
+        yield
+        return
+    active.add(name)
+    started = time.perf_counter()
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant specializing in women's rights, legal advice, and safety information. Provide accurate, helpful, and supportive responses."},
-                {"role": "user", "content": message}
-            ],
-            max_tokens=500  
+        yield
+    finally:
+        active.discard(name)
+        timings = g.setdefault('stage_timings', {})
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+@app.after_request
+def add_server_timing(response):
+    timings = g.get('stage_timings')
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(f"{name};dur={ms:.2f}" for name, ms in timings.items())
+    return response
+
+
+def build_llm_gateway():
+    """Providers from LLM_PROVIDERS, each with a long-lived client, timeout, concurrency cap and breaker"""
+    def options():
+        return dict(
+            timeout=app.config['LLM_TIMEOUT'],
+            max_concurrency=app.config['LLM_MAX_CONCURRENCY'],
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('LLM_BREAKER_FAILURES', '5')),
+                reset_timeout=float(os.getenv('LLM_BREAKER_RESET', '30'))
+            )
+        )
+
+    providers = []
+    for name in [name.strip().lower() for name in app.config['LLM_PROVIDERS'].split(',') if name.strip()]:
+        if name == 'openai' and os.getenv('OPENAI_API_KEY'):
+            providers.append(OpenAICompatibleProvider(
+                'openai',
+                lambda: openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'), max_retries=0),
+                os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo'),
+                **options()
+            ))
+        elif name == 'groq' and os.getenv('GROQ_API_KEY'):
+            providers.append(OpenAICompatibleProvider(
+                'groq',
+                lambda: Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0),
+                os.getenv('GROQ_MODEL', 'llama-3.1-8b-instant'),
+                **options()
+            ))
+        elif name == 'stub':
+            providers.append(StubProvider(
+                latency=int(os.getenv('LLM_STUB_LATENCY_MS', '50')) / 1000,
+                failure_rate=float(os.getenv('LLM_STUB_FAILURE_RATE', '0')),
+                **options()
+            ))
+        else:
+            print(f"⚠ LLM provider '{name}' skipped (unknown or missing API key)")
+    hedge_ms = app.config['LLM_HEDGE_MS']
+    return LLMGateway(
+        providers,
+        deadline=app.config['LLM_DEADLINE'],
+        hedge_after=hedge_ms / 1000 if hedge_ms else None
+    )
+
+llm = build_llm_gateway()
+
+LLM_UNAVAILABLE_MESSAGE = "I'm sorry, I'm having trouble processing your request. Please try again later."
+
+
+def flush_llm_usage(rows):
+    """Add buffered token counts to the daily llm_usage rows (one statement per flush)"""
+    with app.app_context():
+        db.session.execute(
+            upsert_increment(db.session.connection(), LLMUsage.__table__, ['subject', 'endpoint', 'day'],
+                             ['prompt_tokens', 'completion_tokens', 'requests']),
+            rows
         )
-        return response.choices[0].message.content
+        db.session.commit()
+
+def load_llm_usage(subject, day):
+    with app.app_context():
+        return db.session.query(
+            db.func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens)
+        ).filter_by(subject=subject, day=day).scalar() or 0
+
+usage_meter = UsageMeter(flush_llm_usage, load_llm_usage, interval=app.config['LLM_USAGE_FLUSH_INTERVAL'])
+
+
+def llm_usage_subject():
+    user_id = get_jwt_identity()
+    return f"user:{user_id}" if user_id else f"ip:{request.remote_addr}"
+
+def llm_daily_quota(subject):
+    return app.config['LLM_DAILY_TOKENS_USER' if subject.startswith('user:') else 'LLM_DAILY_TOKENS_ANON']
+
+def enforce_llm_quota(view):
+    """Reject the request with 429 once the caller's daily token quota is spent, before any LLM call"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        subject = llm_usage_subject()
+        quota = llm_daily_quota(subject)
+        if quota and usage_meter.used_today(subject) >= quota:
+            response = jsonify({'error': 'Daily AI usage limit reached. Please try again tomorrow.', 'quota': quota})
+            response.headers['Retry-After'] = str(seconds_until_utc_midnight())
+            return response, 429
+        g.llm_usage_subject = subject
+        return view(*args, **kwargs)
+    return wrapper
+
+def record_llm_usage(prompt_tokens, completion_tokens, subject=None, endpoint=None):
+    subject = subject or (g.get('llm_usage_subject') if has_request_context() else None)
+    if subject:
+        usage_meter.record(subject, endpoint or request.endpoint, prompt_tokens, completion_tokens)
+
+def llm_complete(messages, **options):
+    """llm.complete, with the tokens charged to the current caller"""
+    completion = llm.complete(messages, **options)
+    record_llm_usage(completion.prompt_tokens, completion.completion_tokens)
+    return completion
+
+def llm_stream(messages, **options):
+    """llm.stream, charging the caller estimated tokens for whatever was streamed (also on disconnect)"""
+    subject = g.get('llm_usage_subject') if has_request_context() else None
+    endpoint = request.endpoint if has_request_context() else None
+    stream = llm.stream(messages, **options)
+    tokens = []
+    try:
+        for token in stream:
+            tokens.append(token)
+            yield token
+    finally:
+        stream.close()
+        if tokens:
+            record_llm_usage(sum(estimate_tokens(m['content']) for m in messages), estimate_tokens(''.join(tokens)),
+                             subject=subject, endpoint=endpoint)
+
+
+SCHEME_FIELDS = ('id', 'name', 'description', 'eligibility', 'application_process', 'contact_info', 'location', 'category')
+
+scheme_queries = SchemeQueryEngine(
+    GovernmentScheme.__table__,
+    ttl_seconds=int(os.getenv('SCHEME_QUERY_CACHE_TTL', '300'))
+)
+scheme_index = SchemeIndex()
+
+
+def scheme_fields(scheme):
+    return {field: getattr(scheme, field) for field in SCHEME_FIELDS}
+
+
+def ensure_scheme_index():
+    """Build the scheme retrieval index on first use; later changes are applied as they commit"""
+    if not scheme_index.loaded:
+        scheme_index.load(scheme_fields(scheme) for scheme in GovernmentScheme.query.yield_per(1000))
+
+
+@event.listens_for(Session, 'after_flush')
+def track_scheme_changes(session, flush_context):
+    changes = None
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, GovernmentScheme):
+            changes = session.info.setdefault('scheme_changes', {})
+            changes[obj.id] = scheme_fields(obj)
+    for obj in session.deleted:
+        if isinstance(obj, GovernmentScheme):
+            changes = session.info.setdefault('scheme_changes', {})
+            changes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_scheme_changes(session):
+    changes = session.info.pop('scheme_changes', None)
+    if not changes:
+        return
+    scheme_queries.invalidate()
+    if not scheme_index.loaded:
+        return
+    for scheme_id, fields in changes.items():
+        if fields is None:
+            scheme_index.remove(scheme_id)
+        else:
+            scheme_index.upsert(fields)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_scheme_changes(session):
+    session.info.pop('scheme_changes', None)
+
+
+def scheme_context(query, min_score=None, extra=()):
+    """Token-budgeted text of the schemes relevant to a question ('' when none are)"""
+    try:
+        with timed_stage('retrieval'):
+            ensure_scheme_index()
+            context, _ = scheme_index.context(
+                query,
+                max_tokens=app.config['SCHEME_CONTEXT_TOKENS'],
+                min_score=app.config['SCHEME_CONTEXT_MIN_SCORE'] if min_score is None else min_score,
+                extra=extra
+            )
+        return context
     except Exception as e:
-        return f"I'm sorry, I'm having trouble processing your request. Please try again later. Error: {str(e)}"
+        print(f"Scheme retrieval error: {e}")
+        return ''
 
 
+def chatbot_messages(message, history=None):
+    """System prompt, retrieved scheme context (if any), thread history within budget and the user's message"""
+    system_messages = [CHATBOT_SYSTEM_PROMPT]
+    context = scheme_context(message)
+    if context:
+        system_messages.append(
+            "Government schemes from our database that may be relevant. Prefer these over memory and do not invent schemes:\n" + context
+        )
+    summary, turns = history or (None, [])
+    messages, _ = build_messages(system_messages, summary, turns, message, max_tokens=app.config['CHAT_CONTEXT_TOKENS'])
+    return messages
 
 
-# Groq Client
-try:
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-except Exception as e:
-    print("⚠ Groq client failed to initialize:", e)
-    client = None
+CHATBOT_SYSTEM_PROMPT = "You are a helpful AI assistant specializing in women's rights, legal advice, and safety information. Provide accurate, helpful, and supportive responses."
 
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv('CHATBOT_CACHE_SIZE', '1000')),
+    ttl_seconds=int(os.getenv('CHATBOT_CACHE_TTL', str(24 * 3600))),
+    use_lemmas=os.getenv('CHATBOT_CACHE_LEMMAS', 'true').lower() == 'true'
+)
 
-def ask_database_or_chat(query):
-    """
-    Smart handler: decides if query needs DB or normal chat
-    """
-    # Step 1: Check intent using Groq
-    intent_resp = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[
+def get_ai_response(message, history=None):
+    # Follow-ups depend on the conversation, so only context-free questions use the cache
+    cacheable = not history or not (history[0] or history[1])
+    cached = answer_cache.get('chatbot', message) if cacheable else None
+    if cached is not None:
+        return cached
+    try:
+        messages = chatbot_messages(message, history)
+        with timed_stage('generation'):
+            answer = llm_complete(messages, max_tokens=500).text
+        if cacheable:
+            answer_cache.set('chatbot', message, answer)
+        return answer
+    except LLMError as e:
+        print(f"Chatbot LLM error: {e}")
+        return LLM_UNAVAILABLE_MESSAGE
+
+def stream_ai_response(message, history=None):
+    """Generator of response tokens for the chatbot; closing it cancels the upstream request"""
+    return llm_stream(chatbot_messages(message, history), max_tokens=500)
+
+
+def chat_thread_for(user_id, thread_id, first_message):
+    """The user's thread ``thread_id``, a new thread titled after the message when None, or None if not theirs"""
+    if thread_id is None:
+        thread = ChatThread(user_id=user_id, title=' '.join(first_message.split())[:80] or 'New chat')
+        db.session.add(thread)
+        db.session.commit()
+        return thread
+    thread = db.session.get(ChatThread, thread_id)
+    return thread if thread and thread.user_id == user_id else None
+
+
+def unsummarized_messages(thread):
+    """Messages not yet folded into the summary, oldest first (bounded by the rolling summary)"""
+    return ChatMessage.query.filter(
+        ChatMessage.thread_id == thread.id,
+        ChatMessage.id > thread.summarized_until_id
+    ).order_by(ChatMessage.id.desc()).limit(app.config['CHAT_CONTEXT_TURNS'] * 4).all()[::-1]
+
+
+def thread_history(thread):
+    """(summary, [(message, response)]) to build the next prompt from"""
+    recent = unsummarized_messages(thread)[-app.config['CHAT_CONTEXT_TURNS']:]
+    return thread.summary, [(m.message, m.response) for m in recent]
+
+
+def save_chat_turn(user_id, thread, message, response):
+    """Persist a turn and fold older turns into the thread summary once too many are pending"""
+    with timed_stage('db_write'):
+        chat_message = ChatMessage(user_id=user_id, thread_id=thread.id, message=message, response=response)
+        db.session.add(chat_message)
+        db.session.flush()
+        thread.last_message_id = chat_message.id
+        thread.updated_at = datetime.utcnow()
+
+        pending = unsummarized_messages(thread)
+        if len(pending) > app.config['CHAT_CONTEXT_TURNS']:
+            folded = pending[:-app.config['CHAT_SUMMARY_KEEP']] if app.config['CHAT_SUMMARY_KEEP'] else pending
+            thread.summary = summarize_turns(
+                thread.summary, [(m.message, m.response) for m in folded], app.config['CHAT_SUMMARY_TOKENS']
+            )
+            thread.summarized_until_id = folded[-1].id
+        db.session.commit()
+    return chat_message
+
+
+local_intent = intent_classifier.IntentClassifier.load(
+    app.config['INTENT_MODEL_PATH'], threshold=app.config['INTENT_THRESHOLD']
+)
+intent_log = intent_classifier.DecisionLog(app.config['INTENT_LOG_PATH'])
+
+
+def classify_intent_with_llm(query):
+    """Fallback intent classification for queries the local model is unsure about"""
+    completion = llm_complete(
+        [
             {
                 "role": "system",
                 "content": (
@@ -410,62 +976,71 @@ def ask_database_or_chat(query):
                 )
             },
             {"role": "user", "content": query}
-        ]
+        ],
+        max_tokens=10,
+        prefer='groq'
     )
-    intent = intent_resp.choices[0].message.content.strip().lower()
-    print("Intent Detected:", intent)
-
-    # Step 2: If casual conversation → respond like chatbot
-    if "casual_chat" in intent:
-        chat_resp = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a friendly chatbot that helps users with information about women empowerment and schemes."
-                },
-                {"role": "user", "content": query}
-            ]
-        )
-        return chat_resp.choices[0].message.content
+    intent = completion.text.strip().lower()
+    return intent_classifier.CASUAL_CHAT if intent_classifier.CASUAL_CHAT in intent else intent_classifier.DB_QUERY
+
+
+def ask_database_or_chat(query):
+    """
+    Smart handler: decides if query needs DB or normal chat
+    """
+    cached = answer_cache.get('ask', query)
+    if cached is not None:
+        return cached
+
+    # Step 1: Check intent locally; only ask the LLM when the classifier is unsure
+    with timed_stage('intent'):
+        prediction = local_intent.predict(query)
+        if prediction.intent is not None:
+            intent = prediction.intent
+        else:
+            try:
+                intent = classify_intent_with_llm(query)
+                intent_log.record(query, intent, round(prediction.confidence, 4))
+            except LLMError as e:
+                print(f"Intent LLM error: {e}")
+                intent = intent_classifier.DB_QUERY
+    print(f"Intent Detected: {intent} ({prediction.source if prediction.intent else 'llm'})")
 
-    # Step 3: If DB query → generate SQL + explain
-    conn = sqlite3.connect("app.db")
-    cur = conn.cursor()
     try:
-        # Generate SQL
-        sql_resp = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
+        # Step 2: If casual conversation → respond like chatbot
+        if intent == intent_classifier.CASUAL_CHAT:
+            messages = [
                 {
                     "role": "system",
-                    "content": "Convert natural language questions into valid SQLite SQL queries for the 'women_schemes' table. Only return SQL."
+                    "content": "You are a friendly chatbot that helps users with information about women empowerment and schemes."
                 },
                 {"role": "user", "content": query}
             ]
-        )
-        sql_query = (sql_resp.choices[0].message.content or '').strip()
-        print("Generated SQL:", sql_query)
-
-        cur.execute(sql_query)
-        result = cur.fetchall()
-
-        # Explain result
-        explain_resp = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "Explain SQL results in a clear way for the user."},
-                {"role": "user", "content": f"SQL Query: {sql_query}\nResult: {result}"}
+        else:
+            # Step 3: If DB query → filtered lookup + retrieved schemes, answered in one call
+            with timed_stage('retrieval'):
+                scheme_query = scheme_queries.parse(db.session, query)
+                filtered = scheme_queries.search(db.session, scheme_query) if scheme_query.category or scheme_query.location else []
+                print("Scheme query:", scheme_query)
+                context = scheme_context(query, extra=filtered)
+            if not context:
+                return "I couldn't find any matching schemes. Try asking about a category (e.g. education, financial) or a state."
+            messages = [
+                {"role": "system", "content": "Answer the user's question using only the schemes listed. Be clear and concise."},
+                {"role": "user", "content": f"Question: {query}\n\nSchemes:\n{context}"}
             ]
-        )
-        return explain_resp.choices[0].message.content
 
+        with timed_stage('generation'):
+            answer = llm_complete(messages, max_tokens=500, prefer='groq').text
+        answer_cache.set('ask', query, answer)
+        return answer
+
+    except LLMError as e:
+        print(f"/ask LLM error: {e}")
+        return LLM_UNAVAILABLE_MESSAGE
     except Exception as e:
         return f"⚠ Error: {e}"
 
-    finally:
-        conn.close()
-
 
 
 
@@ -662,6 +1237,8 @@ def live_sos_location(user_id):
 
 
 @app.route("/ask", methods=["POST"])
+@jwt_required(optional=True)
+@enforce_llm_quota
 def ask():
     data = request.get_json()
     user_query = data.get("question", "")
@@ -703,7 +1280,7 @@ def register():
             if password:
                 existing.password_hash = hash_password(password)
             if 'role' in data:
-                existing.role = data.get('role', existing.role)
+                existing.role = self_service_role(data.get('role'), existing.role)
             if 'phone' in data:
                 existing.phone = data.get('phone', existing.phone)
             if 'location' in data:
@@ -727,7 +1304,7 @@ def register():
         username=username,
         email=email,
         password_hash=hash_password(password),
-        role=data.get('role', 'User'),
+        role=self_service_role(data.get('role')),
         aadhaar=(data.get('aadhaar') or None),
         pan=(data.get('pan') or None),
         phone=(data.get('phone') or None),
@@ -1094,6 +1671,175 @@ def reset_password(token):
     return jsonify({'message': 'Password reset successful'}), 200
 
 # Posts routes
+def init_search_index():
+    """Create/backfill the post full-text index (FTS5 on SQLite, tsvector on Postgres)"""
+    with db.engine.begin() as connection:
+        post_search.create_search_index(connection)
+
+trending_index = TrendingIndex(
+    half_life_hours=float(os.getenv('TRENDING_HALF_LIFE_HOURS', '12')),
+    horizon_hours=float(os.getenv('TRENDING_HORIZON_HOURS', '72')),
+    top_k=int(os.getenv('TRENDING_TOP_K', '100'))
+)
+trending_load_lock = threading.Lock()
+trending_state = {'loaded_at': 0.0, 'refreshing': False}
+
+def trending_events():
+    """Index events for posts in the horizon: their creation, like counts and comments"""
+    cutoff = datetime.utcnow() - timedelta(seconds=trending_index.horizon)
+    posts = db.session.query(Post.id, Post.category, Post.created_at, Post.like_count).filter(
+        Post.created_at >= cutoff
+    ).all()
+    comments = db.session.query(Comment.post_id, Comment.created_at).filter(Comment.created_at >= cutoff).all()
+
+    meta = {post_id: (category, to_timestamp(created_at)) for post_id, category, created_at, _ in posts}
+    events = []
+    for post_id, (category, created_ts) in meta.items():
+        events.append((post_id, category, created_ts, trending_index.post_weight, created_ts))
+    # Likes carry no timestamp; they are credited at the post's creation time
+    for post_id, _, _, like_count in posts:
+        if like_count:
+            category, created_ts = meta[post_id]
+            events.append((post_id, category, created_ts, trending_index.like_weight * like_count, created_ts))
+    for post_id, created_at in comments:
+        if post_id in meta:
+            category, created_ts = meta[post_id]
+            events.append((post_id, category, created_ts, trending_index.comment_weight, to_timestamp(created_at)))
+    return events
+
+def refresh_trending_index():
+    try:
+        with app.app_context():
+            events = trending_events()
+        trending_index.load(events)
+        trending_state['loaded_at'] = time.monotonic()
+    except Exception as e:
+        print(f"Trending refresh error: {e}")
+    finally:
+        trending_state['refreshing'] = False
+
+def ensure_trending_loaded():
+    """
+    Build the trending index from the DB on first use, then rebuild it in the background every
+    TRENDING_REFRESH seconds. Events are recorded only in the worker that handled them, so between
+    rebuilds a worker misses the others' activity, and an unlike handled by another worker than its
+    like takes back the creation-time credit instead of what the like added; each rebuild evens this out.
+    """
+    if not trending_index.loaded:
+        with trending_load_lock:
+            if not trending_index.loaded:
+                trending_index.load(trending_events())
+                trending_state['loaded_at'] = time.monotonic()
+    elif (time.monotonic() - trending_state['loaded_at'] > app.config['TRENDING_REFRESH']
+          and not trending_state['refreshing']):
+        trending_state['refreshing'] = True
+        threading.Thread(target=refresh_trending_index, name='trending-refresh', daemon=True).start()
+
+# "Following" timeline: fan-out-on-write, except for authors above the fan-out cap, whose posts are pulled at read time
+TIMELINE_FANOUT_LIMIT = int(os.getenv('TIMELINE_FANOUT_LIMIT', '1000'))
+HIGH_DEGREE_CACHE_SECONDS = 300
+high_degree_cache = {'ids': set(), 'expires': 0.0}
+
+def accepted_connection_selects(user_id):
+    """Two selects of the other side of user_id's accepted connections (connections are mutual once accepted)"""
+    return (
+        db.select(Connection.connected_user_id).where(Connection.user_id == user_id, Connection.status == 'accepted'),
+        db.select(Connection.user_id).where(Connection.connected_user_id == user_id, Connection.status == 'accepted'),
+    )
+
+def high_degree_author_ids():
+    """Users with more accepted connections than the fan-out cap (refreshed every few minutes)"""
+    now = time.time()
+    if now < high_degree_cache['expires']:
+        return high_degree_cache['ids']
+    sides = db.union_all(
+        db.select(Connection.user_id.label('member_id')).where(Connection.status == 'accepted'),
+        db.select(Connection.connected_user_id.label('member_id')).where(Connection.status == 'accepted'),
+    ).subquery()
+    ids = {member_id for (member_id,) in db.session.execute(
+        db.select(sides.c.member_id).group_by(sides.c.member_id).having(db.func.count() > TIMELINE_FANOUT_LIMIT)
+    )}
+    high_degree_cache.update(ids=ids, expires=now + HIGH_DEGREE_CACHE_SECONDS)
+    return ids
+
+def fan_out_post(post):
+    """Write timeline entries for a new post; runs in the caller's transaction"""
+    if post.is_anonymous:
+        # Fanning out would reveal the author to their connections
+        return
+    table = TimelineEntry.__table__
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    db.session.execute(insert_ignore(connection, table, ['user_id', 'post_id']).values(
+        user_id=post.user_id, post_id=post.id, author_id=post.user_id, created_at=now
+    ))
+
+    degree = sum(
+        db.session.execute(db.select(db.func.count()).select_from(side.subquery())).scalar()
+        for side in accepted_connection_selects(post.user_id)
+    )
+    if degree > TIMELINE_FANOUT_LIMIT:
+        high_degree_author_ids().add(post.user_id)
+        return
+
+    for side in accepted_connection_selects(post.user_id):
+        member_id = side.selected_columns[0]
+        db.session.execute(insert_ignore(connection, table, ['user_id', 'post_id']).from_select(
+            ['user_id', 'post_id', 'author_id', 'created_at'],
+            side.with_only_columns(member_id, db.literal(post.id), db.literal(post.user_id), db.literal(now))
+        ))
+
+def timeline_post_ids(user_id, before_id=None, limit=20):
+    """Newest-first post ids for user_id's timeline: one range scan plus a pull for high-degree connections"""
+    query = db.session.query(TimelineEntry.post_id).filter(TimelineEntry.user_id == user_id)
+    if before_id:
+        query = query.filter(TimelineEntry.post_id < before_id)
+    post_ids = {post_id for (post_id,) in query.order_by(TimelineEntry.post_id.desc()).limit(limit)}
+
+    pull_candidates = high_degree_author_ids() - {user_id}
+    if pull_candidates:
+        followed = set()
+        for side in accepted_connection_selects(user_id):
+            member_id = side.selected_columns[0]
+            followed.update(author_id for (author_id,) in db.session.execute(
+                side.where(member_id.in_(pull_candidates))
+            ))
+        if followed:
+            pulled = db.session.query(Post.id).filter(Post.user_id.in_(followed), Post.is_anonymous == False)
+            if before_id:
+                pulled = pulled.filter(Post.id < before_id)
+            post_ids.update(post_id for (post_id,) in pulled.order_by(Post.id.desc()).limit(limit))
+
+    return sorted(post_ids, reverse=True)[:limit]
+
+def serialize_post_summary(post, current_user_id, liked_ids=None):
+    """Feed representation of a post, shared by the list, search and ranking endpoints"""
+    if liked_ids is None:
+        liked_ids = liked_post_ids(current_user_id, [post.id])
+    return {
+        'id': post.id,
+        'title': post.title,
+        'content': post.content,
+        'category': post.category,
+        'is_anonymous': post.is_anonymous,
+        'author': 'Anonymous' if post.is_anonymous else post.author.username,
+        'likes': post.likes_count,
+        'liked_by_me': post.id in liked_ids,
+        'image_url': post.image_url,
+        'image_variants': image_pipeline.variant_urls(post.image_url),
+        'created_at': post.created_at.isoformat(),
+        'comments_count': len(post.comments),
+        'latest_comments': [
+            {
+                "id": c.id,
+                "content": c.content,
+                "author": c.author.username if c.author else "Anonymous",
+                "created_at": c.created_at.isoformat()
+            }
+            for c in sorted(list(post.comments), key=lambda x: x.created_at, reverse=True)[:3]
+        ]
+    }
+
 @app.route('/api/posts', methods=['GET'])
 @jwt_required()
 def get_posts():
@@ -1110,34 +1856,76 @@ def get_posts():
         page=page, per_page=per_page, error_out=False
     )
 
+    liked_ids = liked_post_ids(current_user_id, [post.id for post in posts.items])
     return jsonify({
-        'posts': [{
-            'id': post.id,
-            'title': post.title,
-            'content': post.content,
-            'category': post.category,
-            'is_anonymous': post.is_anonymous,
-            'author': 'Anonymous' if post.is_anonymous else post.author.username,
-            'likes': post.likes.count(),
-            'liked_by_me': bool(post.likes.filter_by(user_id=current_user_id).first()),
-            'image_url': post.image_url,
-            'created_at': post.created_at.isoformat(),
-            'comments_count': len(post.comments),
-            'latest_comments': [
-                {
-                    "id": c.id,
-                    "content": c.content,
-                    "author": c.author.username if c.author else "Anonymous",
-                    "created_at": c.created_at.isoformat()
-                }
-                for c in sorted(list(post.comments), key=lambda x: x.created_at, reverse=True)[:3]
-            ]
-        } for post in posts.items],
+        'posts': [serialize_post_summary(post, current_user_id, liked_ids) for post in posts.items],
         'total': posts.total,
         'pages': posts.pages,
         'current_page': page
     }), 200
 
+@app.route('/api/posts/search', methods=['GET'])
+@jwt_required()
+def search_posts():
+    current_user_id = get_jwt_identity()
+    query = request.args.get('q', '').strip()
+    categories = request.args.getlist('category')
+    cursor = request.args.get('cursor')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+
+    try:
+        results, next_cursor = post_search.search_posts(
+            db.session.connection(), query, categories=categories, cursor=cursor, limit=limit
+        )
+    except post_search.InvalidSearchQuery as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Keep relevance order when loading the matched posts
+    posts_by_id = {post.id: post for post in Post.query.filter(Post.id.in_([post_id for post_id, _ in results]))}
+    liked_ids = liked_post_ids(current_user_id, posts_by_id)
+    return jsonify({
+        'posts': [
+            dict(serialize_post_summary(posts_by_id[post_id], current_user_id, liked_ids), score=rank)
+            for post_id, rank in results if post_id in posts_by_id
+        ],
+        'next_cursor': next_cursor
+    }), 200
+
+@app.route('/api/posts/trending', methods=['GET'])
+@jwt_required()
+def get_trending_posts():
+    current_user_id = get_jwt_identity()
+    category = request.args.get('category')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), trending_index.top_k)
+
+    ensure_trending_loaded()
+    ranked = trending_index.top(category, limit)
+
+    posts_by_id = {post.id: post for post in Post.query.filter(Post.id.in_([post_id for post_id, _ in ranked]))}
+    liked_ids = liked_post_ids(current_user_id, posts_by_id)
+    return jsonify({
+        'posts': [
+            dict(serialize_post_summary(posts_by_id[post_id], current_user_id, liked_ids), trending_score=round(score, 4))
+            for post_id, score in ranked if post_id in posts_by_id
+        ]
+    }), 200
+
+@app.route('/api/posts/timeline', methods=['GET'])
+@jwt_required()
+def get_timeline():
+    current_user_id = get_jwt_identity()
+    before_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+
+    post_ids = timeline_post_ids(current_user_id, before_id, limit)
+    posts_by_id = {post.id: post for post in Post.query.filter(Post.id.in_(post_ids))}
+    liked_ids = liked_post_ids(current_user_id, posts_by_id)
+    return jsonify({
+        'posts': [serialize_post_summary(posts_by_id[post_id], current_user_id, liked_ids)
+                  for post_id in post_ids if post_id in posts_by_id],
+        'next_cursor': str(post_ids[-1]) if len(post_ids) == limit else None
+    }), 200
+
 @app.route('/api/posts/<int:post_id>/comments', methods=['POST'])
 @jwt_required()
 def add_comment(post_id):
@@ -1149,9 +1937,14 @@ def add_comment(post_id):
         post_id=post_id,
         user_id=current_user_id
     )
+    # Load before committing so the startup rebuild doesn't already include this comment
+    ensure_trending_loaded()
     db.session.add(comment)
     db.session.commit()
 
+    if comment.post:
+        trending_index.record_comment(post_id, comment.post.category, comment.post.created_at, comment.created_at)
+
     return jsonify({
         "id": comment.id,
         "content": comment.content,
@@ -1187,15 +1980,11 @@ def like_post(post_id):
     user_id = get_jwt_identity()
     post = Post.query.get_or_404(post_id)
 
-    existing = Like.query.filter_by(user_id=user_id, post_id=post_id).first()
-    if existing:
-        db.session.delete(existing)  # UNLIKE
-        db.session.commit()
-        return jsonify({"liked": False, "likes": post.likes_count}), 200
-
-    db.session.add(Like(user_id=user_id, post_id=post_id))  # LIKE
-    db.session.commit()
-    return jsonify({"liked": True, "likes": post.likes_count}), 200
+    # Buffered toggle: persisted in batches by flush_likes, visible immediately to reads
+    liked = like_buffer.toggle(user_id, post_id, lambda: has_persisted_like(user_id, post_id))
+    ensure_trending_loaded()
+    trending_index.record_like(post_id, post.category, post.created_at, liked, user_id=user_id)
+    return jsonify({"liked": liked, "likes": post.likes_count}), 200
 
 
 # DELETE a post
@@ -1212,6 +2001,9 @@ def delete_post(post_id):
     # Delete associated comments and likes first (cascade safety)
     Comment.query.filter_by(post_id=post_id).delete()
     Like.query.filter_by(post_id=post_id).delete()
+    TimelineEntry.query.filter_by(post_id=post_id).delete()
+    like_buffer.discard_post(post_id)
+    trending_index.remove(post_id)
 
     # Delete the post itself
     db.session.delete(post)
@@ -1229,29 +2021,15 @@ def create_post():
     category = request.form.get('category')
     is_anonymous = request.form.get('is_anonymous') == 'true'
     
-    # Handle image upload
+    # Handle image upload: content-addressed, metadata stripped, variants built in the background
     image = request.files.get('image')
     image_url = None
     if image:
-        # Make filename safe
-            filename = secure_filename(image.filename)
-
-            # Define the folder where images will be saved
-            upload_dir = 'uploads'
-
-            # Create the folder if it doesn't exist
-            if not os.path.exists(upload_dir):
-                os.makedirs(upload_dir)
-
-            # Save the file
-            filepath = os.path.join(upload_dir, filename)
-            image.save(filepath)
-
-            # Save URL path for frontend
-            image_url = f"/{upload_dir}/{filename}"
-
+        try:
+            image_url = image_pipeline.save_upload(image)
+        except InvalidImage as e:
+            return jsonify({'error': str(e)}), 400
 
-    
     post = Post(
         title=title,
         content=content,
@@ -1261,58 +2039,284 @@ def create_post():
         user_id=user_id
     )
     
+    ensure_trending_loaded()
     db.session.add(post)
+    db.session.flush()
+    fan_out_post(post)
     db.session.commit()
+
+    trending_index.record_post(post.id, post.category, post.created_at)
     
-    return jsonify({"message": "Post created successfully!"}), 201
+    return jsonify({
+        "message": "Post created successfully!",
+        "id": post.id,
+        "image_url": post.image_url,
+        "image_variants": image_pipeline.variant_urls(post.image_url)
+    }), 201
+
+# Serve uploaded files
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LEGACY_UPLOAD_MAX_AGE = 3600
+
+def set_upload_cache_headers(response, max_age, immutable):
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
 
-    # Serve uploaded files
-    # Serve uploaded files
 @app.route('/uploads/<path:filename>')
 def serve_uploaded_file(filename):
     # Serve from backend/uploads directory
-    uploads_path = os.path.join(app.root_path, 'uploads')
-    return send_from_directory(uploads_path, filename)
+    uploads_path = app.config['UPLOAD_FOLDER']
+    # A variant requested before the background pool produced it is built on demand
+    image_pipeline.ensure_variant(filename)
+
+    # Content-addressed names never change content: cache them forever with the digest as a strong ETag
+    digest = content_digest(filename)
+    max_age = IMMUTABLE_MAX_AGE if digest else LEGACY_UPLOAD_MAX_AGE
+
+    if app.config['UPLOADS_OFFLOAD'] != 'x-accel':
+        # send_file answers If-None-Match/If-Modified-Since and Range itself (and X-Sendfile when enabled)
+        response = send_from_directory(uploads_path, filename, etag=digest or True, max_age=max_age)
+        return set_upload_cache_headers(response, max_age, immutable=bool(digest))
+
+    path = safe_join(uploads_path, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'error': 'File not found'}), 404
+    # nginx streams the bytes and handles Range; we only set validators and answer conditional requests
+    stat = os.stat(path)
+    response = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    response.headers['X-Accel-Redirect'] = f"{app.config['UPLOADS_ACCEL_PREFIX'].rstrip('/')}/{filename}"
+    response.set_etag(digest or f"{int(stat.st_mtime)}-{stat.st_size}")
+    response.last_modified = stat.st_mtime
+    set_upload_cache_headers(response, max_age, immutable=bool(digest))
+    return response.make_conditional(request)
 
 
 
 # AI Chatbot routes
 @app.route('/api/chatbot/query', methods=['POST'])
 @jwt_required()
+@enforce_llm_quota
 def chatbot_query():
     user_id = get_jwt_identity()
-    data = request.get_json()
+    data = request.get_json() or {}
+    message = (data.get('message') or '').strip()
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+
+    with timed_stage('db_read'):
+        thread = chat_thread_for(user_id, data.get('thread_id'), message)
+        if thread is None:
+            return jsonify({'error': 'Thread not found'}), 404
+        history = thread_history(thread)
+
+    if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+        return stream_chatbot_response(user_id, message, thread, history)
     
     # Get AI response
-    ai_response = get_ai_response(data['message'])
+    ai_response = get_ai_response(message, history)
     
     # Save to database
-    chat_message = ChatMessage(
-        user_id=user_id,
-        message=data['message'],
-        response=ai_response
-    )
-    
-    db.session.add(chat_message)
-    db.session.commit()
+    chat_message = save_chat_turn(user_id, thread, message, ai_response)
     
-    return jsonify({'response': ai_response}), 200
+    return jsonify({'response': ai_response, 'id': chat_message.id, 'thread_id': thread.id}), 200
+
+def stream_chatbot_response(user_id, message, thread, history):
+    """Relay tokens as Server-Sent Events and persist the ChatMessage when the stream ends"""
+    thread_id = thread.id
+
+    def generate():
+        tokens = []
+        completed = False
+        chat_message = None
+        cacheable = not (history[0] or history[1])
+        cached = answer_cache.get('chatbot', message) if cacheable else None
+        stream = iter([cached]) if cached is not None else stream_ai_response(message, history)
+        try:
+            for token in stream:
+                tokens.append(token)
+                yield sse_event({'token': token})
+            completed = True
+        except GeneratorExit:
+            # Client went away: stop consuming, the finally block cancels upstream
+            raise
+        except Exception as e:
+            print(f"Chatbot stream error: {e}")
+            yield sse_event({'error': LLM_UNAVAILABLE_MESSAGE}, event='error')
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+            if completed and cacheable and cached is None:
+                answer_cache.set('chatbot', message, ''.join(tokens))
+            if tokens:
+                chat_message = save_chat_turn(user_id, db.session.get(ChatThread, thread_id), message, ''.join(tokens))
+        if completed:
+            yield sse_event({'id': chat_message.id if chat_message else None, 'thread_id': thread_id}, event='done')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx flush every event
+    return response
+
+@app.route('/api/chatbot/cache', methods=['GET'])
+@jwt_required()
+def get_chatbot_cache_stats():
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    return jsonify(answer_cache.stats()), 200
+
+@app.route('/api/chatbot/cache', methods=['DELETE'])
+@jwt_required()
+def purge_chatbot_cache():
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    namespace = request.args.get('namespace')  # 'chatbot', 'ask' or everything
+    removed = answer_cache.purge(namespace)
+    return jsonify({'message': 'Chatbot cache purged', 'removed': removed}), 200
+
+@app.route('/api/chatbot/llm', methods=['GET'])
+@jwt_required()
+def get_llm_stats():
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    return jsonify({'providers': llm.stats()}), 200
+
+@app.route('/api/chatbot/usage', methods=['GET'])
+@jwt_required()
+def get_llm_usage():
+    """The caller's token usage today and over the last ``days`` days, with what is left of the quota"""
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    subject = llm_usage_subject()
+    usage_meter.flush()
+    since = utc_today() - timedelta(days=days - 1)
+    rows = LLMUsage.query.filter(LLMUsage.subject == subject, LLMUsage.day >= since)\
+        .order_by(LLMUsage.day.desc(), LLMUsage.endpoint).all()
+    used = usage_meter.used_today(subject)
+    quota = llm_daily_quota(subject)
+    return jsonify({
+        'used_today': used,
+        'quota': quota or None,
+        'remaining_today': max(quota - used, 0) if quota else None,
+        'resets_in': seconds_until_utc_midnight(),
+        'usage': [row.to_dict() for row in rows]
+    }), 200
+
+@app.route('/api/chatbot/usage/summary', methods=['GET'])
+@jwt_required()
+def get_llm_usage_summary():
+    """Admin view of one day: totals per endpoint and the heaviest subjects"""
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    try:
+        day = datetime.strptime(request.args['day'], '%Y-%m-%d').date() if request.args.get('day') else utc_today()
+    except ValueError:
+        return jsonify({'error': 'day must be YYYY-MM-DD'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    usage_meter.flush()
+
+    tokens = db.func.sum(LLMUsage.prompt_tokens + LLMUsage.completion_tokens)
+    endpoints = db.session.query(
+        LLMUsage.endpoint, db.func.sum(LLMUsage.prompt_tokens), db.func.sum(LLMUsage.completion_tokens),
+        db.func.sum(LLMUsage.requests), db.func.count(LLMUsage.id)
+    ).filter(LLMUsage.day == day).group_by(LLMUsage.endpoint).all()
+    top = db.session.query(LLMUsage.subject, tokens, db.func.sum(LLMUsage.requests))\
+        .filter(LLMUsage.day == day).group_by(LLMUsage.subject).order_by(tokens.desc()).limit(limit).all()
+    return jsonify({
+        'day': day.isoformat(),
+        'endpoints': [
+            {'endpoint': endpoint, 'prompt_tokens': prompt, 'completion_tokens': completion,
+             'requests': requests_, 'subjects': subjects}
+            for endpoint, prompt, completion, requests_, subjects in endpoints
+        ],
+        'top_subjects': [
+            {'subject': subject, 'tokens': total, 'requests': requests_} for subject, total, requests_ in top
+        ]
+    }), 200
 
 @app.route('/api/chatbot/history', methods=['GET'])
 @jwt_required()
 def get_chat_history():
     user_id = get_jwt_identity()
-    messages = ChatMessage.query.filter_by(user_id=user_id).order_by(ChatMessage.created_at.desc()).limit(50).all()
+    before_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+
+    query = ChatMessage.query.filter_by(user_id=user_id)
+    if before_id:
+        query = query.filter(ChatMessage.id < before_id)
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit).all()
     
     return jsonify({
-        'messages': [{
-            'id': msg.id,
-            'message': msg.message,
-            'response': msg.response,
-            'created_at': msg.created_at.isoformat()
-        } for msg in messages]
+        'messages': [msg.to_dict() for msg in messages],
+        'next_cursor': str(messages[-1].id) if len(messages) == limit else None
+    }), 200
+
+@app.route('/api/chatbot/threads', methods=['GET'])
+@jwt_required()
+def get_chat_threads():
+    user_id = get_jwt_identity()
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    query = ChatThread.query.filter_by(user_id=user_id)
+
+    # Cursor is "<last_message_id>_<thread id>" of the last thread on the previous page
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            last_message_id, thread_id = (int(part) for part in cursor.split('_', 1))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(db.or_(
+            ChatThread.last_message_id < last_message_id,
+            db.and_(ChatThread.last_message_id == last_message_id, ChatThread.id < thread_id)
+        ))
+    threads = query.order_by(ChatThread.last_message_id.desc(), ChatThread.id.desc()).limit(limit).all()
+
+    return jsonify({
+        'threads': [thread.to_dict() for thread in threads],
+        'next_cursor': f"{threads[-1].last_message_id}_{threads[-1].id}" if len(threads) == limit else None
+    }), 200
+
+@app.route('/api/chatbot/threads', methods=['POST'])
+@jwt_required()
+def create_chat_thread():
+    data = request.get_json(silent=True) or {}
+    thread = ChatThread(user_id=get_jwt_identity(), title=(data.get('title') or 'New chat').strip()[:200])
+    db.session.add(thread)
+    db.session.commit()
+    return jsonify(thread.to_dict()), 201
+
+@app.route('/api/chatbot/threads/<int:thread_id>/messages', methods=['GET'])
+@jwt_required()
+def get_chat_thread_messages(thread_id):
+    thread = db.session.get(ChatThread, thread_id)
+    if not thread or thread.user_id != get_jwt_identity():
+        return jsonify({'error': 'Thread not found'}), 404
+    before_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    query = ChatMessage.query.filter_by(thread_id=thread_id)
+    if before_id:
+        query = query.filter(ChatMessage.id < before_id)
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit).all()
+
+    return jsonify({
+        'thread': thread.to_dict(),
+        'messages': [msg.to_dict() for msg in messages],
+        'next_cursor': str(messages[-1].id) if len(messages) == limit else None
     }), 200
 
+@app.route('/api/chatbot/threads/<int:thread_id>', methods=['DELETE'])
+@jwt_required()
+def delete_chat_thread(thread_id):
+    thread = db.session.get(ChatThread, thread_id)
+    if not thread or thread.user_id != get_jwt_identity():
+        return jsonify({'error': 'Thread not found'}), 404
+    ChatMessage.query.filter_by(thread_id=thread_id).delete(synchronize_session=False)
+    db.session.delete(thread)
+    db.session.commit()
+    return jsonify({'message': 'Thread deleted'}), 200
+
 # Emergency Help routes
 @app.route('/api/emergency/nearby', methods=['GET'])
 @jwt_required()
@@ -1361,56 +2365,372 @@ def send_emergency_alert():
     }), 200
 
 # Gender Equality routes
+COMPANY_STATS_SUMS = ('safety_sum', 'pay_equality_sum', 'culture_sum')
+
+def add_company_stats(company_name, total_ratings, safety, pay_equality, culture, day):
+    """
+    Add a delta to the company's aggregate row and to its rollup for ``day``
+    (the rating's created_at date) in the current transaction (atomic under
+    concurrent raters)
+    """
+    values = {'company_name': company_name, 'total_ratings': total_ratings,
+              'safety_sum': safety, 'pay_equality_sum': pay_equality, 'culture_sum': culture}
+    connection = db.session.connection()
+    db.session.execute(
+        upsert_increment(connection, CompanyStats.__table__, ['company_name'],
+                         ('total_ratings', 'revision') + COMPANY_STATS_SUMS),
+        dict(values, revision=1)
+    )
+    db.session.execute(
+        upsert_increment(connection, CompanyRatingDaily.__table__, ['company_name', 'day'],
+                         ('total_ratings',) + COMPANY_STATS_SUMS),
+        dict(values, day=day)
+    )
+
+def rebuild_company_stats():
+    """Recompute every CompanyStats row from CompanyRating (caller commits)"""
+    stats_table = CompanyStats.__table__
+    db.session.execute(stats_table.delete())
+    db.session.execute(stats_table.insert().from_select(
+        ['company_name', 'total_ratings'] + list(COMPANY_STATS_SUMS),
+        db.select(
+            CompanyRating.company_name,
+            db.func.count(CompanyRating.id),
+            db.func.sum(CompanyRating.safety_rating),
+            db.func.sum(CompanyRating.pay_equality_rating),
+            db.func.sum(CompanyRating.culture_rating)
+        ).group_by(CompanyRating.company_name)
+    ))
+    priors = leaderboard_priors()
+    rescore_companies(priors)
+    leaderboard_state.update(priors=priors, rescored=True)
+    # Revisions restart with the rows: have score_companies revisit every company
+    db.session.execute(db.update(Company).values(scored_revision=None))
+    rebuild_rating_rollups()
+
+def rebuild_rating_rollups():
+    """Recompute every CompanyRatingDaily row from CompanyRating (caller commits)"""
+    rollup_table = CompanyRatingDaily.__table__
+    day = db.func.date(CompanyRating.created_at)
+    db.session.execute(rollup_table.delete())
+    db.session.execute(rollup_table.insert().from_select(
+        ['company_name', 'day', 'total_ratings'] + list(COMPANY_STATS_SUMS),
+        db.select(
+            CompanyRating.company_name,
+            day,
+            db.func.count(CompanyRating.id),
+            db.func.sum(CompanyRating.safety_rating),
+            db.func.sum(CompanyRating.pay_equality_rating),
+            db.func.sum(CompanyRating.culture_rating)
+        ).group_by(CompanyRating.company_name, day)
+    ))
+
+def score_companies(full=False):
+    """
+    Recompute Company.gender_equality_score from the rating aggregates, in
+    id-ordered chunks committed one at a time. Only companies rated since
+    they were last scored are visited unless ``full``; companies without
+    ratings keep their registry score. Returns the number of companies scored.
+    """
+    weights = app.config['EQUALITY_SCORE_WEIGHTS']
+    query = db.session.query(
+        Company.id, CompanyStats.revision, CompanyStats.total_ratings,
+        *(getattr(CompanyStats, column) for column in COMPANY_STATS_SUMS)
+    ).join(CompanyStats, CompanyStats.company_name == Company.name).filter(CompanyStats.total_ratings > 0)
+    if not full:
+        query = query.filter(db.or_(Company.scored_revision.is_(None), Company.scored_revision != CompanyStats.revision))
+
+    scored, last_id = 0, 0
+    while True:
+        rows = query.filter(Company.id > last_id).order_by(Company.id)\
+            .limit(app.config['EQUALITY_SCORE_BATCH_SIZE']).all()
+        if not rows:
+            return scored
+        # The revision read with the sums: a rating committed meanwhile bumps it and is picked up next run
+        db.session.bulk_update_mappings(Company, [{
+            'id': company_id,
+            'gender_equality_score': equality_score(total, dict(zip(METRICS, sums)), weights),
+            'scored_revision': revision,
+        } for company_id, revision, total, *sums in rows])
+        db.session.commit()
+        scored += len(rows)
+        last_id = rows[-1][0]
+
+# priors: the global averages this process scores against; rescored: whether it has rescored every company with them
+leaderboard_state = {'priors': None, 'rescored': False, 'loaded_at': 0.0, 'refreshing': False}
+company_leaderboard = Leaderboard(top_k=app.config['LEADERBOARD_TOP_K'])
+
+def leaderboard_priors():
+    """Average of every rating per metric, the mean each company's score is pulled towards"""
+    totals = db.session.query(
+        db.func.sum(CompanyStats.total_ratings),
+        *(db.func.sum(getattr(CompanyStats, f'{metric}_sum')) for metric in METRICS)
+    ).one()
+    return prior_means(totals[0] or 0, {metric: total or 0 for metric, total in zip(METRICS, totals[1:])})
+
+def current_leaderboard_priors():
+    if leaderboard_state['priors'] is None:
+        leaderboard_state['priors'] = leaderboard_priors()
+    return leaderboard_state['priors']
+
+def rescore_companies(priors, company_name=None):
+    """Store Bayesian-smoothed scores on company_stats for one company, or all of them (caller commits)"""
+    weight = app.config['LEADERBOARD_PRIOR_WEIGHT']
+    scores = {
+        f'{metric}_score': (weight * priors[metric] + getattr(CompanyStats, f'{metric}_sum'))
+                           / (weight + CompanyStats.total_ratings)
+        for metric in METRICS
+    }
+    statement = db.update(CompanyStats).values(
+        score=(scores['safety_score'] + scores['pay_equality_score'] + scores['culture_score']) / len(METRICS),
+        **scores
+    )
+    if company_name is not None:
+        statement = statement.where(CompanyStats.company_name == company_name)
+    db.session.execute(statement)
+
+def leaderboard_row(stats):
+    row = stats.to_dict()
+    row.update(sector=stats.sector, score=stats.score, safety_score=stats.safety_score,
+               pay_equality_score=stats.pay_equality_score, culture_score=stats.culture_score)
+    return row
+
+def refresh_company_leaderboard():
+    """Rescore every company when the global averages have drifted, then reload the in-memory leaderboard"""
+    priors = leaderboard_priors()
+    if (not leaderboard_state['rescored']
+            or priors_drifted(leaderboard_state['priors'], priors, app.config['LEADERBOARD_PRIOR_DRIFT'])):
+        rescore_companies(priors)
+        db.session.commit()
+        leaderboard_state.update(priors=priors, rescored=True)
+    company_leaderboard.load(
+        leaderboard_row(stats) for stats in CompanyStats.query.filter(CompanyStats.total_ratings > 0).yield_per(1000)
+    )
+    leaderboard_state['loaded_at'] = time.monotonic()
+
+def refresh_company_leaderboard_in_background():
+    try:
+        with app.app_context():
+            refresh_company_leaderboard()
+    except Exception as e:
+        print(f"Leaderboard refresh error: {e}")
+    finally:
+        leaderboard_state['refreshing'] = False
+
+def ensure_company_leaderboard():
+    """Load the leaderboard on first use; afterwards refresh it in the background once it is old"""
+    if not company_leaderboard.loaded:
+        refresh_company_leaderboard()
+    elif (time.monotonic() - leaderboard_state['loaded_at'] > app.config['LEADERBOARD_REFRESH']
+          and not leaderboard_state['refreshing']):
+        leaderboard_state['refreshing'] = True
+        threading.Thread(target=refresh_company_leaderboard_in_background, name='leaderboard-refresh',
+                         daemon=True).start()
+
+def resolve_company(name, create=True):
+    """The registry company ``name`` normalizes to (via its aliases); created when unknown and ``create``"""
+    key = normalize_company_name(name)
+    if not key:
+        return None
+    alias = CompanyAlias.query.filter_by(alias_key=key).first()
+    if alias is not None:
+        return db.session.get(Company, alias.company_id)
+    company = Company.query.filter_by(normalized_name=key).first()
+    if company is not None or not create:
+        return company
+    try:
+        with db.session.begin_nested():
+            # A registry row not normalized yet (the migration leaves duplicate keys for `flask merge-company-names`,
+            # so there are few) is adopted rather than duplicated or collided with on Company.name
+            company = next((candidate for candidate in Company.query.filter(Company.normalized_name.is_(None))
+                            if normalize_company_name(candidate.name) == key), None)
+            if company is None:
+                company = Company(name=display_name(name)[:200])
+                db.session.add(company)
+            company.normalized_name = key
+            db.session.flush()
+            db.session.add(CompanyAlias(company_id=company.id, alias=company.name, alias_key=key))
+    except IntegrityError:
+        # Created concurrently by another request; anything else is a real error
+        company = resolve_company(name, create=False)
+        if company is None:
+            raise
+    return company
+
+def merge_company_into(source, target):
+    """Move ``source``'s aliases and ratings to ``target`` and delete it; one rating per user is kept (caller rebuilds stats)"""
+    CompanyAlias.query.filter_by(company_id=source.id).update({'company_id': target.id}, synchronize_session=False)
+    CompanyRating.query.filter_by(company_id=source.id).update(
+        {'company_id': target.id, 'company_name': target.name}, synchronize_session=False
+    )
+    db.session.delete(source)
+    db.session.flush()
+    dedupe_company_ratings(target.id)
+
+def dedupe_company_ratings(company_id=None):
+    """Keep each user's newest rating of a company where merging left several"""
+    newest = db.session.query(db.func.max(CompanyRating.id)).filter(CompanyRating.company_id.isnot(None))\
+        .group_by(CompanyRating.user_id, CompanyRating.company_id)
+    stale = CompanyRating.query.filter(CompanyRating.company_id.isnot(None), ~CompanyRating.id.in_(newest))
+    if company_id is not None:
+        stale = stale.filter(CompanyRating.company_id == company_id)
+    return stale.delete(synchronize_session=False)
+
+company_suggest = CompanySuggestIndex()
+company_suggest_state = {'loaded_at': 0.0, 'refreshing': False}
+
+def company_suggest_entries():
+    weights = dict(db.session.query(CompanyStats.company_name, CompanyStats.total_ratings))
+    aliases = {}
+    for company_id, alias_key in db.session.query(CompanyAlias.company_id, CompanyAlias.alias_key):
+        aliases.setdefault(company_id, []).append(alias_key)
+    return [(company_id, name, weights.get(name, 0), aliases.get(company_id, ()))
+            for company_id, name in db.session.query(Company.id, Company.name)]
+
+def refresh_company_suggest():
+    try:
+        with app.app_context():
+            entries = company_suggest_entries()
+        company_suggest.load(entries)
+        company_suggest_state['loaded_at'] = time.monotonic()
+    except Exception as e:
+        print(f"Company suggest refresh error: {e}")
+    finally:
+        company_suggest_state['refreshing'] = False
+
+def ensure_company_suggest():
+    """Build the autocomplete index on first use; afterwards refresh it in the background once it is old"""
+    if not company_suggest.loaded:
+        company_suggest.load(company_suggest_entries())
+        company_suggest_state['loaded_at'] = time.monotonic()
+    elif (time.monotonic() - company_suggest_state['loaded_at'] > app.config['COMPANY_SUGGEST_REFRESH']
+          and not company_suggest_state['refreshing']):
+        company_suggest_state['refreshing'] = True
+        threading.Thread(target=refresh_company_suggest, name='company-suggest-refresh', daemon=True).start()
+
+
+@event.listens_for(Session, 'after_flush')
+def track_company_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Company):
+            changes = session.info.setdefault('company_changes', {})
+            aliases = (changes.get(obj.id) or (None, []))[1]
+            changes[obj.id] = (obj.name, aliases)
+    for obj in session.new:
+        if isinstance(obj, CompanyAlias):
+            changes = session.info.setdefault('company_changes', {})
+            changes.setdefault(obj.company_id, (None, []))[1].append(obj.alias_key)
+    for obj in session.deleted:
+        if isinstance(obj, Company):
+            session.info.setdefault('company_changes', {})[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_company_changes(session):
+    changes = session.info.pop('company_changes', None)
+    if not changes or not company_suggest.loaded:
+        return
+    for company_id, change in changes.items():
+        if change is None:
+            company_suggest.remove(company_id)
+        elif change[0] is not None or company_id in company_suggest:
+            company_suggest.upsert(company_id, change[0] or company_suggest.name(company_id), aliases=change[1])
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_company_changes(session):
+    session.info.pop('company_changes', None)
+
+
+@app.route('/api/equality/companies/suggest', methods=['GET'])
+def suggest_companies():
+    """Autocomplete for company names: prefix matches on any word, typo-tolerant, most-rated first"""
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 8, type=int), 1), 10)
+    ensure_company_suggest()
+    return jsonify({'suggestions': [
+        {'id': company_id, 'name': name, 'total_ratings': weight}
+        for company_id, name, weight in company_suggest.suggest(query, limit)
+    ]}), 200
+
 @app.route('/api/equality/companies', methods=['GET'])
 def get_company_ratings():
-    companies = CompanyRating.query.all()
-    
-    # Group by company and calculate averages
-    company_stats = {}
-    for rating in companies:
-        if rating.company_name not in company_stats:
-            company_stats[rating.company_name] = {
-                'name': rating.company_name,
-                'total_ratings': 0,
-                'avg_safety': 0,
-                'avg_pay_equality': 0,
-                'avg_culture': 0
-            }
-        
-        stats = company_stats[rating.company_name]
-        stats['total_ratings'] += 1
-        stats['avg_safety'] += rating.safety_rating
-        stats['avg_pay_equality'] += rating.pay_equality_rating
-        stats['avg_culture'] += rating.culture_rating
-    
-    # Calculate averages
-    for company in company_stats.values():
-        total = company['total_ratings']
-        if total > 0:
-            company['avg_safety'] = round(company['avg_safety'] / total, 1)
-            company['avg_pay_equality'] = round(company['avg_pay_equality'] / total, 1)
-            company['avg_culture'] = round(company['avg_culture'] / total, 1)
-        else:
-            company['avg_safety'] = 0
-            company['avg_pay_equality'] = 0
-            company['avg_culture'] = 0
-    
-    return jsonify({'companies': list(company_stats.values())}), 200
+    companies = CompanyStats.query.filter(CompanyStats.total_ratings > 0).order_by(CompanyStats.company_name).all()
+    return jsonify({'companies': [company.to_dict() for company in companies]}), 200
+
+@app.route('/api/equality/leaderboard', methods=['GET'])
+def get_company_leaderboard():
+    """Companies ranked by a Bayesian-smoothed metric, paginated, optionally only those with min_reviews ratings"""
+    sort = request.args.get('sort', 'overall')
+    order = request.args.get('order', 'desc')
+    if sort not in SORT_FIELDS:
+        return jsonify({'error': f"sort must be one of: {', '.join(SORT_FIELDS)}"}), 400
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    min_reviews = max(request.args.get('min_reviews', 1, type=int), 1)
+    offset = (page - 1) * per_page
+
+    ensure_company_leaderboard()
+    cached = company_leaderboard.page(sort, order == 'desc', offset, per_page, min_reviews)
+    if cached is not None:
+        rows, total = cached
+    else:
+        # Past the cached top rows: let the database sort, by the indexed score columns
+        column = getattr(CompanyStats, SORT_FIELDS[sort])
+        query = CompanyStats.query.filter(CompanyStats.total_ratings >= min_reviews)
+        total = query.count()
+        query = query.order_by(column.desc() if order == 'desc' else column.asc(), CompanyStats.company_name)
+        rows = [leaderboard_row(stats) for stats in query.offset(offset).limit(per_page)]
+
+    priors = leaderboard_state['priors'] or {}
+    return jsonify({
+        'companies': [{
+            'rank': offset + position + 1,
+            'name': row['name'],
+            'sector': row['sector'],
+            'total_ratings': row['total_ratings'],
+            'score': round(row['score'], 2),
+            'scores': {metric: round(row[f'{metric}_score'], 2) for metric in METRICS},
+            'averages': {metric: row[f'avg_{metric}'] for metric in METRICS},
+        } for position, row in enumerate(rows)],
+        'total': total,
+        'pages': -(-total // per_page),
+        'current_page': page,
+        'sort': sort,
+        'order': order,
+        'min_reviews': min_reviews,
+        'prior': {
+            'weight': app.config['LEADERBOARD_PRIOR_WEIGHT'],
+            'means': {metric: round(mean, 2) for metric, mean in priors.items()},
+        },
+    }), 200
 
 @app.route('/api/equality/rate', methods=['POST'])
 @jwt_required()
 def rate_company():
     user_id = get_jwt_identity()
     data = request.get_json()
+    company = resolve_company(data.get('company_name'))
+    if company is None:
+        return jsonify({'error': 'Company name is required'}), 400
     
     # Check if user already rated this company
     existing_rating = CompanyRating.query.filter_by(
         user_id=user_id,
-        company_name=data['company_name']
+        company_id=company.id
     ).first()
     
     if existing_rating:
-        # Update existing rating
+        # Update existing rating; the aggregate moves by the difference
+        add_company_stats(
+            existing_rating.company_name, 0,
+            data['safety_rating'] - existing_rating.safety_rating,
+            data['pay_equality_rating'] - existing_rating.pay_equality_rating,
+            data['culture_rating'] - existing_rating.culture_rating,
+            existing_rating.created_at.date()
+        )
         existing_rating.safety_rating = data['safety_rating']
         existing_rating.pay_equality_rating = data['pay_equality_rating']
         existing_rating.culture_rating = data['culture_rating']
@@ -1418,8 +2738,11 @@ def rate_company():
         existing_rating.is_anonymous = data.get('is_anonymous', True)
     else:
         # Create new rating
+        created_at = datetime.utcnow()
         rating = CompanyRating(
-            company_name=data['company_name'],
+            company_name=company.name,
+            company_id=company.id,
+            created_at=created_at,
             safety_rating=data['safety_rating'],
             pay_equality_rating=data['pay_equality_rating'],
             culture_rating=data['culture_rating'],
@@ -1428,62 +2751,163 @@ def rate_company():
             is_anonymous=data.get('is_anonymous', True)
         )
         db.session.add(rating)
+        add_company_stats(company.name, 1, data['safety_rating'],
+                          data['pay_equality_rating'], data['culture_rating'], created_at.date())
+    # A company's sector is classified once, when its stats row first appears
+    db.session.execute(
+        db.update(CompanyStats)
+        .where(CompanyStats.company_name == company.name, CompanyStats.sector.is_(None))
+        .values(sector=classify_sector(company.name, company.industry))
+    )
+    # Rescored against the priors of the last full rescore; the rest of the table is unaffected
+    rescore_companies(current_leaderboard_priors(), company.name)
     
     db.session.commit()
+    equality_dashboard.invalidate()
+    stats = db.session.get(CompanyStats, company.name)
+    if company_leaderboard.loaded:
+        company_leaderboard.update(leaderboard_row(stats))
+    if existing_rating is None and company_suggest.loaded:
+        company_suggest.set_weight(company.id, stats.total_ratings)
     
     return jsonify({'message': 'Company rated successfully'}), 201
 
-@app.route('/api/equality/dashboard', methods=['GET'])
-def get_equality_dashboard():
-    # Calculate real statistics from the database
-    from sqlalchemy import func
-    
-    # Get overall statistics
-    total_ratings = CompanyRating.query.count()
-    avg_safety = db.session.query(func.avg(CompanyRating.safety_rating)).scalar() or 0
-    avg_pay_equality = db.session.query(func.avg(CompanyRating.pay_equality_rating)).scalar() or 0
-    avg_culture = db.session.query(func.avg(CompanyRating.culture_rating)).scalar() or 0
-    
-    # Get ratings by company for sector breakdown (mock sectors for now)
-    companies = CompanyRating.query.all()
+def rating_rollup_days(since, company_name=None):
+    """[(day, total_ratings, sums...)] from the daily rollups since ``since``, summed over companies"""
+    query = db.session.query(
+        CompanyRatingDaily.day,
+        db.func.sum(CompanyRatingDaily.total_ratings),
+        *(db.func.sum(getattr(CompanyRatingDaily, column)) for column in COMPANY_STATS_SUMS)
+    ).filter(CompanyRatingDaily.day >= since)
+    if company_name is not None:
+        query = query.filter(CompanyRatingDaily.company_name == company_name)
+    return query.group_by(CompanyRatingDaily.day).all()
+
+def trend_company():
+    """(company name or None for all companies, error response)"""
+    if not request.args.get('company'):
+        return None, None
+    company = resolve_company(request.args['company'], create=False)
+    if company is None:
+        return None, (jsonify({'error': 'Company not found'}), 404)
+    return company.name, None
+
+@app.route('/api/equality/trends', methods=['GET'])
+def get_rating_trends():
+    """Average ratings over the last 30/90/365 days, each compared with the window before it"""
+    company_name, error = trend_company()
+    if error:
+        return error
+    today = utc_today()
+    rows = rating_rollup_days(today - timedelta(days=2 * max(TREND_WINDOWS) - 1), company_name)
+    return jsonify({
+        'company': company_name,
+        'windows': {str(days): summary for days, summary in window_summaries(rows, today).items()},
+    }), 200
+
+@app.route('/api/equality/trends/monthly', methods=['GET'])
+def get_monthly_rating_trends():
+    company_name, error = trend_company()
+    if error:
+        return error
+    months = min(max(request.args.get('months', 12, type=int), 1), 60)
+    today = utc_today()
+    rows = rating_rollup_days(month_start(today, months - 1), company_name)
+    return jsonify({'company': company_name, 'months': monthly_series(rows, today, months)}), 200
+
+def export_response(name, columns, query):
+    """Stream ``query``'s rows as ?format=csv (default) or ndjson, read through a server-side cursor"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    rows = query.yield_per(app.config['EXPORT_BATCH_SIZE'])
+    response = Response(stream_with_context(encode_rows(export_format, columns, rows)),
+                        mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}-{utc_today().isoformat()}.{export_format}'
+    response.headers['X-Accel-Buffering'] = 'no'  # stream through nginx instead of buffering the whole file
+    return response
+
+@app.route('/api/equality/ratings/export', methods=['GET'])
+@jwt_required()
+def export_company_ratings():
+    """Every company rating, for researchers; user_id is only included for ratings not made anonymously"""
+    if not current_user_is_researcher():
+        return jsonify({'error': 'Researcher access required'}), 403
+    query = db.session.query(
+        CompanyRating.id,
+        CompanyRating.company_id,
+        CompanyRating.company_name,
+        CompanyRating.safety_rating,
+        CompanyRating.pay_equality_rating,
+        CompanyRating.culture_rating,
+        CompanyRating.comment,
+        CompanyRating.is_anonymous,
+        db.case((CompanyRating.is_anonymous == db.false(), CompanyRating.user_id), else_=None),
+        CompanyRating.created_at
+    )
+    company_name = request.args.get('company')
+    if company_name:
+        company = resolve_company(company_name, create=False)
+        query = query.filter(CompanyRating.company_id == company.id if company else db.false())
+    columns = ['id', 'company_id', 'company_name', 'safety_rating', 'pay_equality_rating', 'culture_rating',
+               'comment', 'is_anonymous', 'user_id', 'created_at']
+    return export_response('company-ratings', columns, query.order_by(CompanyRating.id))
+
+@app.route('/api/equality/feedback/export', methods=['GET'])
+@jwt_required()
+def export_feedback():
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    query = db.session.query(Feedback.id, Feedback.name, Feedback.email, Feedback.feedback_type,
+                             Feedback.message, Feedback.created_at)
+    if request.args.get('type'):
+        query = query.filter(Feedback.feedback_type == request.args['type'])
+    columns = ['id', 'name', 'email', 'feedback_type', 'message', 'created_at']
+    return export_response('feedback', columns, query.order_by(Feedback.id))
+
+def company_industries(names):
+    """{company name: industry} from the equality Company registry, for the names it knows"""
+    return dict(db.session.query(Company.name, Company.industry).filter(Company.name.in_(names)).all())
+
+def assign_company_sectors(reclassify=False):
+    """Store a sector on companies that have none yet (every company with ``reclassify``); returns how many"""
+    query = CompanyStats.query if reclassify else CompanyStats.query.filter(CompanyStats.sector.is_(None))
+    companies = query.all()
+    if not companies:
+        return 0
+    industries = {}
+    names = [company.company_name for company in companies]
+    for start in range(0, len(names), 500):
+        industries.update(company_industries(names[start:start + 500]))
+    for company in companies:
+        company.sector = classify_sector(company.company_name, industries.get(company.company_name))
+    db.session.commit()
+    return len(companies)
+
+def build_equality_dashboard():
+    """Read-only: sectors are assigned when a company's stats row is created (rate_company) or by the CLI"""
+    sector_rows = db.session.query(
+        db.func.coalesce(CompanyStats.sector, OTHER_SECTOR),
+        db.func.sum(CompanyStats.total_ratings),
+        db.func.sum(CompanyStats.safety_sum),
+        db.func.sum(CompanyStats.pay_equality_sum),
+        db.func.sum(CompanyStats.culture_sum)
+    ).filter(CompanyStats.total_ratings > 0).group_by(db.func.coalesce(CompanyStats.sector, OTHER_SECTOR)).all()
+
     sector_ratings = {}
-    
-    for rating in companies:
-        # For demo purposes, assign companies to sectors based on name patterns
-        sector = 'Other'
-        company_lower = rating.company_name.lower()
-        
-        if any(tech in company_lower for tech in ['tech', 'software', 'it', 'digital']):
-            sector = 'Technology'
-        elif any(health in company_lower for health in ['health', 'medical', 'hospital', 'care']):
-            sector = 'Healthcare'
-        elif any(finance in company_lower for finance in ['bank', 'finance', 'investment', 'insurance']):
-            sector = 'Finance'
-        elif any(edu in company_lower for edu in ['school', 'college', 'university', 'education']):
-            sector = 'Education'
-        
-        if sector not in sector_ratings:
-            sector_ratings[sector] = {
-                'total_ratings': 0,
-                'avg_safety': 0,
-                'avg_pay_equality': 0,
-                'avg_culture': 0
-            }
-        
-        sector_ratings[sector]['total_ratings'] += 1
-        sector_ratings[sector]['avg_safety'] += rating.safety_rating
-        sector_ratings[sector]['avg_pay_equality'] += rating.pay_equality_rating
-        sector_ratings[sector]['avg_culture'] += rating.culture_rating
-    
-    # Calculate sector averages
-    for sector, stats in sector_ratings.items():
-        if stats['total_ratings'] > 0:
-            stats['avg_safety'] = round(stats['avg_safety'] / stats['total_ratings'], 1)
-            stats['avg_pay_equality'] = round(stats['avg_pay_equality'] / stats['total_ratings'], 1)
-            stats['avg_culture'] = round(stats['avg_culture'] / stats['total_ratings'], 1)
-    
-    # Prepare dashboard data
-    dashboard_data = {
+    for sector, total, safety, pay_equality, culture in sector_rows:
+        sector_ratings[sector] = {
+            'total_ratings': total,
+            'avg_safety': round(safety / total, 1),
+            'avg_pay_equality': round(pay_equality / total, 1),
+            'avg_culture': round(culture / total, 1)
+        }
+    total_ratings = sum(total for _, total, _, _, _ in sector_rows)
+    avg_safety = sum(row[2] for row in sector_rows) / total_ratings if total_ratings else 0
+    avg_pay_equality = sum(row[3] for row in sector_rows) / total_ratings if total_ratings else 0
+    avg_culture = sum(row[4] for row in sector_rows) / total_ratings if total_ratings else 0
+
+    return {
         'gender_pay_gap': {
             'overall': round(100 - (avg_pay_equality * 20), 1),  # Convert 1-5 scale to percentage
             'by_sector': {sector: round(100 - (stats['avg_pay_equality'] * 20), 1) 
@@ -1498,8 +2922,16 @@ def get_equality_dashboard():
             'by_sector': {sector: stats['total_ratings'] for sector, stats in sector_ratings.items()}
         }
     }
-    
-    return jsonify(dashboard_data), 200
+
+equality_dashboard = Snapshot(build_equality_dashboard, ttl_seconds=app.config['EQUALITY_DASHBOARD_TTL'])
+
+@app.route('/api/equality/dashboard', methods=['GET'])
+def get_equality_dashboard():
+    dashboard_data, etag = equality_dashboard.get()
+    response = jsonify(dashboard_data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # revalidate; unchanged snapshots answer 304
+    return response.make_conditional(request)
 
 # Test route to add sample company ratings
 @app.route('/api/equality/test-data', methods=['POST'])
@@ -1523,10 +2955,17 @@ def add_test_data():
         
         # Add new ratings
         for rating_data in sample_ratings:
-            rating = CompanyRating(**rating_data)
+            company = resolve_company(rating_data['company_name'])
+            rating = CompanyRating(**dict(rating_data, company_name=company.name, company_id=company.id))
             db.session.add(rating)
+        db.session.flush()
+        rebuild_company_stats()
         
         db.session.commit()
+        assign_company_sectors()
+        equality_dashboard.invalidate()
+        if company_leaderboard.loaded:
+            refresh_company_leaderboard()
         
         return jsonify({'message': 'Test data added successfully', 'count': len(sample_ratings)}), 201
         
@@ -1580,6 +3019,7 @@ def get_profile():
         'phone': user.phone,
         'location': user.location,
         'profile_image': user.profile_image,
+        'profile_image_variants': image_pipeline.variant_urls(user.profile_image),
         'preferences': user.preferences or {},
         'is_verified': user.is_verified,
         'created_at': user.created_at.isoformat(),
@@ -1660,6 +3100,7 @@ def get_profile_by_id(user_id):
         'phone': user.phone,
         'location': user.location,
         'profile_image': user.profile_image,
+        'profile_image_variants': image_pipeline.variant_urls(user.profile_image),
         'preferences': user.preferences or {},
         'is_verified': user.is_verified,
         'created_at': user.created_at.isoformat()
@@ -1679,23 +3120,21 @@ def update_profile_by_id(user_id):
     if request.content_type and 'multipart/form-data' in request.content_type:
         user.username = request.form.get('username', user.username)
         user.email = request.form.get('email', user.email)
-        user.role = request.form.get('role', user.role)
+        user.role = self_service_role(request.form.get('role'), user.role)
         user.location = request.form.get('location', user.location)
         user.phone = request.form.get('phone', user.phone)
 
         image = request.files.get('profile_image')
         if image and image.filename:
-            filename = secure_filename(image.filename)
-            upload_dir = os.path.join('uploads', 'profile_images')
-            os.makedirs(upload_dir, exist_ok=True)
-            filepath = os.path.join(upload_dir, filename)
-            image.save(filepath)
-            user.profile_image = f"/{upload_dir}/{filename}"
+            try:
+                user.profile_image = image_pipeline.save_upload(image, 'profile_images')
+            except InvalidImage as e:
+                return jsonify({'error': str(e)}), 400
     else:
         data = request.get_json() or {}
         user.username = data.get('username', user.username)
         user.email = data.get('email', user.email)
-        user.role = data.get('role', user.role)
+        user.role = self_service_role(data.get('role'), user.role)
         user.location = data.get('location', user.location)
         user.phone = data.get('phone', user.phone)
         if 'profile_image' in data:
@@ -1712,6 +3151,7 @@ def update_profile_by_id(user_id):
         'phone': user.phone,
         'location': user.location,
         'profile_image': user.profile_image,
+        'profile_image_variants': image_pipeline.variant_urls(user.profile_image),
         'preferences': user.preferences or {},
         'is_verified': user.is_verified,
         'created_at': user.created_at.isoformat()
@@ -2195,10 +3635,110 @@ def rate_skill():
     db.session.commit()
     return jsonify({'message': 'Rating submitted successfully'}), 201
 
+@app.cli.command('backfill-timelines')
+def backfill_timelines():
+    """Fan out existing posts into timeline entries (idempotent)"""
+    last_id = 0
+    while True:
+        posts = Post.query.filter(Post.id > last_id).order_by(Post.id).limit(500).all()
+        if not posts:
+            break
+        for post in posts:
+            fan_out_post(post)
+        db.session.commit()
+        last_id = posts[-1].id
+    print(f"Timelines backfilled up to post {last_id}")
+
+@app.cli.command('rebuild-company-stats')
+def rebuild_company_stats_command():
+    """Recompute the CompanyStats aggregate and the daily trend rollups from every CompanyRating"""
+    rebuild_company_stats()
+    db.session.commit()
+    print(f"Company stats rebuilt for {CompanyStats.query.count()} companies")
+    print(f"Sectors assigned to {assign_company_sectors()} companies")
+
+@app.cli.command('score-companies')
+@click.option('--full', is_flag=True, help='Rescore every rated company, e.g. after changing EQUALITY_SCORE_WEIGHTS')
+def score_companies_command(full):
+    """Recompute Company.gender_equality_score for companies rated since the last run"""
+    print(f"Gender equality scores recomputed for {score_companies(full)} companies")
+
+@app.cli.command('classify-company-sectors')
+def classify_company_sectors_command():
+    """Reassign every company's sector, e.g. after registry industries change"""
+    print(f"Sectors assigned to {assign_company_sectors(reclassify=True)} companies")
+
+@app.cli.command('merge-company-names')
+def merge_company_names_command():
+    """Backfill: normalize registry names, fold duplicates together and attach every rating to a registry company"""
+    canonical = {alias.alias_key: alias.company_id for alias in CompanyAlias.query}
+    merged = 0
+    for company in Company.query.order_by(Company.id).all():
+        key = normalize_company_name(company.name)
+        target_id = canonical.setdefault(key, company.id)
+        if target_id != company.id:
+            merge_company_into(company, db.session.get(Company, target_id))
+            merged += 1
+            continue
+        company.normalized_name = key
+        if not CompanyAlias.query.filter_by(alias_key=key).first():
+            db.session.add(CompanyAlias(company_id=company.id, alias=company.name, alias_key=key))
+        db.session.flush()
+
+    # Most-used spelling first, so a company created here is named after it
+    spellings = db.session.query(CompanyRating.company_name).filter(CompanyRating.company_id.is_(None))\
+        .group_by(CompanyRating.company_name).order_by(db.func.count(CompanyRating.id).desc()).all()
+    for (name,) in spellings:
+        company = resolve_company(name)
+        if company is None:
+            continue
+        CompanyRating.query.filter(CompanyRating.company_id.is_(None), CompanyRating.company_name == name)\
+            .update({'company_id': company.id, 'company_name': company.name}, synchronize_session=False)
+    removed = dedupe_company_ratings()
+    rebuild_company_stats()
+    db.session.commit()
+    assign_company_sectors()
+    print(f"{len(spellings)} rating spellings resolved, {merged} registry duplicates merged, "
+          f"{removed} superseded ratings removed")
+
+@app.cli.command('alias-company')
+@click.argument('alias')
+@click.argument('company_name')
+def alias_company_command(alias, company_name):
+    """Make ALIAS resolve to COMPANY_NAME, merging a company already known as ALIAS into it"""
+    target = resolve_company(company_name, create=False)
+    if target is None:
+        print(f"Unknown company: {company_name}")
+        return
+    key = normalize_company_name(alias)
+    current = resolve_company(alias, create=False)
+    if current is not None and current.id != target.id:
+        merge_company_into(current, target)
+    existing = CompanyAlias.query.filter_by(alias_key=key).first()
+    if existing is None:
+        db.session.add(CompanyAlias(company_id=target.id, alias=display_name(alias), alias_key=key))
+    rebuild_company_stats()
+    db.session.commit()
+    assign_company_sectors()
+    print(f"'{alias}' now resolves to {target.name}")
+
+@app.cli.command('train-intent-model')
+def train_intent_model():
+    """Retrain the /ask intent classifier from the seed set plus logged LLM decisions"""
+    seed_path = os.path.join(app.root_path, 'data', 'intent_seed.jsonl')
+    examples = intent_classifier.load_examples(seed_path, app.config['INTENT_LOG_PATH'])
+    if not examples:
+        print("No labelled queries found")
+        return
+    model = intent_classifier.train(examples, threshold=app.config['INTENT_THRESHOLD'])
+    intent_classifier.save_model(model, app.config['INTENT_MODEL_PATH'])
+    print(f"Trained on {len(examples)} queries ({len(model['terms'])} terms) -> {app.config['INTENT_MODEL_PATH']}")
+
 # Initialize database
 @app.route('/api/init-db', methods=['POST'])
 def init_database():
     db.create_all()
+    init_search_index()
     
     # Create demo user if it doesn't exist
     demo_user = User.query.filter_by(email='demo@example.com').first()
@@ -2354,7 +3894,18 @@ def init_database():
     
     return jsonify({'message': 'Database initialized successfully with demo user and skill swap data'}), 200
 
+def create_app():
+    """WSGI entry point: the configured app with its blueprints registered (safe to call repeatedly)"""
+    if 'equality' not in app.blueprints:
+        # Imported here, once db is initialised: blueprint modules only depend on extensions
+        from routes.equality_routes import equality_bp
+        app.register_blueprint(equality_bp)
+    return app
+
+create_app()
+
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        init_search_index()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,84 @@
+"""
+Benchmark company autocomplete (services.company_suggest) at registry scale.
+
+Builds synthetic company names (brand syllables plus industry words and
+legal suffixes), loads the index and times prefix, multi-word, alias and
+misspelled queries, plus incremental inserts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_company_suggest --companies 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.company_names import normalize_company_name
+from services.company_suggest import CompanySuggestIndex
+
+SYLLABLES = ['ta', 'ra', 'in', 'fo', 'sys', 'wi', 'pro', 'tech', 'ma', 'hin', 'dra', 'ba', 'jaj', 'go', 'dre', 'ji', 'ko', 'nik', 'vel', 'sun']
+INDUSTRY = ['Consultancy Services', 'Motors', 'Pharma', 'Bank', 'Textiles', 'Foods', 'Power', 'Steel', 'Retail', 'Software', 'Healthcare', 'Logistics']
+SUFFIXES = ['', ' Ltd', ' Pvt. Ltd.', ' LLC', ' Inc.', ' Limited']
+
+
+def make_names(rng, count):
+    names, seen = [], set()
+    while len(names) < count:
+        brand = ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))).title()
+        name = f'{brand} {rng.choice(INDUSTRY)}{rng.choice(SUFFIXES)}'
+        if normalize_company_name(name) not in seen:
+            seen.add(normalize_company_name(name))
+            names.append(name)
+    return names
+
+
+def typo(rng, text):
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    names = make_names(rng, args.companies)
+    weights = [int(rng.paretovariate(1.2)) for _ in names]
+    index = CompanySuggestIndex()
+    started = time.perf_counter()
+    index.load((i, name, weights[i], ()) for i, name in enumerate(names))
+    print(f'Indexed {len(index)} companies in {time.perf_counter() - started:.2f}s\n')
+
+    samples = [rng.choice(names) for _ in range(args.queries)]
+    workloads = {
+        '1-2 chars': [name[:rng.randint(1, 2)] for name in samples],
+        '3-6 chars': [name[:rng.randint(3, 6)] for name in samples],
+        'full brand': [name.split()[0] for name in samples],
+        'second word': [name.split()[1][:5] for name in samples],
+        'typo': [typo(rng, name.split()[0]) for name in samples if len(name.split()[0]) > 4],
+    }
+    # First pass includes building the cached top lists of busy prefixes; the second is steady state
+    for run in ('cold', 'warm'):
+        print(f"{run + ' query kind':<18}{'p50 (µs)':>10}{'p99 (µs)':>10}{'max (µs)':>10}{'hits/query':>12}")
+        for kind, queries in workloads.items():
+            timings, hits = [], 0
+            for query in queries:
+                started = time.perf_counter()
+                results = index.suggest(query, 8)
+                timings.append((time.perf_counter() - started) * 1e6)
+                hits += len(results)
+            timings.sort()
+            print(f'{kind:<18}{statistics.median(timings):>10.0f}{timings[int(len(timings) * 0.99)]:>10.0f}'
+                  f'{timings[-1]:>10.0f}{hits / len(queries):>12.1f}')
+        print()
+
+    started = time.perf_counter()
+    for i, name in enumerate(make_names(random.Random(99), 1000)):
+        index.upsert(args.companies + i, name, 1)
+    print(f'Incremental insert: {(time.perf_counter() - started) * 1e6 / 1000:.0f} µs per company')
+
+
+if __name__ == '__main__':
+    main()
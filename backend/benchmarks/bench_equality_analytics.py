@@ -0,0 +1,113 @@
+"""
+Benchmark the vectorized equality analytics against per-row Python aggregation.
+
+The Python baselines are the loops the endpoints used before: a dict of
+running sums per company (the old /api/equality/companies), and per-group
+lists sorted and walked for year-over-year changes and trend fits. Both
+sides get rows in the order the analytics queries load them (ORDER BY the
+group column) and the timings cover computation only; building the JSON
+payload is reported separately.
+
+Usage (from backend/):
+    python -m benchmarks.bench_equality_analytics --ratings 200000 --groups 2000 --years 30
+"""
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from services.equality_analytics import company_stats, company_summary, series_report, series_stats
+
+
+def python_company_summary(names, safety, pay_equality, culture):
+    stats = {}
+    for name, s, p, c in zip(names, safety, pay_equality, culture):
+        row = stats.setdefault(name, [0, 0.0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += s
+        row[2] += p
+        row[3] += c
+    return {name: (n, s / n, p / n, c / n) for name, (n, s, p, c) in stats.items()}
+
+
+def python_series_report(labels, years, values):
+    groups = {}
+    for label, year, value in zip(labels, years, values):
+        groups.setdefault(label, []).append((year, value))
+    report = {}
+    for label, points in groups.items():
+        points.sort()
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx if sxx else None
+        changes = [(b[1] - a[1]) for a, b in zip(points, points[1:])]
+        report[label] = (n, mean_y, points[-1], slope, changes)
+    latest = sorted(points[-1][1] for points in groups.values())
+    return report, latest
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ratings', type=int, default=200000)
+    parser.add_argument('--companies', type=int, default=5000)
+    parser.add_argument('--groups', type=int, default=2000, help='sectors / fields in the time series')
+    parser.add_argument('--years', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    company_names = [f'Company {i}' for i in range(args.companies)]
+    names = sorted(rng.choice(company_names) for _ in range(args.ratings))
+    metrics = [[round(rng.uniform(1, 5), 1) for _ in range(args.ratings)] for _ in range(3)]
+    labels = [f'Sector {g}' for g in range(args.groups) for _ in range(args.years)]
+    years = [1995 + y for _ in range(args.groups) for y in range(args.years)]
+    values = [rng.gauss(20, 5) for _ in labels]
+
+    # Arrays as the analytics module loads them from the database
+    names_array = np.array(names, dtype=object)
+    metric_arrays = [np.array(m) for m in metrics]
+    labels_array, years_array, values_array = np.array(labels, dtype=object), np.array(years), np.array(values)
+
+    # Same answers before timing anything
+    python_companies = python_company_summary(names, *metrics)
+    numpy_companies = {row['name']: row for row in company_summary(names_array, *metric_arrays)['companies']}
+    assert all(abs(numpy_companies[name]['avg_safety'] - round(stats[1], 2)) < 0.011
+               for name, stats in python_companies.items())
+    python_series, _ = python_series_report(labels, years, values)
+    numpy_series = {row['sector']: row for row in series_report(labels_array, years_array, values_array, 'sector')['groups']}
+    assert all(abs(numpy_series[label]['trend_per_year'] - round(stats[3], 4)) < 1e-3
+               for label, stats in python_series.items())
+
+    print(f"{'workload':<46}{'python (ms)':>12}{'numpy (ms)':>12}{'speed-up':>10}")
+    for workload, python_fn, numpy_fn in (
+        (f'company averages ({args.ratings} ratings)',
+         lambda: python_company_summary(names, *metrics),
+         lambda: company_stats(names_array, *metric_arrays)),
+        (f'series trends ({args.groups} groups x {args.years} years)',
+         lambda: python_series_report(labels, years, values),
+         lambda: series_stats(labels_array, years_array, values_array)),
+    ):
+        python_ms = time_calls(python_fn, args.repeat)
+        numpy_ms = time_calls(numpy_fn, args.repeat)
+        print(f'{workload:<46}{python_ms:>12.1f}{numpy_ms:>12.1f}{python_ms / numpy_ms:>9.1f}x')
+
+    print('\nJSON payload building (ms): companies '
+          f'{time_calls(lambda: company_summary(names_array, *metric_arrays), args.repeat) - time_calls(lambda: company_stats(names_array, *metric_arrays), args.repeat):.1f}, '
+          f'series {time_calls(lambda: series_report(labels_array, years_array, values_array, "sector"), args.repeat) - time_calls(lambda: series_stats(labels_array, years_array, values_array), args.repeat):.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark the company leaderboard's first pages.
+
+Generates synthetic scored company_stats rows and compares serving a page
+by sorting every row (what an unindexed ORDER BY would do) against
+services.leaderboard: a heap-selected top-K per ordering, patched in place
+as single companies are rescored.
+
+Usage (from backend/):
+    python -m benchmarks.bench_leaderboard --companies 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.leaderboard import METRICS, SORT_FIELDS, Leaderboard, sort_key
+
+PRIOR_WEIGHT = 10
+PRIOR_MEAN = 3.5
+
+
+def make_row(rng, name):
+    total = max(1, int(rng.paretovariate(1.2)))
+    row = {'name': name, 'sector': 'Technology', 'total_ratings': total}
+    for metric in METRICS:
+        metric_sum = total * rng.uniform(1, 5)
+        row[f'avg_{metric}'] = round(metric_sum / total, 1)
+        row[f'{metric}_score'] = (PRIOR_WEIGHT * PRIOR_MEAN + metric_sum) / (PRIOR_WEIGHT + total)
+    row['score'] = sum(row[f'{metric}_score'] for metric in METRICS) / len(METRICS)
+    return row
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--companies', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = [make_row(rng, f'Company {i}') for i in range(args.companies)]
+    leaderboard = Leaderboard(top_k=100)
+    leaderboard.load(rows)
+
+    print(f"{'ordering':<28}{'full sort p50 (ms)':>20}{'first build (ms)':>18}{'cached p50 (ms)':>17}{'max (ms)':>10}")
+    for sort in SORT_FIELDS:
+        for min_reviews in (1, 10):
+            key = sort_key(SORT_FIELDS[sort], True)
+            full_p50, _ = time_calls(
+                lambda: sorted((r for r in rows if r['total_ratings'] >= min_reviews), key=key)[:args.per_page], 5
+            )
+            started = time.perf_counter()
+            leaderboard.page(sort, True, 0, args.per_page, min_reviews)
+            build_ms = (time.perf_counter() - started) * 1000
+            cached_p50, cached_max = time_calls(
+                lambda: leaderboard.page(sort, True, 0, args.per_page, min_reviews), args.repeat
+            )
+            label = f'{sort} (min {min_reviews})'
+            print(f'{label:<28}{full_p50:>20.2f}{build_ms:>18.2f}{cached_p50:>17.4f}{cached_max:>10.4f}')
+
+    updates = [make_row(rng, f'Company {rng.randrange(args.companies)}') for _ in range(1000)]
+    started = time.perf_counter()
+    for row in updates:
+        leaderboard.update(row)
+    per_update = (time.perf_counter() - started) * 1e6 / len(updates)
+    print(f'\nIncremental update with {len(SORT_FIELDS) * 2} cached orderings: {per_update:.1f} µs per company')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark post full-text search against the LIKE scan it replaces.
+
+Builds a throwaway SQLite database with synthetic posts, creates the FTS5
+index through services.post_search and times a set of queries both ways.
+
+Usage (from backend/):
+    python -m benchmarks.bench_post_search --posts 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from services import post_search
+
+WORDS = (
+    'safety work harassment support community education career travel night '
+    'police helpline legal rights salary equal pay mentor family health '
+    'mental stress college job interview office commute bus metro friend '
+    'advice scheme loan business startup skill learning hostel landlord '
+).split()
+CATEGORIES = ['Workplace Harassment', 'Domestic Violence', 'Public Safety', 'Education', 'Other']
+QUERIES = ['safety', 'equal pay', 'night commute', 'legal rights helpline', 'mentor career startup', 'landl']
+SYLLABLES = ['ka', 'ri', 'mo', 'su', 'te', 'la', 'vi', 'na', 'po', 'de', 'shi', 'ra']
+
+
+def build_vocabulary(rng, size=20000):
+    """Domain words plus pseudo-words, with Zipf-like weights so terms have realistic selectivity"""
+    vocabulary = list(WORDS)
+    while len(vocabulary) < size:
+        vocabulary.append(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    rng.shuffle(vocabulary)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    return vocabulary, cum_weights
+
+
+def build_database(engine, n_posts, batch_size=50000):
+    rng = random.Random(42)
+    vocabulary, cum_weights = build_vocabulary(rng)
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, title VARCHAR(200) NOT NULL, '
+            'content TEXT NOT NULL, category VARCHAR(50) NOT NULL)'
+        ))
+        conn.execute(text('CREATE INDEX ix_post_category ON post (category)'))
+    for start in range(0, n_posts, batch_size):
+        rows = [{
+            'title': ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=5)),
+            'content': ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(20, 80))),
+            'category': rng.choice(CATEGORIES),
+        } for _ in range(min(batch_size, n_posts - start))]
+        with engine.begin() as conn:
+            conn.execute(text('INSERT INTO post (title, content, category) VALUES (:title, :content, :category)'), rows)
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine('sqlite:///' + os.path.join(tmp, 'bench.db'))
+
+        started = time.perf_counter()
+        build_database(engine, args.posts)
+        print(f'Inserted {args.posts} posts in {time.perf_counter() - started:.1f}s')
+
+        started = time.perf_counter()
+        with engine.begin() as conn:
+            post_search.create_search_index(conn)
+        print(f'Built FTS index in {time.perf_counter() - started:.1f}s\n')
+
+        print(f"{'query':<24}{'LIKE scan (ms)':>16}{'FTS page 1 (ms)':>18}{'FTS page 2 (ms)':>18}{'+category (ms)':>16}")
+        with engine.connect() as conn:
+            for query in QUERIES:
+                like = time_calls(lambda: conn.execute(
+                    text('SELECT id FROM post WHERE content LIKE :q ORDER BY id DESC LIMIT 20'),
+                    {'q': f'%{query}%'}
+                ).fetchall(), args.repeat)
+                first = time_calls(lambda: post_search.search_posts(conn, query, limit=20), args.repeat)
+                _, cursor = post_search.search_posts(conn, query, limit=20)
+                second = time_calls(lambda: post_search.search_posts(conn, query, cursor=cursor, limit=20), args.repeat) if cursor else 0.0
+                filtered = time_calls(lambda: post_search.search_posts(conn, query, categories=['Education'], limit=20), args.repeat)
+                print(f'{query:<24}{like:>16.2f}{first:>18.2f}{second:>18.2f}{filtered:>16.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark the scheme retrieval index used to ground chatbot answers.
+
+Generates synthetic schemes (domain words mixed into a Zipf-distributed
+vocabulary), builds the BM25 index through
+services.scheme_retrieval and times queries, context assembly and
+incremental updates.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scheme_retrieval --schemes 50000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from services.scheme_retrieval import SchemeIndex
+
+TOPICS = (
+    'education scholarship school college girl child tuition hostel books '
+    'loan credit business entrepreneur startup self help group savings deposit '
+    'health maternity pregnant nutrition hospital insurance sanitation '
+    'pension widow elderly disability shelter legal aid violence survivor '
+    'skill training employment job apprenticeship stipend tailoring farming'
+).split()
+STATES = ['All India', 'Kerala', 'Bihar', 'Maharashtra', 'Tamil Nadu', 'Punjab', 'Assam', 'Gujarat', 'Odisha']
+CATEGORIES = ['Education', 'Financial', 'Health', 'Employment', 'Safety']
+SYLLABLES = ['ma', 'hi', 'la', 'shak', 'ti', 'nari', 'sam', 'rid', 'dhi', 'yo', 'ja', 'na', 'su', 'kan']
+QUERIES = [
+    'scholarship for girl child education',
+    'loan for women entrepreneur in kerala',
+    'pension for widow',
+    'maternity health benefits for pregnant women',
+    'legal aid for violence survivor shelter',
+    'skill training stipend bihar',
+]
+
+
+def build_vocabulary(rng, size=8000):
+    """Topic words plus pseudo-words, Zipf-weighted so term frequencies look like real text"""
+    vocabulary = list(TOPICS)
+    while len(vocabulary) < size:
+        vocabulary.append(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    rng.shuffle(vocabulary)
+    weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+    return vocabulary, weights
+
+
+def make_scheme(rng, scheme_id, vocabulary):
+    words, weights = vocabulary
+    name = ' '.join(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 3))).title() for _ in range(2))
+    return {
+        'id': scheme_id,
+        'name': f'{name} Yojana',
+        'description': ' '.join(rng.choices(words, weights, k=rng.randint(20, 60))),
+        'eligibility': ' '.join(rng.choices(words, weights, k=rng.randint(6, 15))),
+        'application_process': 'Apply at the district office or online portal',
+        'contact_info': f'Helpline 1800-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}',
+        'location': rng.choice(STATES),
+        'category': rng.choice(CATEGORIES),
+    }
+
+
+def time_calls(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--schemes', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = build_vocabulary(rng)
+    schemes = [make_scheme(rng, i, vocabulary) for i in range(1, args.schemes + 1)]
+    index = SchemeIndex()
+
+    started = time.perf_counter()
+    index.load(schemes)
+    print(f'Indexed {len(index)} schemes in {time.perf_counter() - started:.2f}s\n')
+
+    print(f"{'query':<44}{'search p50 (ms)':>16}{'max (ms)':>10}{'context p50 (ms)':>18}")
+    for query in QUERIES:
+        search_p50, search_max = time_calls(lambda: index.search(query, 5), args.repeat)
+        context_p50, _ = time_calls(lambda: index.context(query, max_tokens=600), args.repeat)
+        print(f'{query:<44}{search_p50:>16.2f}{search_max:>10.2f}{context_p50:>18.2f}')
+
+    updates = [make_scheme(rng, rng.randint(1, args.schemes), vocabulary) for _ in range(1000)]
+    started = time.perf_counter()
+    for scheme in updates:
+        index.upsert(scheme)
+    per_update = (time.perf_counter() - started) * 1e6 / len(updates)
+    print(f'\nIncremental upsert: {per_update:.1f} µs per scheme')
+
+    context, ids = index.context(QUERIES[0], max_tokens=600)
+    print(f'Context for "{QUERIES[0]}": {len(ids)} schemes, ~{(len(context) + 3) // 4} tokens')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Replay recorded chatbot questions against the Flask app and report latency.
+
+Runs the real app in-process (Flask test clients, one per worker thread) on
+a throwaway SQLite database, with the stub LLM provider standing in for
+OpenAI/Groq so runs are free and repeatable. Per-stage timings come from the
+Server-Timing header the app emits (intent, retrieval, generation,
+db_read, db_write).
+
+Usage (from backend/):
+    python -m benchmarks.chatbot_replay --requests 2000 --workers 8 --output before.json
+    python -m benchmarks.chatbot_replay --llm-latency-ms 400 --llm-failure-rate 0.05
+    python -m benchmarks.chatbot_replay --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = os.path.join(BACKEND_DIR, 'benchmarks', 'chatbot_corpus.jsonl')
+STATES = ['All India', 'Kerala', 'Bihar', 'Maharashtra', 'Punjab', 'Gujarat']
+CATEGORIES = ['Education', 'Financial', 'Health', 'Employment', 'Safety']
+TOPICS = (
+    'scholarship girl child education loan entrepreneur self help group savings pension widow '
+    'maternity pregnant nutrition hostel working women skill training stipend legal aid shelter '
+    'subsidy farmer housing health insurance employment'
+).split()
+
+
+def configure_environment(args, tmp):
+    """Must run before the app is imported: the app reads its configuration at import time"""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tmp, 'replay.db')
+    os.environ['LLM_PROVIDERS'] = 'stub'
+    os.environ['LLM_STUB_LATENCY_MS'] = str(args.llm_latency_ms)
+    os.environ['LLM_STUB_FAILURE_RATE'] = str(args.llm_failure_rate)
+    os.environ['LLM_MAX_CONCURRENCY'] = str(args.llm_concurrency)
+    os.environ['INTENT_LOG_PATH'] = ''
+    # Measure answers, not quota rejections: the replay sends far more than a day's per-caller budget
+    os.environ['LLM_DAILY_TOKENS_USER'] = '0'
+    os.environ['LLM_DAILY_TOKENS_ANON'] = '0'
+    if not args.cache:
+        os.environ['CHATBOT_CACHE_SIZE'] = '0'
+    # The Twilio client is created at import and needs credentials of the right shape
+    os.environ.setdefault('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+    os.environ.setdefault('TWILIO_AUTH_TOKEN', 'replay')
+
+
+def seed_database(appmod, workers, schemes, rng):
+    from flask_jwt_extended import create_access_token
+
+    with appmod.app.app_context():
+        appmod.db.create_all()
+        for i in range(schemes):
+            appmod.db.session.add(appmod.GovernmentScheme(
+                name=f"{rng.choice(TOPICS).title()} {rng.choice(TOPICS).title()} Scheme {i}",
+                description=' '.join(rng.choices(TOPICS, k=25)),
+                eligibility=' '.join(rng.choices(TOPICS, k=8)),
+                application_process='Apply at the district office',
+                contact_info='1800-000-0000',
+                location=rng.choice(STATES),
+                category=rng.choice(CATEGORIES)
+            ))
+        users = [appmod.User(username=f'replay{i}', email=f'replay{i}@example.com', password_hash='x')
+                 for i in range(workers)]
+        appmod.db.session.add_all(users)
+        appmod.db.session.commit()
+        return [{'Authorization': 'Bearer ' + create_access_token(identity=user.id)} for user in users]
+
+
+def parse_server_timing(header):
+    stages = {}
+    for part in (header or '').split(','):
+        name, _, duration = part.strip().partition(';dur=')
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+
+def load_corpus(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_worker(appmod, headers, items, multi_turn, unavailable_message, results):
+    client = appmod.app.test_client()
+    thread_id = None
+    for item in items:
+        started = time.perf_counter()
+        if item['endpoint'] == 'ask':
+            response = client.post('/ask', json={'question': item['question']}, headers=headers)
+            answer = (response.get_json() or {}).get('answer', '')
+        else:
+            body = {'message': item['question']}
+            if multi_turn and thread_id:
+                body['thread_id'] = thread_id
+            response = client.post('/api/chatbot/query', json=body, headers=headers)
+            payload = response.get_json() or {}
+            answer = payload.get('response', '')
+            thread_id = payload.get('thread_id', thread_id)
+        results.append({
+            'endpoint': item['endpoint'],
+            'status': response.status_code,
+            'ok': response.status_code == 200 and answer != unavailable_message,
+            'latency_ms': (time.perf_counter() - started) * 1000,
+            'stages': parse_server_timing(response.headers.get('Server-Timing')),
+        })
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def summarize(results, elapsed, workers):
+    report = {'endpoints': {}}
+    for endpoint in sorted({r['endpoint'] for r in results}) + ['all']:
+        rows = [r for r in results if endpoint == 'all' or r['endpoint'] == endpoint]
+        latencies = [r['latency_ms'] for r in rows]
+        stages = {}
+        for name in sorted({name for r in rows for name in r['stages']}):
+            values = [r['stages'][name] for r in rows if name in r['stages']]
+            stages[name] = {
+                'count': len(values),
+                'mean_ms': round(statistics.mean(values), 3),
+                'p95_ms': round(percentile(values, 95), 3),
+            }
+        report['endpoints'][endpoint] = {
+            'requests': len(rows),
+            'errors': sum(not r['ok'] for r in rows),
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p90_ms': round(percentile(latencies, 90), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'max_ms': round(max(latencies), 3) if latencies else 0.0,
+            'stages': stages,
+        }
+    throughput = len(results) / elapsed if elapsed else 0.0
+    report['throughput_rps'] = round(throughput, 2)
+    report['throughput_per_worker_rps'] = round(throughput / workers, 2)
+    report['elapsed_s'] = round(elapsed, 3)
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report):
+    config = report['config']
+    print(f"revision {report.get('revision')}  workers={config['workers']}  "
+          f"llm latency={config['llm_latency_ms']}ms failure rate={config['llm_failure_rate']}")
+    print(f"throughput {report['throughput_rps']} req/s ({report['throughput_per_worker_rps']} per worker)\n")
+    print(f"{'endpoint':<10}{'reqs':>7}{'errors':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  stages (mean ms)")
+    for endpoint, row in report['endpoints'].items():
+        stages = ' '.join(f"{name}={stage['mean_ms']:.2f}" for name, stage in row['stages'].items())
+        print(f"{endpoint:<10}{row['requests']:>7}{row['errors']:>8}{row['p50_ms']:>10.1f}{row['p90_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}  {stages}")
+
+
+def compare(base_path, new_path, tolerance, min_delta_ms=1.0):
+    """
+    Print per-metric changes; returns True when any latency got worse by more
+    than ``tolerance`` (relative) and ``min_delta_ms`` (absolute)
+    """
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{base.get('revision')} -> {new.get('revision')}\n")
+    regressed = False
+
+    def line(label, before, after, higher_is_worse=True):
+        nonlocal regressed
+        change = (after - before) / before if before else 0.0
+        if higher_is_worse:
+            worse = change > tolerance and after - before > min_delta_ms
+        else:
+            worse = change < -tolerance
+        regressed |= worse
+        print(f"  {label:<28}{before:>10.2f}{after:>10.2f}{change:>+9.1%}{'  <-- regression' if worse else ''}")
+
+    line('throughput req/s', base['throughput_rps'], new['throughput_rps'], higher_is_worse=False)
+    for endpoint, row in new['endpoints'].items():
+        old = base['endpoints'].get(endpoint)
+        if old is None:
+            continue
+        print(f"\n{endpoint}")
+        for metric in ('p50_ms', 'p90_ms', 'p99_ms'):
+            line(metric, old[metric], row[metric])
+        for name, stage in row['stages'].items():
+            if name in old['stages']:
+                line(f"{name} mean_ms", old['stages'][name]['mean_ms'], stage['mean_ms'])
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='JSONL of {"endpoint": "ask"|"chatbot", "question": ...}')
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--schemes', type=int, default=500, help='synthetic GovernmentScheme rows to seed')
+    parser.add_argument('--llm-latency-ms', type=int, default=50)
+    parser.add_argument('--llm-failure-rate', type=float, default=0.0)
+    parser.add_argument('--llm-concurrency', type=int, default=8)
+    parser.add_argument('--multi-turn', action='store_true', help='chatbot questions of a worker share one thread')
+    parser.add_argument('--cache', action='store_true', help='keep the answer cache enabled')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two JSON reports and exit')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='relative slowdown flagged by --compare')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.tolerance, args.min_delta_ms) else 0)
+
+    rng = random.Random(args.seed)
+    corpus = load_corpus(args.corpus)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args, tmp)
+        sys.path.insert(0, BACKEND_DIR)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as appmod
+        headers = seed_database(appmod, args.workers, args.schemes, rng)
+        # Warm-up: lazy indexes and caches are built outside the measured run
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_worker(appmod, headers[0], [{'endpoint': 'ask', 'question': 'list schemes'},
+                                            {'endpoint': 'chatbot', 'question': 'hello'}], False, None, [])
+
+        plan = [rng.choice(corpus) for _ in range(args.requests)]
+        results = []
+        threads = [
+            threading.Thread(target=run_worker, args=(
+                appmod, headers[i], plan[i::args.workers], args.multi_turn, appmod.LLM_UNAVAILABLE_MESSAGE, results
+            ))
+            for i in range(args.workers)
+        ]
+        started = time.perf_counter()
+        # The app logs every decision with print(); keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+        # The usage meter's flush thread would otherwise outlive the temporary database
+        appmod.usage_meter.stop()
+        with appmod.app.app_context():
+            appmod.db.engine.dispose()
+
+    report = summarize(results, elapsed, args.workers)
+    report['revision'] = git_revision()
+    report['config'] = {key: value for key, value in vars(args).items() if key not in ('compare', 'output', 'tolerance', 'min_delta_ms')}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
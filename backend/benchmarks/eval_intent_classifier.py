@@ -0,0 +1,92 @@
+"""
+Evaluate the local /ask intent classifier.
+
+By default runs k-fold cross-validation over the labelled seed set plus the
+LLM decision log: each fold trains a fresh model and classifies the held-out
+queries. With --model, evaluates an already trained model file instead.
+
+Reports the share of queries decided locally (= Groq classification calls
+saved), the accuracy of those local decisions, the end-to-end accuracy when
+uncertain queries fall back to the LLM (assumed correct) and the latency of
+a local decision.
+
+Usage (from backend/):
+    python -m benchmarks.eval_intent_classifier
+    python -m benchmarks.eval_intent_classifier --model data/intent_model.json --data queries.jsonl
+"""
+import argparse
+import os
+import random
+import time
+
+from services import intent_classifier
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA = os.path.join(BACKEND_DIR, 'data', 'intent_seed.jsonl')
+DEFAULT_LOG = os.path.join(BACKEND_DIR, 'instance', 'intent_log.jsonl')
+
+
+def score(classifier, examples):
+    stats = {'total': len(examples), 'local': 0, 'local_correct': 0, 'rules': 0, 'seconds': 0.0}
+    for text, label in examples:
+        started = time.perf_counter()
+        prediction = classifier.predict(text)
+        stats['seconds'] += time.perf_counter() - started
+        if prediction.intent is None:
+            continue
+        stats['local'] += 1
+        stats['rules'] += prediction.source == 'rules'
+        stats['local_correct'] += prediction.intent == label
+    return stats
+
+
+def merge(totals, stats):
+    for key, value in stats.items():
+        totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def report(stats):
+    total, local = stats['total'], stats['local']
+    fallbacks = total - local
+    print(f"queries:                {total}")
+    print(f"decided locally:        {local} ({local / total:.1%}), {stats['rules']} by keyword rules")
+    print(f"LLM calls saved:        {local} of {total}")
+    print(f"LLM fallbacks:          {fallbacks}")
+    if local:
+        print(f"local accuracy:         {stats['local_correct'] / local:.1%}")
+    print(f"end-to-end accuracy:    {(stats['local_correct'] + fallbacks) / total:.1%} (LLM assumed right on fallbacks)")
+    print(f"mean decision latency:  {stats['seconds'] / total * 1e6:.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data', action='append', help='labelled JSONL file(s); defaults to the seed set and decision log')
+    parser.add_argument('--model', help='evaluate this trained model instead of cross-validating')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=None)
+    args = parser.parse_args()
+
+    examples = intent_classifier.load_examples(*(args.data or [DEFAULT_DATA, DEFAULT_LOG]))
+    if not examples:
+        parser.error('no labelled examples found')
+
+    if args.model:
+        classifier = intent_classifier.IntentClassifier.load(args.model, args.threshold)
+        report(score(classifier, examples))
+        return
+
+    random.Random(7).shuffle(examples)
+    totals = {}
+    for fold in range(args.folds):
+        held_out = examples[fold::args.folds]
+        training = [example for i, example in enumerate(examples) if i % args.folds != fold]
+        model = intent_classifier.train(training)
+        classifier = intent_classifier.IntentClassifier(model, args.threshold)
+        merge(totals, score(classifier, held_out))
+    print(f"{args.folds}-fold cross-validation\n")
+    report(totals)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+"""
+Flask extension instances, created unbound and initialised on the app in app.py.
+
+Models and blueprints import ``db`` from here instead of from app, so they
+can be imported without importing (or re-running) the application module.
+"""
+from flask_sqlalchemy import SQLAlchemy
+from flask_jwt_extended import JWTManager
+from flask_mail import Mail
+from flask_migrate import Migrate
+
+db = SQLAlchemy()
+jwt = JWTManager()
+mail = Mail()
+migrate = Migrate()
@@ -0,0 +1,22 @@
+"""
+Gunicorn settings, read automatically when gunicorn starts in backend/.
+
+The app is imported once in the master (preload_app) and workers are forked
+from it, so imported code, the intent model and other read-only state are
+shared copy-on-write and workers boot without re-importing. Nothing that
+holds a socket may cross the fork: each worker drops the inherited database
+pool and opens its own connections, and the background flush threads start
+lazily inside the worker that first needs them.
+"""
+import os
+
+preload_app = True
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+
+def post_fork(server, worker):
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
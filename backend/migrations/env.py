@@ -51,6 +51,25 @@ def get_metadata():
     return target_db.metadata
 
 
+# Post search (services/post_search.py) is created outside the models: the
+# SQLite FTS5 table post_fts with its shadow tables, and on Postgres the
+# post.search_vector column with its GIN index
+POST_SEARCH_INDEXES = {'ix_post_search_vector'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from dropping the post search objects the models don't declare"""
+    if not reflected or compare_to is not None:
+        return True
+    if type_ == 'table':
+        return not name.startswith('post_fts')
+    if type_ == 'column':
+        return not (name == 'search_vector' and object.table.name == 'post')
+    if type_ == 'index':
+        return name not in POST_SEARCH_INDEXES
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +84,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +113,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
@@ -0,0 +1,72 @@
+"""Add equality analytics tables (pay gap, leadership, field ratio, feedback, company registry)
+
+Revision ID: 101733d98ba7
+Revises: c51d340c0f04
+Create Date: 2026-10-19 16:32:45.871306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '101733d98ba7'
+down_revision = 'c51d340c0f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('gender_pay_gap',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sector', sa.String(length=100), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('pay_gap_percentage', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('leadership_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sector', sa.String(length=100), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('women_in_leadership', sa.Float(), nullable=False),
+    sa.Column('total_positions', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('field_ratio',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('field_name', sa.String(length=100), nullable=False),
+    sa.Column('women_count', sa.Integer(), nullable=False),
+    sa.Column('men_count', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('feedback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('email', sa.String(length=120), nullable=False),
+    sa.Column('feedback_type', sa.String(length=50), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('company',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('industry', sa.String(length=100), nullable=False),
+    sa.Column('employee_count', sa.Integer(), nullable=True),
+    sa.Column('gender_equality_score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('company')
+    op.drop_table('feedback')
+    op.drop_table('field_ratio')
+    op.drop_table('leadership_stats')
+    op.drop_table('gender_pay_gap')
@@ -0,0 +1,33 @@
+"""Add company_stats.revision and company.scored_revision
+
+Revision ID: 2932ae2e4cdf
+Revises: fecf83cff857
+Create Date: 2026-10-19 19:41:37.208964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2932ae2e4cdf'
+down_revision = 'fecf83cff857'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+
+    # NULL: not scored from ratings yet, so the first `flask score-companies` visits every rated company
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('scored_revision', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.drop_column('scored_revision')
+
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        batch_op.drop_column('revision')
@@ -0,0 +1,54 @@
+"""Add timeline_entry and connection/post indexes
+
+Revision ID: 29e85ff6d741
+Revises: 875f3c9b3de7
+Create Date: 2026-10-19 12:05:18.640211
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '29e85ff6d741'
+down_revision = '875f3c9b3de7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('timeline_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['author_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'post_id', name='uq_timeline_user_post')
+    )
+    with op.batch_alter_table('timeline_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_entry_post_id', ['post_id'], unique=False)
+
+    with op.batch_alter_table('connection', schema=None) as batch_op:
+        batch_op.create_index('ix_connection_user_status', ['user_id', 'status'], unique=False)
+        batch_op.create_index('ix_connection_connected_user_status', ['connected_user_id', 'status'], unique=False)
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_post_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_post_user_id'))
+
+    with op.batch_alter_table('connection', schema=None) as batch_op:
+        batch_op.drop_index('ix_connection_connected_user_status')
+        batch_op.drop_index('ix_connection_user_status')
+
+    with op.batch_alter_table('timeline_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_entry_post_id')
+
+    op.drop_table('timeline_entry')
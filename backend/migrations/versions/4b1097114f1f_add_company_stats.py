@@ -0,0 +1,36 @@
+"""Add company_stats aggregate and backfill it from company_rating
+
+Revision ID: 4b1097114f1f
+Revises: 5258fc904070
+Create Date: 2026-10-19 15:03:52.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1097114f1f'
+down_revision = '5258fc904070'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('company_stats',
+    sa.Column('company_name', sa.String(length=200), nullable=False),
+    sa.Column('total_ratings', sa.Integer(), nullable=False),
+    sa.Column('safety_sum', sa.Float(), nullable=False),
+    sa.Column('pay_equality_sum', sa.Float(), nullable=False),
+    sa.Column('culture_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('company_name')
+    )
+    op.execute(
+        "INSERT INTO company_stats (company_name, total_ratings, safety_sum, pay_equality_sum, culture_sum) "
+        "SELECT company_name, COUNT(id), SUM(safety_rating), SUM(pay_equality_rating), SUM(culture_rating) "
+        "FROM company_rating GROUP BY company_name"
+    )
+
+
+def downgrade():
+    op.drop_table('company_stats')
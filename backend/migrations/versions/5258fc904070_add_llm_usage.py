@@ -0,0 +1,39 @@
+"""Add llm_usage
+
+Revision ID: 5258fc904070
+Revises: a2634ee33c48
+Create Date: 2026-10-19 14:21:07.530812
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5258fc904070'
+down_revision = 'a2634ee33c48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_usage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=64), nullable=False),
+    sa.Column('endpoint', sa.String(length=64), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('requests', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('subject', 'endpoint', 'day', name='uq_llm_usage_subject_endpoint_day')
+    )
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.create_index('ix_llm_usage_day', ['day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('llm_usage', schema=None) as batch_op:
+        batch_op.drop_index('ix_llm_usage_day')
+
+    op.drop_table('llm_usage')
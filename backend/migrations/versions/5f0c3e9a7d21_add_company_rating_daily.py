@@ -0,0 +1,43 @@
+"""Add company_rating_daily rollups
+
+Revision ID: 5f0c3e9a7d21
+Revises: 2932ae2e4cdf
+Create Date: 2026-10-19 20:15:08.731642
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c3e9a7d21'
+down_revision = '2932ae2e4cdf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('company_rating_daily',
+    sa.Column('company_name', sa.String(length=200), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('total_ratings', sa.Integer(), nullable=False),
+    sa.Column('safety_sum', sa.Float(), nullable=False),
+    sa.Column('pay_equality_sum', sa.Float(), nullable=False),
+    sa.Column('culture_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('company_name', 'day')
+    )
+    with op.batch_alter_table('company_rating_daily', schema=None) as batch_op:
+        batch_op.create_index('ix_company_rating_daily_day', ['day'], unique=False)
+
+    op.execute(
+        "INSERT INTO company_rating_daily (company_name, day, total_ratings, safety_sum, pay_equality_sum, culture_sum) "
+        "SELECT company_name, DATE(created_at), COUNT(id), SUM(safety_rating), SUM(pay_equality_rating), "
+        "SUM(culture_rating) FROM company_rating GROUP BY company_name, DATE(created_at)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('company_rating_daily', schema=None) as batch_op:
+        batch_op.drop_index('ix_company_rating_daily_day')
+
+    op.drop_table('company_rating_daily')
@@ -0,0 +1,33 @@
+"""Add full-text search index for posts
+
+Revision ID: 71c561ab867e
+Revises: 25205e35ed70
+Create Date: 2026-10-19 10:52:04.118310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from services import post_search
+
+
+# revision identifiers, used by Alembic.
+revision = '71c561ab867e'
+down_revision = '25205e35ed70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    post_search.create_search_index(op.get_bind())
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_post_search_vector')
+        op.execute('ALTER TABLE post DROP COLUMN IF EXISTS search_vector')
+    else:
+        for trigger in ('post_fts_ai', 'post_fts_ad', 'post_fts_au'):
+            op.execute('DROP TRIGGER IF EXISTS %s' % trigger)
+        op.execute('DROP TABLE IF EXISTS post_fts')
@@ -0,0 +1,28 @@
+"""Add like_count to Post
+
+Revision ID: 875f3c9b3de7
+Revises: 71c561ab867e
+Create Date: 2026-10-19 11:20:37.552914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '875f3c9b3de7'
+down_revision = '71c561ab867e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('like_count', sa.Integer(), nullable=False, server_default='0'))
+
+    op.execute('UPDATE post SET like_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = post.id)')
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('like_count')
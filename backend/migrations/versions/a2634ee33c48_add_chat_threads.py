@@ -0,0 +1,52 @@
+"""Add chat_thread and chat_message.thread_id
+
+Revision ID: a2634ee33c48
+Revises: 29e85ff6d741
+Create Date: 2026-10-19 13:02:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2634ee33c48'
+down_revision = '29e85ff6d741'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_thread',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=True),
+    sa.Column('summarized_until_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('last_message_id', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_thread_user_last_message', ['user_id', 'last_message_id'], unique=False)
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thread_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_chat_message_thread_id', 'chat_thread', ['thread_id'], ['id'])
+        batch_op.create_index('ix_chat_message_thread_id_id', ['thread_id', 'id'], unique=False)
+        batch_op.create_index('ix_chat_message_user_id_id', ['user_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_message_user_id_id')
+        batch_op.drop_index('ix_chat_message_thread_id_id')
+        batch_op.drop_constraint('fk_chat_message_thread_id', type_='foreignkey')
+        batch_op.drop_column('thread_id')
+
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_thread_user_last_message')
+
+    op.drop_table('chat_thread')
@@ -0,0 +1,79 @@
+"""Add company.normalized_name, company_alias and company_rating.company_id
+
+Revision ID: a26838bf6432
+Revises: b637a7105d1d
+Create Date: 2026-10-19 18:24:51.402117
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.company_names import normalize_company_name
+
+
+# revision identifiers, used by Alembic.
+revision = 'a26838bf6432'
+down_revision = 'b637a7105d1d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('normalized_name', sa.String(length=200), nullable=True))
+        batch_op.alter_column('industry', existing_type=sa.String(length=100), nullable=True)
+        batch_op.create_unique_constraint('uq_company_normalized_name', ['normalized_name'])
+
+    op.create_table('company_alias',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('alias', sa.String(length=200), nullable=False),
+    sa.Column('alias_key', sa.String(length=200), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['company.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('alias_key')
+    )
+    with op.batch_alter_table('company_alias', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_company_alias_company_id'), ['company_id'], unique=False)
+
+    # Normalize the registry: the first company with each key gets it and its self-alias; later duplicates
+    # (and every rating's company_id) are left for `flask merge-company-names`
+    bind = op.get_bind()
+    company = sa.table('company', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                       sa.column('normalized_name', sa.String))
+    company_alias = sa.table('company_alias', sa.column('company_id', sa.Integer), sa.column('alias', sa.String),
+                             sa.column('alias_key', sa.String), sa.column('created_at', sa.DateTime))
+    seen = set()
+    for company_id, name in bind.execute(sa.select(company.c.id, company.c.name).order_by(company.c.id)).all():
+        key = normalize_company_name(name)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        bind.execute(company.update().where(company.c.id == company_id).values(normalized_name=key))
+        bind.execute(company_alias.insert().values(company_id=company_id, alias=name, alias_key=key,
+                                                   created_at=datetime.utcnow()))
+
+    with op.batch_alter_table('company_rating', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('company_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_company_rating_company_id', 'company', ['company_id'], ['id'])
+        batch_op.create_index('ix_company_rating_company_id_user_id', ['company_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('company_rating', schema=None) as batch_op:
+        batch_op.drop_index('ix_company_rating_company_id_user_id')
+        batch_op.drop_constraint('fk_company_rating_company_id', type_='foreignkey')
+        batch_op.drop_column('company_id')
+
+    with op.batch_alter_table('company_alias', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_company_alias_company_id'))
+
+    op.drop_table('company_alias')
+
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_company_normalized_name', type_='unique')
+        batch_op.alter_column('industry', existing_type=sa.String(length=100), nullable=False)
+        batch_op.drop_column('normalized_name')
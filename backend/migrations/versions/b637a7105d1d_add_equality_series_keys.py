@@ -0,0 +1,37 @@
+"""Unique (sector, year) / (field_name, year) keys on the equality series tables
+
+Revision ID: b637a7105d1d
+Revises: 101733d98ba7
+Create Date: 2026-10-19 17:10:26.093518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b637a7105d1d'
+down_revision = '101733d98ba7'
+branch_labels = None
+depends_on = None
+
+KEYS = (
+    ('gender_pay_gap', 'uq_gender_pay_gap_sector_year', ['sector', 'year']),
+    ('leadership_stats', 'uq_leadership_stats_sector_year', ['sector', 'year']),
+    ('field_ratio', 'uq_field_ratio_field_name_year', ['field_name', 'year']),
+)
+
+
+def upgrade():
+    for table, name, columns in KEYS:
+        # Rows posted one at a time may repeat a key: keep the newest of each
+        key = ', '.join(columns)
+        op.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {key})")
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(name, columns)
+
+
+def downgrade():
+    for table, name, columns in reversed(KEYS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_constraint(name, type_='unique')
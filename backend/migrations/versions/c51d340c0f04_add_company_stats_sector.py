@@ -0,0 +1,26 @@
+"""Add company_stats.sector
+
+Revision ID: c51d340c0f04
+Revises: 4b1097114f1f
+Create Date: 2026-10-19 15:47:19.660231
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c51d340c0f04'
+down_revision = '4b1097114f1f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sector', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        batch_op.drop_column('sector')
@@ -0,0 +1,35 @@
+"""Add Bayesian score columns to company_stats
+
+Revision ID: fecf83cff857
+Revises: a26838bf6432
+Create Date: 2026-10-19 19:02:13.557480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fecf83cff857'
+down_revision = 'a26838bf6432'
+branch_labels = None
+depends_on = None
+
+SCORES = ('safety_score', 'pay_equality_score', 'culture_score', 'score')
+
+
+def upgrade():
+    # Filled in by `flask rebuild-company-stats`, or on the first leaderboard request
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        for column in SCORES:
+            batch_op.add_column(sa.Column(column, sa.Float(), nullable=False, server_default='0'))
+        for column in SCORES + ('total_ratings',):
+            batch_op.create_index(f'ix_company_stats_{column}', [column], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('company_stats', schema=None) as batch_op:
+        for column in reversed(SCORES + ('total_ratings',)):
+            batch_op.drop_index(f'ix_company_stats_{column}')
+        for column in reversed(SCORES):
+            batch_op.drop_column(column)
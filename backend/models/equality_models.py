@@ -1,4 +1,4 @@
-from app import db
+from extensions import db
 from datetime import datetime
 
 class GenderPayGap(db.Model):
@@ -8,6 +8,9 @@ class GenderPayGap(db.Model):
     pay_gap_percentage = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # One figure per sector and year; also the index for sector + year-range reads
+    __table_args__ = (db.UniqueConstraint('sector', 'year', name='uq_gender_pay_gap_sector_year'),)
+
 class LeadershipStats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sector = db.Column(db.String(100), nullable=False)
@@ -16,6 +19,8 @@ class LeadershipStats(db.Model):
     total_positions = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.UniqueConstraint('sector', 'year', name='uq_leadership_stats_sector_year'),)
+
 class FieldRatio(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     field_name = db.Column(db.String(100), nullable=False)
@@ -24,6 +29,8 @@ class FieldRatio(db.Model):
     year = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (db.UniqueConstraint('field_name', 'year', name='uq_field_ratio_field_name_year'),)
+
 class Feedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -35,7 +42,20 @@ class Feedback(db.Model):
 class Company(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False, unique=True)
-    industry = db.Column(db.String(100), nullable=False)
+    # services.company_names.normalize_company_name(name); NULL only for rows awaiting `flask merge-company-names`
+    normalized_name = db.Column(db.String(200), nullable=True, unique=True)
+    industry = db.Column(db.String(100), nullable=True)  # unknown for companies first seen in a rating
     employee_count = db.Column(db.Integer, nullable=True)
+    # Derived from ratings by `flask score-companies` once the company has any; scored_revision is the
+    # CompanyStats.revision it was computed from
     gender_equality_score = db.Column(db.Float, nullable=False, default=0.0)
+    scored_revision = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CompanyAlias(db.Model):
+    """Normalized spellings that resolve to a company, its own normalized name included"""
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False, index=True)
+    alias = db.Column(db.String(200), nullable=False)
+    alias_key = db.Column(db.String(200), nullable=False, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
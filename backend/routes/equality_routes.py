@@ -1,24 +1,102 @@
+import os
 from flask import Blueprint, request, jsonify
-from app import db
-from models.equality_models import GenderPayGap, LeadershipStats, FieldRatio, Feedback, Company
+from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import Session
+from access import current_user_is_admin
+from extensions import db
+from models.equality_models import GenderPayGap, LeadershipStats, FieldRatio, Feedback, Company, CompanyAlias
+from services.company_names import display_name, normalize_company_name
+from services.equality_ingest import DATASETS, IngestError, parse_payload, validate_rows
+from services.equality_analytics import EqualityAnalytics
+from services.table_versions import TableVersions
+from services.upserts import insert_ignore, upsert
 from datetime import datetime
 
 equality_bp = Blueprint('equality', __name__, url_prefix='/api/equality')
 
+DATASET_MODELS = {'paygap': GenderPayGap, 'leadership': LeadershipStats, 'fields': FieldRatio}
+INGEST_BATCH_SIZE = 500
+
+# Analytics reports are recomputed only after a commit touches their source table (or after the TTL,
+# which bounds staleness from other worker processes)
+table_versions = TableVersions()
+table_versions.watch(Session, ['gender_pay_gap', 'leadership_stats', 'field_ratio', 'company_rating'])
+analytics = EqualityAnalytics(db.metadata.tables, table_versions,
+                              ttl_seconds=int(os.getenv('EQUALITY_ANALYTICS_TTL', '600')))
+
+def filter_years(query, model):
+    """Apply ?year= or the inclusive ?year_from=/&year_to= range"""
+    year = request.args.get('year', type=int)
+    year_from = request.args.get('year_from', type=int)
+    year_to = request.args.get('year_to', type=int)
+    if year:
+        query = query.filter(model.year == year)
+    if year_from:
+        query = query.filter(model.year >= year_from)
+    if year_to:
+        query = query.filter(model.year <= year_to)
+    return query
+
+def upsert_rows(dataset, rows):
+    """Insert or overwrite validated rows on the dataset's (name, year) key, in batches, in one transaction"""
+    spec = DATASETS[dataset]
+    table = DATASET_MODELS[dataset].__table__
+    statement = upsert(db.session.connection(), table, list(spec['key']),
+                       [field.name for field in spec['fields'] if field.name not in spec['key']])
+    for start in range(0, len(rows), INGEST_BATCH_SIZE):
+        db.session.execute(statement, rows[start:start + INGEST_BATCH_SIZE])
+    db.session.commit()
+
+@equality_bp.route('/<any(paygap, leadership, fields):dataset>/bulk', methods=['POST'])
+@jwt_required()
+def bulk_ingest(dataset):
+    """Load a CSV (body or multipart 'file') or JSON dataset; all rows are validated before any is written"""
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    upload = request.files.get('file')
+    if upload is not None:
+        text, content_type = upload.read().decode('utf-8', errors='replace'), upload.mimetype
+    else:
+        text, content_type = request.get_data(as_text=True), request.content_type
+    try:
+        rows = validate_rows(dataset, parse_payload(text, content_type))
+    except IngestError as e:
+        return jsonify({'error': str(e), 'errors': e.errors}), 400
+    upsert_rows(dataset, rows)
+    return jsonify({'message': f'{len(rows)} rows imported', 'rows': len(rows)}), 201
+
+@equality_bp.route('/analytics/<any(paygap, leadership, fields, companies):report>', methods=['GET'])
+def get_analytics(report):
+    """Trends, year-over-year changes and percentiles for one series (see services.equality_analytics)"""
+    return jsonify(analytics.report(db.session.connection(), report))
+
+def add_row(dataset, message):
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
+    try:
+        rows = validate_rows(dataset, [request.get_json() or {}])
+    except IngestError as e:
+        return jsonify({'error': 'Invalid data', 'errors': e.errors}), 400
+    # Insert-only: overwriting an existing (name, year) row is left to the bulk import
+    spec = DATASETS[dataset]
+    statement = insert_ignore(db.session.connection(), DATASET_MODELS[dataset].__table__, list(spec['key']))
+    if not db.session.execute(statement, rows[0]).rowcount:
+        db.session.rollback()
+        return jsonify({'error': f"A row for this {' and '.join(spec['key'])} already exists"}), 409
+    db.session.commit()
+    return jsonify({'message': message}), 201
+
 # Gender Pay Gap Routes
 @equality_bp.route('/paygap', methods=['GET'])
 def get_pay_gap():
     sector = request.args.get('sector')
-    year = request.args.get('year', type=int)
     
-    query = GenderPayGap.query
+    query = filter_years(GenderPayGap.query, GenderPayGap)
     
     if sector:
         query = query.filter_by(sector=sector)
-    if year:
-        query = query.filter_by(year=year)
     
-    pay_gaps = query.all()
+    pay_gaps = query.order_by(GenderPayGap.sector, GenderPayGap.year).all()
     return jsonify({
         'pay_gaps': [{
             'id': gap.id,
@@ -29,31 +107,21 @@ def get_pay_gap():
     })
 
 @equality_bp.route('/paygap', methods=['POST'])
+@jwt_required()
 def add_pay_gap():
-    data = request.get_json()
-    pay_gap = GenderPayGap(
-        sector=data['sector'],
-        year=data['year'],
-        pay_gap_percentage=data['pay_gap_percentage']
-    )
-    db.session.add(pay_gap)
-    db.session.commit()
-    return jsonify({'message': 'Pay gap data added successfully'}), 201
+    return add_row('paygap', 'Pay gap data added successfully')
 
 # Leadership Stats Routes
 @equality_bp.route('/leadership', methods=['GET'])
 def get_leadership_stats():
     sector = request.args.get('sector')
-    year = request.args.get('year', type=int)
     
-    query = LeadershipStats.query
+    query = filter_years(LeadershipStats.query, LeadershipStats)
     
     if sector:
         query = query.filter_by(sector=sector)
-    if year:
-        query = query.filter_by(year=year)
     
-    stats = query.all()
+    stats = query.order_by(LeadershipStats.sector, LeadershipStats.year).all()
     return jsonify({
         'stats': [{
             'id': stat.id,
@@ -65,32 +133,21 @@ def get_leadership_stats():
     })
 
 @equality_bp.route('/leadership', methods=['POST'])
+@jwt_required()
 def add_leadership_stats():
-    data = request.get_json()
-    stat = LeadershipStats(
-        sector=data['sector'],
-        year=data['year'],
-        women_in_leadership=data['women_in_leadership'],
-        total_positions=data['total_positions']
-    )
-    db.session.add(stat)
-    db.session.commit()
-    return jsonify({'message': 'Leadership stats added successfully'}), 201
+    return add_row('leadership', 'Leadership stats added successfully')
 
 # Field Ratio Routes
 @equality_bp.route('/fields', methods=['GET'])
 def get_field_ratios():
     field_name = request.args.get('field_name')
-    year = request.args.get('year', type=int)
     
-    query = FieldRatio.query
+    query = filter_years(FieldRatio.query, FieldRatio)
     
     if field_name:
         query = query.filter_by(field_name=field_name)
-    if year:
-        query = query.filter_by(year=year)
     
-    ratios = query.all()
+    ratios = query.order_by(FieldRatio.field_name, FieldRatio.year).all()
     return jsonify({
         'ratios': [{
             'id': ratio.id,
@@ -102,30 +159,34 @@ def get_field_ratios():
     })
 
 @equality_bp.route('/fields', methods=['POST'])
+@jwt_required()
 def add_field_ratio():
-    data = request.get_json()
-    ratio = FieldRatio(
-        field_name=data['field_name'],
-        women_count=data['women_count'],
-        men_count=data['men_count'],
-        year=data['year']
-    )
-    db.session.add(ratio)
-    db.session.commit()
-    return jsonify({'message': 'Field ratio added successfully'}), 201
+    return add_row('fields', 'Field ratio added successfully')
 
 # Feedback Routes
 @equality_bp.route('/feedback', methods=['GET'])
+@jwt_required()
 def get_feedback():
+    """
+    Newest first, one page at a time (?limit=, ?cursor= from next_cursor); /feedback/export streams everything.
+    Submitters' names and emails included, so admins only
+    """
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
     feedback_type = request.args.get('type')
+    before_id = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
     
     query = Feedback.query
     
     if feedback_type:
         query = query.filter_by(feedback_type=feedback_type)
+    if before_id:
+        query = query.filter(Feedback.id < before_id)
     
-    feedbacks = query.all()
+    feedbacks = query.order_by(Feedback.id.desc()).limit(limit).all()
     return jsonify({
+        'next_cursor': str(feedbacks[-1].id) if len(feedbacks) == limit else None,
         'feedback': [{
             'id': fb.id,
             'name': fb.name,
@@ -149,8 +210,8 @@ def add_feedback():
     db.session.commit()
     return jsonify({'message': 'Feedback submitted successfully'}), 201
 
-# Company Routes
-@equality_bp.route('/companies', methods=['GET'])
+# Company registry routes (/companies is the ratings aggregate served by app.py)
+@equality_bp.route('/registry', methods=['GET'])
 def get_companies():
     companies = Company.query.all()
     return jsonify({
@@ -163,15 +224,26 @@ def get_companies():
         } for company in companies]
     })
 
-@equality_bp.route('/companies', methods=['POST'])
+@equality_bp.route('/registry', methods=['POST'])
+@jwt_required()
 def add_company():
+    if not current_user_is_admin():
+        return jsonify({'error': 'Admin access required'}), 403
     data = request.get_json()
+    key = normalize_company_name(data['name'])
+    if not key:
+        return jsonify({'error': 'Company name is required'}), 400
+    if CompanyAlias.query.filter_by(alias_key=key).first() or Company.query.filter_by(normalized_name=key).first():
+        return jsonify({'error': 'Company already registered'}), 409
     company = Company(
-        name=data['name'],
+        name=display_name(data['name']),
+        normalized_name=key,
         industry=data['industry'],
         employee_count=data.get('employee_count'),
         gender_equality_score=data.get('gender_equality_score', 0.0)
     )
     db.session.add(company)
+    db.session.flush()
+    db.session.add(CompanyAlias(company_id=company.id, alias=company.name, alias_key=key))
     db.session.commit()
     return jsonify({'message': 'Company added successfully'}), 201
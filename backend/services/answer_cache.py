@@ -0,0 +1,112 @@
+"""
+Chatbot answer cache keyed on normalized question text.
+
+"What is the Domestic Violence helpline?" and "what is the domestic
+violence helpline" share an entry: keys are Unicode-normalized, lowercased,
+stripped of punctuation, whitespace-collapsed and (optionally) lemmatized.
+Entries expire after a TTL and the least recently used one is evicted when
+the cache is full. Only successful LLM answers should be stored.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+try:
+    from nltk.stem import WordNetLemmatizer
+    _wordnet = WordNetLemmatizer()
+    _wordnet.lemmatize('schemes')  # fails here if the wordnet corpus isn't downloaded
+except Exception:
+    _wordnet = None
+
+PUNCTUATION_RE = re.compile(r'[^\w\s]', re.UNICODE)
+
+
+def _light_lemma(word):
+    """Plural folding used when NLTK/wordnet isn't available"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'shes', 'ches', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def lemmatize(word):
+    return _wordnet.lemmatize(word) if _wordnet is not None else _light_lemma(word)
+
+
+def normalize_question(text, use_lemmas=True):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    words = PUNCTUATION_RE.sub(' ', text).split()
+    if use_lemmas:
+        words = [lemmatize(word) for word in words]
+    return ' '.join(words)
+
+
+class AnswerCache:
+    def __init__(self, max_entries=1000, ttl_seconds=24 * 3600, use_lemmas=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_lemmas = use_lemmas
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, answer)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+
+    def key_for(self, question):
+        return normalize_question(question, self.use_lemmas)
+
+    def get(self, namespace, question):
+        key = (namespace, self.key_for(question))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                self._stats['expirations'] += 1
+                entry = None
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, namespace, question, answer):
+        key = (namespace, self.key_for(question))
+        if not key[1] or not answer:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def purge(self, namespace=None):
+        """Drop every entry (or those of one namespace); returns how many were removed"""
+        with self._lock:
+            if namespace is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if key[0] == namespace]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                ttl_seconds=self.ttl_seconds,
+                hit_rate=round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                lemmatizer='wordnet' if _wordnet is not None else 'suffix-rules'
+            )
@@ -0,0 +1,98 @@
+"""
+Prompt assembly for multi-turn chat threads.
+
+The prompt for a new message is the system prompt(s), the thread's rolling
+summary and as many of the most recent turns as fit in a fixed token
+budget, newest kept first. Older turns are folded into the summary, which is
+extractive: the most salient sentence of each turn, trimmed back to its own
+budget by dropping the least salient lines. Neither step ever needs more
+than the last few turns of a thread, however long it grows.
+"""
+import re
+from collections import Counter
+
+from services.llm_gateway import estimate_tokens
+
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from had has have how i i'm if in into is it "
+    "its me my of on or please so that the their them there they this to was we what when where which "
+    "who why will with would you your".split()
+)
+TRUNCATE_CHARS = 240
+
+
+def _content_words(text):
+    return [word for word in WORD_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 2]
+
+
+def _truncate(text, limit=TRUNCATE_CHARS):
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit].rstrip() + '…'
+
+
+def _key_sentence(text, weights):
+    """Highest-scoring sentence of ``text`` by summed word weights (first sentence on ties)"""
+    sentences = [s for s in SENTENCE_RE.split(' '.join((text or '').split())) if s]
+    if not sentences:
+        return ''
+    return max(sentences, key=lambda s: (sum(weights[w] for w in set(_content_words(s))), -sentences.index(s)))
+
+
+def summarize_turns(previous_summary, turns, max_tokens=300):
+    """
+    Fold ``turns`` ([(user message, assistant response)], oldest first) into
+    ``previous_summary``; returns the new summary, at most ``max_tokens`` long.
+    """
+    lines = [line for line in (previous_summary or '').split('\n') if line.strip()]
+    weights = Counter()
+    for message, response in turns:
+        weights.update(_content_words(message))
+        weights.update(_content_words(response))
+    for message, response in turns:
+        asked = _truncate(_key_sentence(message, weights))
+        answered = _truncate(_key_sentence(response, weights))
+        lines.append(f"User: {asked} | Assistant: {answered}")
+
+    # Drop the least salient lines (by the words the conversation keeps coming back to)
+    # until the summary fits; the newest line is always kept
+    weights.update(word for line in lines for word in _content_words(line))
+    while len(lines) > 1 and estimate_tokens('\n'.join(lines)) > max_tokens:
+        scores = [sum(weights[w] for w in set(_content_words(line))) for line in lines[:-1]]
+        lines.pop(scores.index(min(scores)))
+    summary = '\n'.join(lines)
+    if estimate_tokens(summary) > max_tokens:
+        summary = summary[:max_tokens * 4].rstrip() + '…'
+    return summary
+
+
+def build_messages(system_messages, summary, turns, message, max_tokens=1500):
+    """
+    Chat messages for ``message`` given the thread ``summary`` and recent
+    ``turns`` (oldest first). System messages and the new message are always
+    included; the summary and then the newest turns fill what is left of
+    ``max_tokens``. Returns (messages, number of turns included).
+    """
+    head = [{"role": "system", "content": content} for content in system_messages]
+    tail = [{"role": "user", "content": message}]
+    budget = max_tokens - sum(estimate_tokens(m['content']) + 4 for m in head + tail)
+
+    if summary and budget > 0:
+        note = "Summary of the earlier conversation:\n" + summary
+        cost = estimate_tokens(note) + 4
+        if cost <= budget:
+            head.append({"role": "system", "content": note})
+            budget -= cost
+
+    history = []
+    for user_text, assistant_text in reversed(turns):
+        cost = estimate_tokens(user_text) + estimate_tokens(assistant_text) + 8
+        if cost > budget:
+            break
+        history[:0] = [
+            {"role": "user", "content": user_text},
+            {"role": "assistant", "content": assistant_text},
+        ]
+        budget -= cost
+    return head + history + tail, len(history) // 2
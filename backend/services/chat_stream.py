@@ -0,0 +1,48 @@
+"""
+Token streaming for chatbot responses, relayed to clients as Server-Sent Events.
+
+Every stream is a plain generator of text deltas. Closing it (which happens
+when the client disconnects and the WSGI server closes the response) also
+closes the upstream HTTP stream, so the provider stops generating.
+"""
+import json
+import time
+
+FAKE_RESPONSE = (
+    "Here is some general information. If you are in immediate danger, call the national "
+    "emergency number 112 or the women's helpline 181. You can also reach out to a local "
+    "protection officer or a trusted NGO for legal and emotional support."
+)
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event frame"""
+    frame = f"event: {event}\n" if event else ''
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+
+def openai_token_stream(client, messages, model='gpt-3.5-turbo', max_tokens=500, **options):
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        stream=True,
+        **options
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()
+
+
+def fake_token_stream(messages, token_delay=0.02, first_token_delay=0.05):
+    """Deterministic local stand-in for an LLM: echoes the question, then a canned answer word by word"""
+    question = messages[-1]['content'] if messages else ''
+    words = [f"You asked: {question.strip()}."] + FAKE_RESPONSE.split(' ')
+    time.sleep(first_token_delay)
+    for i, word in enumerate(words):
+        if i:
+            time.sleep(token_delay)
+        yield word if i == 0 else ' ' + word
@@ -0,0 +1,35 @@
+"""
+Company name normalization.
+
+"Google", "google " and "Google LLC" normalize to the same key: Unicode
+NFKC, case-folded, accents and punctuation removed, "&" read as "and", and
+legal-form suffixes (LLC, Inc., Pvt. Ltd., ...) and a leading "The"
+dropped. A name made only of such words keeps them rather than becoming
+empty.
+"""
+import re
+import unicodedata
+
+LEGAL_SUFFIXES = frozenset(
+    'llc inc incorporated ltd limited pvt private plc corp corporation co company gmbh llp lp ag sa bv nv pte'.split()
+)
+NON_WORD_RE = re.compile(r'[^\w]+', re.UNICODE)
+INITIALS_RE = re.compile(r'(?<!\w)(?:\w\.){2,}')  # S.A., U.S.A.
+
+
+def display_name(name):
+    """The name as entered, with whitespace collapsed"""
+    return ' '.join((name or '').split())
+
+
+def normalize_company_name(name):
+    text = unicodedata.normalize('NFKD', display_name(name).replace('&', ' and '))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = INITIALS_RE.sub(lambda m: m.group(0).replace('.', ''), text.replace("'", ''))
+    words = NON_WORD_RE.sub(' ', text).split()
+    core = list(words)
+    while len(core) > 1 and core[-1] in LEGAL_SUFFIXES:
+        core.pop()
+    if len(core) > 1 and core[0] == 'the':
+        core.pop(0)
+    return ' '.join(core or words)
@@ -0,0 +1,43 @@
+"""
+Sector assignment for rated companies.
+
+A company's registered industry (``Company.industry``) wins when there is
+one; otherwise the name is matched against per-sector keywords. Keywords
+match whole words only, with an optional suffix for stems such as
+``tech``/``technologies``, so "IT Services" is Technology but "Deloitte" is
+not.
+"""
+import re
+
+OTHER = 'Other'
+
+# Checked in order; the first sector with a matching word wins
+SECTOR_KEYWORDS = (
+    ('Technology', ('tech*', 'software', 'it', 'digital*', 'infotech')),
+    ('Healthcare', ('health*', 'medical', 'hospital*', 'care', 'pharma*')),
+    ('Finance', ('bank*', 'financ*', 'investment*', 'insurance')),
+    ('Education', ('school*', 'college*', 'universit*', 'education*')),
+)
+
+
+def _pattern(keywords):
+    words = '|'.join(re.escape(k[:-1]) + r'\w*' if k.endswith('*') else re.escape(k) for k in keywords)
+    return re.compile(r'\b(?:' + words + r')\b', re.IGNORECASE)
+
+
+SECTOR_PATTERNS = [(sector, _pattern(keywords)) for sector, keywords in SECTOR_KEYWORDS]
+
+
+def match_sector(text):
+    for sector, pattern in SECTOR_PATTERNS:
+        if pattern.search(text or ''):
+            return sector
+    return None
+
+
+def classify_sector(company_name, industry=None):
+    """Sector for a company; an unrecognised industry is used as its own sector"""
+    industry = ' '.join((industry or '').split())
+    if industry:
+        return match_sector(industry) or industry.title()[:50]
+    return match_sector(company_name) or OTHER
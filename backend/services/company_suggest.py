@@ -0,0 +1,182 @@
+"""
+In-memory company autocomplete: word-prefix matches, or trigram fuzzy
+matches when no name starts with the query.
+
+Every normalized name and alias is indexed under each of its word suffixes
+("tata consultancy services", "consultancy services", "services") in one
+sorted list, so a prefix lookup is a bisect plus a short scan. Results are
+ranked by weight (number of ratings), then name. Prefixes matching many
+terms ("a", "services") keep their top results cached; inserts and weight
+increases re-rank those lists in place. Typos fall back to trigram overlap
+(share of the query's trigrams in the name), counted from the postings of the query's rarer
+trigrams only so common trigrams never dominate the cost.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+
+from services.company_names import normalize_company_name
+
+TOP_K = 10             # results kept per cached prefix (the largest page served)
+CACHE_RANGE = 64       # prefixes matching more terms than this have their top results cached
+PREFIX_END = '\U0010ffff'
+
+
+def word_suffixes(key):
+    words = key.split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanySuggestIndex:
+    def __init__(self, fuzzy_threshold=0.5, max_posting=1000):
+        self.fuzzy_threshold = fuzzy_threshold
+        self.max_posting = max_posting
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._names = {}
+        self._weights = {}
+        self._keys = {}
+        self._terms = []          # sorted (term, company_id)
+        self._postings = {}       # trigram -> [company_id]
+        self._ngram_counts = {}   # company_id -> number of distinct trigrams
+        self._prefix_cache = {}   # prefix with a large range -> top TOP_K company ids
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, company_id):
+        return company_id in self._names
+
+    def name(self, company_id):
+        return self._names.get(company_id)
+
+    def load(self, entries):
+        """Replace the index with ``entries`` of (company_id, name, weight, alias keys)"""
+        with self._lock:
+            self.__init__(self.fuzzy_threshold, self.max_posting)
+            terms = []
+            for company_id, name, weight, aliases in entries:
+                keys = self._register(company_id, name, weight, aliases)
+                terms.extend((term, company_id) for key in keys for term in word_suffixes(key))
+            terms.sort()
+            self._terms = terms
+            self.loaded = True
+
+    def _register(self, company_id, name, weight, aliases):
+        keys = sorted({normalize_company_name(name), *aliases} - {''})
+        self._names[company_id] = name
+        self._weights[company_id] = weight or 0
+        self._keys[company_id] = keys
+        grams = set().union(*(trigrams(key) for key in keys)) if keys else set()
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(company_id)
+        self._ngram_counts[company_id] = len(grams)
+        return keys
+
+    def upsert(self, company_id, name, weight=None, aliases=()):
+        """Add a company or replace its name/aliases (keeping its weight unless given)"""
+        with self._lock:
+            if company_id in self._names:
+                if weight is None:
+                    weight = self._weights[company_id]
+                aliases = set(aliases) | set(self._keys[company_id]) - {normalize_company_name(self._names[company_id])}
+                self.remove(company_id)
+            keys = self._register(company_id, name, weight, aliases)
+            for key in keys:
+                for term in word_suffixes(key):
+                    insort(self._terms, (term, company_id))
+            self._promote(company_id)
+
+    def remove(self, company_id):
+        with self._lock:
+            keys = self._keys.pop(company_id, None)
+            if keys is None:
+                return
+            for key in keys:
+                for term in word_suffixes(key):
+                    position = bisect_left(self._terms, (term, company_id))
+                    if position < len(self._terms) and self._terms[position] == (term, company_id):
+                        del self._terms[position]
+            for gram in set().union(*(trigrams(key) for key in keys)) if keys else ():
+                posting = self._postings.get(gram)
+                if posting and company_id in posting:
+                    posting.remove(company_id)
+            # A cached top list that loses a member may have to admit one from outside it: recompute later
+            for prefix in self._prefixes(keys):
+                self._prefix_cache.pop(prefix, None)
+            del self._names[company_id], self._weights[company_id], self._ngram_counts[company_id]
+
+    def set_weight(self, company_id, weight):
+        with self._lock:
+            previous = self._weights.get(company_id)
+            if previous is None or previous == weight:
+                return
+            self._weights[company_id] = weight
+            if weight > previous:
+                self._promote(company_id)
+            else:
+                for prefix in self._prefixes(self._keys[company_id]):
+                    self._prefix_cache.pop(prefix, None)
+
+    @staticmethod
+    def _prefixes(keys):
+        return {term[:length] for key in keys for term in word_suffixes(key) for length in range(1, len(term) + 1)}
+
+    def _promote(self, company_id):
+        """Re-rank ``company_id`` in cached top lists after it was added or gained weight"""
+        for prefix in self._prefixes(self._keys[company_id]):
+            cached = self._prefix_cache.get(prefix)
+            if cached is not None:
+                ranked = [i for i in cached if i != company_id] + [company_id]
+                self._prefix_cache[prefix] = self._rank(ranked, TOP_K)
+
+    def _rank(self, company_ids, limit):
+        return heapq.nsmallest(limit, company_ids, key=lambda i: (-self._weights[i], self._names[i]))
+
+    def _prefix_matches(self, prefix, limit):
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            return cached[:limit]
+        start = bisect_left(self._terms, (prefix,))
+        end = bisect_left(self._terms, (prefix + PREFIX_END,), start)
+        matches = {company_id for _, company_id in self._terms[start:end]}
+        if end - start <= CACHE_RANGE:
+            return self._rank(matches, limit)
+        ranked = self._rank(matches, TOP_K)
+        self._prefix_cache[prefix] = ranked
+        return ranked[:limit]
+
+    def _fuzzy_matches(self, key, limit, exclude):
+        grams = trigrams(key)
+        rare = [gram for gram in grams if len(self._postings.get(gram, ())) <= self.max_posting]
+        if not rare:
+            return []
+        overlap = Counter()
+        for gram in rare:
+            overlap.update(self._postings.get(gram, ()))
+        # Share of the query's trigrams found in the name (a query is usually shorter than the
+        # name it completes); only rarer trigrams were counted, so the bar is scaled to them
+        needed = self.fuzzy_threshold * len(rare)
+        scored = []
+        for company_id, shared in overlap.items():
+            if shared >= needed and company_id not in exclude:
+                scored.append((shared / len(rare), -self._ngram_counts[company_id], self._weights[company_id], company_id))
+        return [entry[-1] for entry in heapq.nlargest(limit, scored)]
+
+    def suggest(self, query, limit=8):
+        """[(company_id, name, weight)] best first; at most TOP_K"""
+        key = normalize_company_name(query)
+        limit = min(limit, TOP_K)
+        if not key:
+            return []
+        with self._lock:
+            results = self._prefix_matches(key, limit)
+            if not results and len(key) >= 4:
+                results = self._fuzzy_matches(key, limit, set())
+            return [(company_id, self._names[company_id], self._weights[company_id]) for company_id in results]
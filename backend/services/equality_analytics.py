@@ -0,0 +1,273 @@
+"""
+Vectorized trend analytics over the equality tables.
+
+Each report loads the columns it needs once into NumPy arrays, ordered by
+group so the database does the grouping sort, and computes everything with
+grouped reductions (``np.bincount`` over group codes, neighbour differences
+for changes) instead of per-row Python:
+
+- year-over-year changes per sector / field,
+- least-squares linear trend per group (slope in units per year),
+- percentile ranks of the latest value per group,
+- women's share for field ratios and position-weighted leadership share.
+
+Reports are cached until one of their source tables changes (see
+services.table_versions) or the TTL expires.
+"""
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def group_codes(labels):
+    """
+    (group labels, integer code per row). Rows loaded ``ORDER BY`` the label
+    are grouped by comparing neighbours; anything else falls back to a dict.
+    """
+    labels = np.asarray(labels, dtype=object)
+    if not len(labels):
+        return labels, np.zeros(0, dtype=np.intp)
+    starts = np.r_[True, labels[1:] != labels[:-1]]
+    names = labels[starts]
+    if len(names) == len(set(names)):
+        return names, np.cumsum(starts) - 1
+    index = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.intp, count=len(labels))
+    return np.array(list(index), dtype=object), codes
+
+
+def sort_by_group_year(codes, years, *columns):
+    """Rows ordered by (group, year); a no-op when they were loaded in that order"""
+    if len(codes) < 2:
+        return (codes, years) + columns
+    same = codes[1:] == codes[:-1]
+    if np.all(codes[1:] >= codes[:-1]) and np.all(years[1:][same] >= years[:-1][same]):
+        return (codes, years) + columns
+    order = np.lexsort((years, codes))
+    return (codes[order], years[order]) + tuple(column[order] for column in columns)
+
+
+def linear_trends(codes, x, y, n_groups):
+    """Per-group least-squares slope and intercept of ``y`` on ``x`` (NaN for groups with one distinct x)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    origin = x.mean() if len(x) else 0.0
+    x = x - origin  # centred, so sums of squares of years stay exact
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    sx = np.bincount(codes, x, n_groups)
+    sy = np.bincount(codes, y, n_groups)
+    sxx = np.bincount(codes, x * x, n_groups)
+    sxy = np.bincount(codes, x * y, n_groups)
+    denominator = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denominator > 1e-12, (n * sxy - sx * sy) / denominator, np.nan)
+        intercept = (sy - slope * sx) / n - slope * origin
+    return slope, intercept
+
+
+def percentile_ranks(values):
+    """Share of values (in %) at or below each value, ignoring NaN"""
+    values = np.asarray(values, dtype=float)
+    valid = np.sort(values[~np.isnan(values)])
+    if not len(valid):
+        return np.full(len(values), np.nan)
+    ranks = np.searchsorted(valid, values, side='right') / len(valid) * 100
+    return np.where(np.isnan(values), np.nan, ranks)
+
+
+def percentile_summary(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {}
+    return {f'p{p}': _number(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def women_share(women, men):
+    women = np.asarray(women, dtype=float)
+    total = women + np.asarray(men, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, women / total * 100, np.nan)
+
+
+def _number(value, digits=3):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def _numbers(values, digits=3):
+    """Rounded floats as a list, NaN as None (one conversion per array, not per element)"""
+    return [None if v != v else v for v in np.round(np.asarray(values, dtype=float), digits).tolist()]
+
+
+def series_stats(labels, years, values):
+    """Arrays of per-group statistics and year-over-year changes for one grouped series"""
+    names, codes = group_codes(labels)
+    codes, years, values = sort_by_group_year(codes, np.asarray(years, dtype=int), np.asarray(values, dtype=float))
+    n_groups = len(names)
+    counts = np.bincount(codes, minlength=n_groups)
+    slope, intercept = linear_trends(codes, years, values, n_groups)
+    last = np.r_[codes[1:] != codes[:-1], True]
+    latest_year, latest_value = years[last], values[last]
+    same = codes[1:] == codes[:-1]
+    previous = values[:-1][same]
+    delta = values[1:][same] - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        relative = np.where(previous != 0, delta / np.abs(previous), np.nan)
+    return {
+        'names': names,
+        'counts': counts,
+        'means': np.bincount(codes, values, n_groups) / counts,
+        'latest_year': latest_year,
+        'latest_value': latest_value,
+        'latest_percentile': percentile_ranks(latest_value),
+        'slope': slope,
+        'fitted_latest': intercept + slope * latest_year,
+        'yoy': (codes[1:][same], years[:-1][same], years[1:][same], delta, relative),
+    }
+
+
+def series_report(labels, years, values, group_field):
+    """Trends, year-over-year changes and percentile ranks of the latest value for one grouped series"""
+    if not len(labels):
+        return {'groups': [], 'year_over_year': [], 'latest_percentiles': {}}
+    stats = series_stats(labels, years, values)
+    names = stats['names'].tolist()
+    groups = [
+        {
+            group_field: name,
+            'observations': count,
+            'mean': mean,
+            'latest_year': latest_year,
+            'latest_value': latest_value,
+            'latest_percentile': percentile,
+            'trend_per_year': slope,
+            'trend_at_latest_year': fitted,
+        }
+        for name, count, mean, latest_year, latest_value, percentile, slope, fitted in zip(
+            names, stats['counts'].tolist(), _numbers(stats['means']), stats['latest_year'].tolist(),
+            _numbers(stats['latest_value']), _numbers(stats['latest_percentile'], 1),
+            _numbers(stats['slope'], 4), _numbers(stats['fitted_latest'])
+        )
+    ]
+    codes, from_years, to_years, delta, relative = stats['yoy']
+    changes = [
+        {group_field: names[c], 'from_year': a, 'to_year': b, 'delta': d, 'relative_change': r}
+        for c, a, b, d, r in zip(codes.tolist(), from_years.tolist(), to_years.tolist(),
+                                 _numbers(delta), _numbers(relative, 4))
+    ]
+    return {'groups': groups, 'year_over_year': changes, 'latest_percentiles': percentile_summary(stats['latest_value'])}
+
+
+def _columns(conn, table, names, order_by):
+    """Columns of ``table`` as arrays, rows in ``order_by`` order (the database does the grouping sort)"""
+    rows = conn.execute(select(*[table.c[name] for name in names]).order_by(*[table.c[name] for name in order_by])).all()
+    if not rows:
+        return [np.array([]) for _ in names]
+    return [np.array(column) for column in zip(*rows)]
+
+
+def paygap_report(conn, tables):
+    sectors, years, gaps = _columns(conn, tables['gender_pay_gap'], ('sector', 'year', 'pay_gap_percentage'),
+                                    ('sector', 'year'))
+    return series_report(sectors, years, gaps, 'sector')
+
+
+def leadership_report(conn, tables):
+    sectors, years, share, positions = _columns(
+        conn, tables['leadership_stats'], ('sector', 'year', 'women_in_leadership', 'total_positions'), ('sector', 'year')
+    )
+    report = series_report(sectors, years, share, 'sector')
+    # Position-weighted share across sectors per year
+    by_year = []
+    if len(years):
+        year_values, year_codes = np.unique(years.astype(int), return_inverse=True)
+        weights = positions.astype(float)
+        total = np.bincount(year_codes, weights, len(year_values))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weighted = np.bincount(year_codes, share.astype(float) * weights, len(year_values)) / total
+        by_year = [{'year': int(y), 'women_in_leadership': _number(w), 'total_positions': int(t)}
+                   for y, w, t in zip(year_values, weighted, total)]
+    report['overall_by_year'] = by_year
+    return report
+
+
+def fields_report(conn, tables):
+    fields, years, women, men = _columns(conn, tables['field_ratio'], ('field_name', 'year', 'women_count', 'men_count'),
+                                         ('field_name', 'year'))
+    return series_report(fields, years, women_share(women, men) if len(women) else women, 'field_name')
+
+
+def companies_report(conn, tables):
+    return company_summary(*_columns(
+        conn, tables['company_rating'], ('company_name', 'safety_rating', 'pay_equality_rating', 'culture_rating'),
+        ('company_name',)
+    ))
+
+
+def company_stats(names, safety, pay_equality, culture):
+    """Per-company rating counts and metric averages (arrays) from one row per rating"""
+    companies, codes = group_codes(names)
+    counts = np.bincount(codes, minlength=len(companies))
+    averages = {
+        metric: np.bincount(codes, np.asarray(values, dtype=float), len(companies)) / counts
+        for metric, values in (('safety', safety), ('pay_equality', pay_equality), ('culture', culture))
+    }
+    averages['overall'] = (averages['safety'] + averages['pay_equality'] + averages['culture']) / 3
+    return companies, counts, averages
+
+
+def company_summary(names, safety, pay_equality, culture):
+    """Per-company averages, overall score percentile and metric percentiles"""
+    if not len(names):
+        return {'companies': [], 'percentiles': {}}
+    companies, counts, averages = company_stats(names, safety, pay_equality, culture)
+    columns = zip(companies.tolist(), counts.tolist(), _numbers(averages['safety'], 2),
+                  _numbers(averages['pay_equality'], 2), _numbers(averages['culture'], 2),
+                  _numbers(averages['overall'], 2), _numbers(percentile_ranks(averages['overall']), 1))
+    return {
+        'companies': [
+            {'name': name, 'ratings': count, 'avg_safety': safety, 'avg_pay_equality': pay_equality,
+             'avg_culture': culture, 'overall': overall, 'percentile': percentile}
+            for name, count, safety, pay_equality, culture, overall, percentile in columns
+        ],
+        'percentiles': {metric: percentile_summary(values) for metric, values in averages.items()},
+    }
+
+
+REPORTS = {
+    'paygap': (paygap_report, ('gender_pay_gap',)),
+    'leadership': (leadership_report, ('leadership_stats',)),
+    'fields': (fields_report, ('field_ratio',)),
+    'companies': (companies_report, ('company_rating',)),
+}
+
+
+class EqualityAnalytics:
+    def __init__(self, tables, versions, ttl_seconds=600):
+        """``tables`` maps table name to Table; ``versions`` is a TableVersions watching them"""
+        self.tables = tables
+        self.versions = versions
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def report(self, conn, name):
+        build, sources = REPORTS[name]
+        version = self.versions.get(*sources)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and cached[0] == version and time.monotonic() - cached[1] < self.ttl:
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+        result = build(conn, self.tables)
+        with self._lock:
+            self._cache[name] = (version, time.monotonic(), result)
+        return result
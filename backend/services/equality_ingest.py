@@ -0,0 +1,122 @@
+"""
+Parsing and validation for bulk equality dataset uploads.
+
+A payload is CSV (header row with the column names) or JSON (a list of
+objects, or ``{"rows": [...]}``). Every row is checked against the dataset's
+fields; the upload is accepted only if all rows are valid, and errors name
+the row (1-based, data rows only) and field. Rows repeating a key keep the
+last occurrence, as a re-published dataset would.
+"""
+import csv
+import io
+import json
+from collections import namedtuple
+
+Field = namedtuple('Field', 'name type minimum maximum')
+
+DATASETS = {
+    'paygap': {
+        'key': ('sector', 'year'),
+        'fields': (
+            Field('sector', str, 1, 100),
+            Field('year', int, 1900, 2100),
+            Field('pay_gap_percentage', float, -100, 100),
+        ),
+    },
+    'leadership': {
+        'key': ('sector', 'year'),
+        'fields': (
+            Field('sector', str, 1, 100),
+            Field('year', int, 1900, 2100),
+            Field('women_in_leadership', float, 0, 100),
+            Field('total_positions', int, 0, None),
+        ),
+    },
+    'fields': {
+        'key': ('field_name', 'year'),
+        'fields': (
+            Field('field_name', str, 1, 100),
+            Field('women_count', int, 0, None),
+            Field('men_count', int, 0, None),
+            Field('year', int, 1900, 2100),
+        ),
+    },
+}
+
+MAX_ERRORS = 50
+
+
+class IngestError(ValueError):
+    def __init__(self, message, errors=()):
+        super().__init__(message)
+        self.errors = list(errors)
+
+
+def parse_payload(text, content_type=''):
+    """List of row dicts from CSV or JSON text (JSON when the content type says so or it looks like JSON)"""
+    text = (text or '').lstrip('﻿')
+    if 'json' in (content_type or '') or text.lstrip()[:1] in ('[', '{'):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise IngestError(f'Invalid JSON: {e}')
+        if isinstance(data, dict):
+            data = data.get('rows')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise IngestError('JSON must be a list of objects or {"rows": [...]}')
+        return data
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise IngestError('CSV has no header row')
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+    return list(reader)
+
+
+def _coerce(field, value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        raise ValueError('is required')
+    if field.type is str:
+        value = ' '.join(str(value).split())
+        if not field.minimum <= len(value) <= field.maximum:
+            raise ValueError(f'must be {field.minimum}-{field.maximum} characters')
+        return value
+    if isinstance(value, bool):
+        raise ValueError('must be a number')
+    try:
+        number = float(str(value).strip().rstrip('%').replace(',', ''))
+    except ValueError:
+        raise ValueError('must be a number')
+    if field.type is int:
+        if not number.is_integer():
+            raise ValueError('must be a whole number')
+        number = int(number)
+    if number != number or (field.minimum is not None and number < field.minimum) or \
+            (field.maximum is not None and number > field.maximum):
+        bounds = f"{field.minimum if field.minimum is not None else '-inf'}..{field.maximum if field.maximum is not None else 'inf'}"
+        raise ValueError(f'must be in {bounds}')
+    return number
+
+
+def validate_rows(dataset, rows):
+    """
+    Coerced rows for ``dataset`` with duplicate keys collapsed (last wins);
+    raises IngestError listing up to MAX_ERRORS problems when any row is invalid.
+    """
+    spec = DATASETS[dataset]
+    if not rows:
+        raise IngestError('No rows to import')
+    cleaned, errors = {}, []
+    for number, row in enumerate(rows, start=1):
+        values = {}
+        for field in spec['fields']:
+            try:
+                values[field.name] = _coerce(field, row.get(field.name))
+            except ValueError as e:
+                errors.append({'row': number, 'field': field.name, 'error': str(e)})
+        if len(errors) >= MAX_ERRORS:
+            break
+        if len(values) == len(spec['fields']):
+            cleaned[tuple(values[name] for name in spec['key'])] = values
+    if errors:
+        raise IngestError(f'{len(errors)} invalid value(s); nothing was imported', errors[:MAX_ERRORS])
+    return list(cleaned.values())
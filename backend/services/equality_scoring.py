@@ -0,0 +1,38 @@
+"""
+Company gender-equality score derived from its ratings.
+
+The score is the weighted mean of the company's average safety, pay-equality
+and culture ratings (1-5 scale), converted to a percentage the same way as
+the equality dashboard (x20). Weights are configured as
+``safety=2,pay_equality=1,culture=1`` and normalized to sum to 1.
+"""
+from services.leaderboard import METRICS
+
+DEFAULT_WEIGHTS = 'safety=1,pay_equality=1,culture=1'
+
+
+def parse_weights(text):
+    """{metric: weight} summing to 1 from 'metric=weight,...'; metrics left out weigh 0"""
+    weights = dict.fromkeys(METRICS, 0.0)
+    for part in (text or '').split(','):
+        if not part.strip():
+            continue
+        metric, _, value = part.partition('=')
+        metric = metric.strip()
+        if metric not in weights:
+            raise ValueError(f"unknown metric '{metric}' (expected {', '.join(METRICS)})")
+        weights[metric] = float(value)
+        if weights[metric] < 0:
+            raise ValueError(f"weight for '{metric}' must not be negative")
+    total = sum(weights.values())
+    if not total:
+        raise ValueError('at least one metric needs a positive weight')
+    return {metric: weight / total for metric, weight in weights.items()}
+
+
+def equality_score(total_ratings, sums, weights):
+    """0-100 score from a rating count and {metric: sum of ratings}; None without ratings"""
+    if not total_ratings:
+        return None
+    weighted = sum(weights[metric] * sums[metric] / total_ratings for metric in METRICS)
+    return round(weighted * 20, 1)
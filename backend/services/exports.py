@@ -0,0 +1,62 @@
+"""
+Streaming CSV and NDJSON encoders for the research exports.
+
+Rows are encoded as they are read and handed to the WSGI server in chunks of
+roughly ``chunk_size`` characters. Paired with a server-side cursor
+(``Query.yield_per``) an export holds one batch of rows and one chunk in
+memory, however large the table.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+# Spreadsheet apps evaluate cells starting with these as formulas; user text is prefixed with ' (OWASP CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    value = _value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(columns, rows, chunk_size=65536):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, rows, chunk_size=65536):
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, map(_value, row))), ensure_ascii=False)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def encode_rows(export_format, columns, rows, chunk_size=65536):
+    """Generator of text chunks encoding ``rows`` (tuples in ``columns`` order) as ``export_format``"""
+    if export_format == 'csv':
+        return csv_chunks(columns, rows, chunk_size)
+    return ndjson_chunks(columns, rows, chunk_size)
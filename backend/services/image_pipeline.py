@@ -0,0 +1,148 @@
+"""
+Image processing for post and profile uploads.
+
+Uploads are stored under a name derived from the SHA-256 of their bytes, so
+identical uploads are deduplicated and two users uploading "image.jpg" never
+collide. The stored original is re-encoded without metadata (EXIF, GPS, ...)
+after applying its orientation. Resized WebP variants are generated on a
+background pool; if one is requested before it exists it is generated on
+demand, so any worker can serve it.
+"""
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# name -> longest edge in pixels
+VARIANTS = {
+    'thumb': 320,
+    'medium': 960,
+}
+HASH_LENGTH = 32
+ORIGINAL_NAME_RE = re.compile(r'^(?P<digest>[0-9a-f]{%d})\.(?:jpg|png)$' % HASH_LENGTH)
+VARIANT_NAME_RE = re.compile(r'^(?P<digest>[0-9a-f]{%d})_(?P<size>\d+)\.webp$' % HASH_LENGTH)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def content_digest(filename):
+    """Strong validator for a pipeline-managed file (its name is derived from its bytes), else None"""
+    basename = os.path.basename(filename)
+    if ORIGINAL_NAME_RE.match(basename) or VARIANT_NAME_RE.match(basename):
+        return basename.rsplit('.', 1)[0]
+    return None
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+class ImagePipeline:
+    def __init__(self, upload_root, url_prefix='/uploads', max_workers=2):
+        self.upload_root = upload_root
+        self.url_prefix = url_prefix.rstrip('/')
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-variants')
+
+    def save_upload(self, file_storage, subdir=''):
+        """Store an uploaded image and return its public URL; variants are scheduled in the background"""
+        raw = file_storage.read()
+        if not raw:
+            raise InvalidImage('Empty upload')
+        digest = hashlib.sha256(raw).hexdigest()[:HASH_LENGTH]
+
+        try:
+            image = Image.open(io.BytesIO(raw))
+            image.load()
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            raise InvalidImage('Upload is not a supported image')
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        ext = 'png' if has_alpha else 'jpg'
+        directory = os.path.join(self.upload_root, subdir)
+        os.makedirs(directory, exist_ok=True)
+        filename = f"{digest}.{ext}"
+        path = os.path.join(directory, filename)
+
+        if not os.path.exists(path):
+            # Re-encoding from pixels drops EXIF/GPS and every other metadata block
+            image = ImageOps.exif_transpose(image)
+            if ext == 'png':
+                data = _encode(image.convert('RGBA'), 'PNG', optimize=True)
+            else:
+                data = _encode(image.convert('RGB'), 'JPEG', quality=88, optimize=True, progressive=True)
+            _atomic_write(path, data)
+
+        self._executor.submit(self._generate_variants, path)
+        return self.url_for(subdir, filename)
+
+    def url_for(self, subdir, filename):
+        parts = [self.url_prefix] + ([subdir.replace(os.sep, '/')] if subdir else []) + [filename]
+        return '/'.join(parts)
+
+    def variant_urls(self, image_url):
+        """{variant: url} for a pipeline-managed image URL, None for legacy uploads"""
+        if not image_url:
+            return None
+        base, _, filename = image_url.rpartition('/')
+        match = ORIGINAL_NAME_RE.match(filename)
+        if not match:
+            return None
+        digest = match.group('digest')
+        urls = {name: f"{base}/{digest}_{size}.webp" for name, size in VARIANTS.items()}
+        urls['original'] = image_url
+        return urls
+
+    def ensure_variant(self, relative_path):
+        """Generate a missing variant from its original; returns True if the file now exists"""
+        root = os.path.realpath(self.upload_root)
+        path = os.path.realpath(os.path.join(root, relative_path))
+        if not path.startswith(root + os.sep):
+            return False
+        if os.path.exists(path):
+            return True
+        directory, filename = os.path.split(path)
+        match = VARIANT_NAME_RE.match(filename)
+        if not match or int(match.group('size')) not in VARIANTS.values():
+            return False
+        for ext in ('jpg', 'png'):
+            original = os.path.join(directory, f"{match.group('digest')}.{ext}")
+            if os.path.exists(original):
+                self._generate_variants(original)
+                return os.path.exists(path)
+        return False
+
+    def _generate_variants(self, original_path):
+        try:
+            directory, filename = os.path.split(original_path)
+            digest = filename.split('.', 1)[0]
+            targets = [
+                (size, os.path.join(directory, f"{digest}_{size}.webp"))
+                for size in VARIANTS.values()
+            ]
+            targets = [(size, target) for size, target in targets if not os.path.exists(target)]
+            if not targets:
+                return
+            with Image.open(original_path) as image:
+                image.load()
+                for size, target in targets:
+                    variant = image.copy()
+                    # Never upscale: small originals keep their size
+                    variant.thumbnail((size, size), Image.LANCZOS)
+                    _atomic_write(target, _encode(variant, 'WEBP', quality=80, method=4))
+        except Exception as e:
+            print(f"Image variant error for {original_path}: {e}")
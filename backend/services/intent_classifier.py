@@ -0,0 +1,213 @@
+"""
+Local intent classification for /ask: 'casual_chat' or 'db_query'.
+
+Keyword rules catch the obvious cases (a bare greeting, a question naming a
+scheme, benefit or policy); everything else goes through a small TF-IDF +
+logistic regression model shipped as JSON. Both run in pure Python in a few
+microseconds. When neither is confident the prediction has ``intent=None``
+and the caller asks the LLM instead, logging its label so the model can be
+retrained on real traffic (``flask train-intent-model``).
+"""
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter, namedtuple
+
+CASUAL_CHAT = 'casual_chat'
+DB_QUERY = 'db_query'
+LABELS = (CASUAL_CHAT, DB_QUERY)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# A message made only of these words is small talk
+CHITCHAT_WORDS = frozenset(
+    'hi hii hello hey hola namaste yo hlo good morning afternoon evening night '
+    'thanks thank thx you u so much very ok okay okk cool nice great bye goodbye '
+    'see ya later how are r doing what s up sup who is this there fine i am im '
+    'too welcome lol haha hmm yes no sure please'.split()
+)
+# Stems that only make sense for a scheme/policy lookup
+DB_KEYWORDS = frozenset(
+    'scheme yojana policy benefit eligib subsid stipend scholarship pension '
+    'grant allowance entitlement ministry government govt sarkari'.split()
+)
+
+Prediction = namedtuple('Prediction', 'intent confidence source')
+
+
+def _stem(word):
+    """Cheap suffix folding so 'schemes', 'scheme' and 'eligibility'/'eligible' share features"""
+    if word.startswith('eligib'):
+        return 'eligib'
+    if word.startswith('subsid'):
+        return 'subsid'
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    return [_stem(word) for word in TOKEN_RE.findall((text or '').lower())]
+
+
+def features(tokens):
+    """Unigrams plus adjacent bigrams"""
+    terms = list(tokens)
+    terms.extend(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+    return terms
+
+
+def rule_intent(tokens):
+    if not tokens:
+        return CASUAL_CHAT
+    if any(token in DB_KEYWORDS for token in tokens):
+        return DB_QUERY
+    if len(tokens) <= 8 and all(token in CHITCHAT_WORDS for token in tokens):
+        return CASUAL_CHAT
+    return None
+
+
+def _sigmoid(z):
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+def _tfidf(terms, idf):
+    """Sparse, L2-normalized sublinear TF-IDF vector as {term: value}; unknown terms are dropped"""
+    vector = {
+        term: (1.0 + math.log(count)) * idf[term]
+        for term, count in Counter(terms).items() if term in idf
+    }
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if not norm:
+        return {}
+    return {term: value / norm for term, value in vector.items()}
+
+
+class IntentClassifier:
+    def __init__(self, model=None, threshold=None):
+        model = model or {}
+        self.idf = {term: entry[0] for term, entry in model.get('terms', {}).items()}
+        self.weights = {term: entry[1] for term, entry in model.get('terms', {}).items()}
+        self.bias = model.get('bias', 0.0)
+        self.threshold = threshold if threshold is not None else model.get('threshold', 0.85)
+
+    @classmethod
+    def load(cls, path, threshold=None):
+        """Load a trained model; a missing or unreadable file leaves only the keyword rules"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                model = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Intent model not loaded from {path}: {e}")
+            model = None
+        return cls(model, threshold)
+
+    def probability(self, text):
+        """P(db_query) from the model, or None when the text shares no terms with it"""
+        vector = _tfidf(features(tokenize(text)), self.idf)
+        if not vector:
+            return None
+        z = self.bias + sum(value * self.weights[term] for term, value in vector.items())
+        return _sigmoid(z)
+
+    def predict(self, text):
+        tokens = tokenize(text)
+        intent = rule_intent(tokens)
+        if intent is not None:
+            return Prediction(intent, 1.0, 'rules')
+        p = self.probability(text)
+        if p is None:
+            return Prediction(None, 0.0, 'model')
+        intent, confidence = (DB_QUERY, p) if p >= 0.5 else (CASUAL_CHAT, 1.0 - p)
+        if confidence < self.threshold:
+            return Prediction(None, confidence, 'model')
+        return Prediction(intent, confidence, 'model')
+
+
+def train(examples, epochs=200, learning_rate=0.5, l2=1e-3, min_df=1, threshold=0.85, seed=13):
+    """
+    Fit the TF-IDF vocabulary and a logistic regression on (text, label) pairs
+    with plain SGD. Returns the model as a JSON-serializable dict.
+    """
+    docs = [(features(tokenize(text)), 1.0 if label == DB_QUERY else 0.0) for text, label in examples]
+    df = Counter(term for terms, _ in docs for term in set(terms))
+    n = len(docs)
+    idf = {term: math.log((1 + n) / (1 + count)) + 1.0 for term, count in df.items() if count >= min_df}
+    vectors = [(_tfidf(terms, idf), y) for terms, y in docs]
+
+    weights = dict.fromkeys(idf, 0.0)
+    bias = 0.0
+    rng = random.Random(seed)
+    for epoch in range(epochs):
+        rng.shuffle(vectors)
+        rate = learning_rate / (1.0 + epoch * 0.05)
+        for vector, y in vectors:
+            p = _sigmoid(bias + sum(value * weights[term] for term, value in vector.items()))
+            gradient = p - y
+            bias -= rate * gradient
+            for term, value in vector.items():
+                weights[term] -= rate * (gradient * value + l2 * weights[term])
+
+    return {
+        'version': 1,
+        'labels': list(LABELS),
+        'threshold': threshold,
+        'examples': n,
+        'bias': round(bias, 6),
+        'terms': {term: [round(idf[term], 6), round(weights[term], 6)] for term in sorted(idf)},
+    }
+
+
+def load_examples(*paths):
+    """(text, label) pairs from JSONL files of {"text": ..., "label": ...}; missing files are skipped"""
+    examples = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('label') in LABELS and record.get('text'):
+                    examples.append((record['text'], record['label']))
+    return examples
+
+
+def save_model(model, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class DecisionLog:
+    """Append-only JSONL of LLM intent decisions, used as training data"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, text, label, confidence=None):
+        if not self.path:
+            return
+        line = json.dumps({'text': text, 'label': label, 'source': 'llm', 'local_confidence': confidence})
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            print(f"Intent log error: {e}")
@@ -0,0 +1,144 @@
+"""
+Company leaderboard ranked by Bayesian-smoothed rating averages.
+
+A company's score for a metric is its average pulled towards the average of
+all ratings, as if it had ``prior_weight`` extra ratings at that average:
+
+    score = (prior_weight * prior_mean + metric_sum) / (prior_weight + total_ratings)
+
+so a single 5-star review no longer outranks five hundred 4.6-star ones. The
+overall score is the mean of the three metric scores. Scores are computed in
+SQL and stored on company_stats (see app.rescore_companies).
+
+``Leaderboard`` keeps an in-memory copy of the scored rows. The first
+``top_k`` rows of each ordering are picked with a heap, cached, and patched
+as single companies change, so serving the first pages never sorts the
+whole table; deeper pages are left to the database.
+"""
+import heapq
+import threading
+from bisect import insort
+from collections import OrderedDict
+
+METRICS = ('safety', 'pay_equality', 'culture')
+# Public sort name -> row field
+SORT_FIELDS = {
+    'overall': 'score',
+    'safety': 'safety_score',
+    'pay_equality': 'pay_equality_score',
+    'culture': 'culture_score',
+    'total_ratings': 'total_ratings',
+}
+DEFAULT_PRIOR_MEAN = 3.0  # midpoint of the 1-5 scale, used before any rating exists
+
+
+def prior_means(total_ratings, sums):
+    """{metric: mean over all ratings} from the global count and per-metric sums"""
+    return {
+        metric: (sums[metric] / total_ratings) if total_ratings else DEFAULT_PRIOR_MEAN
+        for metric in METRICS
+    }
+
+
+def priors_drifted(old, new, tolerance):
+    return old is None or any(abs(old[metric] - new[metric]) > tolerance for metric in METRICS)
+
+
+def sort_key(field, descending):
+    """Ascending key giving the requested order; ties by company name, as the SQL fallback orders them"""
+    if descending:
+        return lambda row: (-row[field], row['name'])
+    return lambda row: (row[field], row['name'])
+
+
+class Leaderboard:
+    def __init__(self, top_k=100, max_orderings=32):
+        self.top_k = top_k
+        self.max_orderings = max_orderings
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._rows = {}             # company name -> row
+        self._tops = OrderedDict()  # (field, descending, min_reviews) -> {'rows': [...], 'count': n}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def load(self, rows):
+        """Replace the leaderboard with ``rows`` (dicts with 'name', 'total_ratings' and the SORT_FIELDS)"""
+        with self._lock:
+            self._rows = {row['name']: row for row in rows}
+            self._tops = OrderedDict()
+            self.loaded = True
+
+    def update(self, row):
+        """Replace one company's row, patching the cached top lists rather than dropping them"""
+        with self._lock:
+            old = self._rows.get(row['name'])
+            self._rows[row['name']] = row
+            for ordering in list(self._tops):
+                self._patch(ordering, old, row)
+
+    def remove(self, name):
+        with self._lock:
+            old = self._rows.pop(name, None)
+            if old is not None:
+                for ordering in list(self._tops):
+                    self._patch(ordering, old, None)
+
+    def page(self, sort='overall', descending=True, offset=0, limit=20, min_reviews=0):
+        """
+        (rows, number of companies with at least ``min_reviews`` ratings), or
+        None when the page reaches past the cached top_k
+        """
+        if offset + limit > self.top_k:
+            return None
+        ordering = (SORT_FIELDS[sort], descending, min_reviews)
+        with self._lock:
+            top = self._tops.get(ordering)
+            if top is None:
+                top = self._build(ordering)
+            else:
+                self._tops.move_to_end(ordering)
+            return top['rows'][offset:offset + limit], top['count']
+
+    # Internals (callers hold self._lock)
+    def _build(self, ordering):
+        field, descending, min_reviews = ordering
+        eligible = [row for row in self._rows.values() if row['total_ratings'] >= min_reviews]
+        top = {
+            'rows': heapq.nsmallest(self.top_k, eligible, key=sort_key(field, descending)),
+            'count': len(eligible),
+        }
+        self._tops[ordering] = top
+        while len(self._tops) > self.max_orderings:
+            self._tops.popitem(last=False)
+        return top
+
+    def _patch(self, ordering, old, new):
+        field, descending, min_reviews = ordering
+        top = self._tops[ordering]
+        rows = top['rows']
+        was_eligible = old is not None and old['total_ratings'] >= min_reviews
+        is_eligible = new is not None and new['total_ratings'] >= min_reviews
+        top['count'] += is_eligible - was_eligible
+
+        full = len(rows) == self.top_k
+        name = (old or new)['name']
+        position = next((i for i, row in enumerate(rows) if row['name'] == name), None)
+        if position is not None:
+            del rows[position]
+        if not is_eligible:
+            if position is not None and full:
+                # A company outside the list may now belong in it
+                del self._tops[ordering]
+            return
+
+        key = sort_key(field, descending)
+        if len(rows) < self.top_k and (position is not None or not full):
+            insort(rows, new, key=key)
+            if position is not None and full and rows[-1] is new:
+                # Fell to the last slot: an unlisted company may rank above it
+                del self._tops[ordering]
+        elif rows and key(new) < key(rows[-1]):
+            insort(rows, new, key=key)
+            del rows[self.top_k:]
@@ -0,0 +1,147 @@
+"""
+Write-buffered like toggling.
+
+Taps are recorded in memory as the desired final state per (user, post) and
+written to the database in batches by a background thread, so a viral post
+costs one INSERT ... ON CONFLICT / DELETE batch and one recount per flush
+interval instead of a commit and a COUNT per tap. Reads overlay the buffered
+state on top of the persisted counts, so a user always sees their own tap.
+
+The buffer is per process; the database (``uq_user_post_like`` plus the
+recount done on flush) stays the source of truth across workers.
+"""
+import atexit
+import threading
+
+
+class LikeBuffer:
+    def __init__(self, flush_fn, interval=0.25, max_pending=5000):
+        """
+        ``flush_fn(changes)`` receives a list of (user_id, post_id, liked) tuples and
+        must persist them in a single transaction, raising on failure.
+        """
+        self._flush_fn = flush_fn
+        self._interval = interval
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # (user_id, post_id) -> (persisted_liked, desired_liked)
+        self._pending = {}
+        self._inflight = {}
+        # post_id -> net like delta not yet visible in the persisted count
+        self._pending_delta = {}
+        self._inflight_delta = {}
+
+    def _known_state(self, key):
+        entry = self._pending.get(key) or self._inflight.get(key)
+        return entry[1] if entry else None
+
+    def is_liked(self, user_id, post_id, load_state):
+        """Buffered like state, falling back to ``load_state()`` (a DB lookup) when unknown"""
+        with self._lock:
+            state = self._known_state((user_id, post_id))
+        return load_state() if state is None else state
+
+    def buffered_likes(self, user_id, post_ids):
+        """{post_id: liked} for the posts among ``post_ids`` with buffered state for ``user_id``"""
+        with self._lock:
+            return {
+                post_id: state for post_id in post_ids
+                if (state := self._known_state((user_id, post_id))) is not None
+            }
+
+    def toggle(self, user_id, post_id, load_state):
+        """Flip the like state of (user, post) and return the new state"""
+        key = (user_id, post_id)
+        with self._lock:
+            known = self._known_state(key)
+        persisted = load_state() if known is None else None
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    base = inflight[1]
+                elif persisted is not None:
+                    base = persisted
+                else:
+                    # Flushed between the two critical sections; state is in the DB again
+                    base = load_state()
+                entry = (base, base)
+            base, desired = entry
+            desired = not desired
+            self._pending[key] = (base, desired)
+            self._pending_delta[post_id] = self._pending_delta.get(post_id, 0) + (1 if desired else -1)
+            backlog = len(self._pending)
+
+        self._ensure_started()
+        if backlog >= self._max_pending:
+            self._wakeup.set()
+        return desired
+
+    def count(self, post_id, persisted_count):
+        with self._lock:
+            delta = self._pending_delta.get(post_id, 0) + self._inflight_delta.get(post_id, 0)
+        return max((persisted_count or 0) + delta, 0)
+
+    def discard_post(self, post_id):
+        """Drop buffered taps for a deleted post"""
+        with self._lock:
+            for key in [key for key in self._pending if key[1] == post_id]:
+                del self._pending[key]
+            self._pending_delta.pop(post_id, None)
+
+    def flush(self):
+        """Persist everything buffered so far; safe to call from any thread"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                self._inflight_delta, self._pending_delta = self._pending_delta, {}
+                changes = [
+                    (user_id, post_id, desired)
+                    for (user_id, post_id), (persisted, desired) in self._inflight.items()
+                    if persisted != desired
+                ]
+
+            try:
+                if changes:
+                    self._flush_fn(changes)
+            except Exception as e:
+                print(f"Like flush error: {e}")
+                with self._lock:
+                    # Requeue, unless the user tapped again in the meantime
+                    for key, (persisted, desired) in self._inflight.items():
+                        if key in self._pending:
+                            self._pending[key] = (persisted, self._pending[key][1])
+                        else:
+                            self._pending[key] = (persisted, desired)
+                    for post_id, delta in self._inflight_delta.items():
+                        self._pending_delta[post_id] = self._pending_delta.get(post_id, 0) + delta
+                    self._inflight, self._inflight_delta = {}, {}
+                return 0
+
+            with self._lock:
+                self._inflight, self._inflight_delta = {}, {}
+            return len(changes)
+
+    def _ensure_started(self):
+        # Started lazily so the thread lives in the serving process, not a pre-fork parent
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='like-buffer-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,344 @@
+"""
+Single entry point for every LLM call the backend makes.
+
+Providers (OpenAI, Groq, and a deterministic local stub) are tried in order.
+Each provider keeps one SDK client (and so one HTTP connection pool) for the
+life of the process, and has:
+
+- a deadline: every request carries a timeout, and a call never outlives the
+  gateway-wide deadline even when it fails over;
+- a concurrency cap: a semaphore bounds in-flight requests, and a request
+  that cannot get a slot quickly moves on to the next provider instead of
+  queueing a worker behind a slow upstream;
+- a circuit breaker: after repeated failures the provider is skipped for a
+  cool-down period, then probed with a single request.
+
+With ``hedge_after`` set, a completion that has not returned after that many
+seconds is raced against the next provider and the first answer wins.
+Streams fail over only until the first token has been sent.
+"""
+import random
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from services.chat_stream import fake_token_stream, openai_token_stream
+
+Completion = namedtuple('Completion', 'text provider model prompt_tokens completion_tokens latency')
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMUnavailable(LLMError):
+    """No provider could serve the request (all failed, saturated or circuit-open)"""
+
+
+class ProviderBusy(LLMError):
+    pass
+
+
+def estimate_tokens(text):
+    return (len(text or '') + 3) // 4
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True  # one trial request while half-open
+            return True
+
+    def release_probe(self):
+        """The half-open trial was never sent (e.g. the provider was saturated)"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Provider(ABC):
+    name = 'provider'
+
+    def __init__(self, model, timeout=20.0, max_concurrency=8, breaker=None):
+        self.model = model
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'failures': 0, 'rejected': 0, 'in_flight': 0}
+
+    def acquire(self, wait_seconds):
+        if not self._slots.acquire(timeout=max(wait_seconds, 0)):
+            self._count('rejected')
+            raise ProviderBusy(f'{self.name} is at its concurrency limit')
+        self._count('in_flight')
+
+    def release(self):
+        self._count('in_flight', -1)
+        self._slots.release()
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    @abstractmethod
+    def complete(self, messages, max_tokens, timeout):
+        """(text, prompt_tokens, completion_tokens)"""
+
+    @abstractmethod
+    def stream(self, messages, max_tokens, timeout):
+        """Generator of text deltas"""
+
+
+class OpenAICompatibleProvider(Provider):
+    """OpenAI and Groq SDKs share the chat.completions interface"""
+
+    def __init__(self, name, client_factory, model, **options):
+        super().__init__(model, **options)
+        self.name = name
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+        return self._client
+
+    def complete(self, messages, max_tokens, timeout):
+        response = self.client.chat.completions.create(
+            model=self.model, messages=messages, max_tokens=max_tokens, timeout=timeout
+        )
+        text = response.choices[0].message.content or ''
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            return text, usage.prompt_tokens, usage.completion_tokens
+        return text, sum(estimate_tokens(m['content']) for m in messages), estimate_tokens(text)
+
+    def stream(self, messages, max_tokens, timeout):
+        return openai_token_stream(self.client, messages, self.model, max_tokens, timeout=timeout)
+
+
+class StubProvider(Provider):
+    """Deterministic local provider for development, tests and benchmarks"""
+    name = 'stub'
+
+    def __init__(self, model='stub', latency=0.05, token_delay=0.01, failure_rate=0.0, seed=0, **options):
+        super().__init__(model, **options)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def _should_fail(self):
+        if not self.failure_rate:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < self.failure_rate
+
+    def complete(self, messages, max_tokens, timeout):
+        time.sleep(max(0, min(self.latency, timeout)))
+        if self.latency > timeout:
+            raise TimeoutError('stub provider timed out')
+        if self._should_fail():
+            raise LLMError('stub provider injected failure')
+        text = ''.join(fake_token_stream(messages, token_delay=0, first_token_delay=0))
+        return text, sum(estimate_tokens(m['content']) for m in messages), estimate_tokens(text)
+
+    def stream(self, messages, max_tokens, timeout):
+        if self._should_fail():
+            raise LLMError('stub provider injected failure')
+        return fake_token_stream(messages, self.token_delay, max(0, min(self.latency, timeout)))
+
+
+class LLMGateway:
+    def __init__(self, providers, deadline=30.0, queue_timeout=1.0, hedge_after=None, max_workers=16):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.queue_timeout = queue_timeout
+        self.hedge_after = hedge_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-hedge') if hedge_after else None
+
+    def _candidates(self, prefer):
+        providers = self.providers
+        if prefer:
+            providers = sorted(providers, key=lambda p: p.name != prefer)
+        return providers
+
+    def _attempt(self, provider, messages, max_tokens, deadline):
+        """One request to one provider; breaker and semaphore bookkeeping included"""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMError('deadline exceeded')
+        try:
+            provider.acquire(min(self.queue_timeout, remaining))
+        except ProviderBusy:
+            provider.breaker.release_probe()
+            raise
+        # Waiting for the slot may have used up the rest of the deadline
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            provider.release()
+            provider.breaker.release_probe()
+            raise LLMError('deadline exceeded')
+        started = time.monotonic()
+        try:
+            provider._count('requests')
+            text, prompt_tokens, completion_tokens = provider.complete(
+                messages, max_tokens, min(provider.timeout, remaining)
+            )
+        except Exception:
+            provider._count('failures')
+            provider.breaker.record_failure()
+            raise
+        finally:
+            provider.release()
+        provider.breaker.record_success()
+        return Completion(text, provider.name, provider.model, prompt_tokens, completion_tokens,
+                          time.monotonic() - started)
+
+    def complete(self, messages, max_tokens=500, prefer=None, deadline=None):
+        """Return a Completion from the first provider that answers, or raise LLMUnavailable"""
+        deadline = time.monotonic() + (deadline or self.deadline)
+        candidates = self._candidates(prefer)
+        if self._executor is not None and len(candidates) > 1:
+            return self._hedged(candidates, messages, max_tokens, deadline)
+
+        errors = []
+        for provider in candidates:
+            if not provider.breaker.allow():
+                errors.append(f'{provider.name}: circuit open')
+                continue
+            try:
+                return self._attempt(provider, messages, max_tokens, deadline)
+            except Exception as e:
+                errors.append(f'{provider.name}: {e}')
+        raise LLMUnavailable('; '.join(errors) or 'no LLM provider configured')
+
+    def _hedged(self, candidates, messages, max_tokens, deadline):
+        pending, errors = {}, []
+        queue = list(candidates)
+
+        def launch():
+            while queue:
+                provider = queue.pop(0)
+                if provider.breaker.allow():
+                    pending[self._executor.submit(self._attempt, provider, messages, max_tokens, deadline)] = provider
+                    return
+                errors.append(f'{provider.name}: circuit open')
+
+        launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Fire the next provider if the current ones are slow; also after a failure
+            timeout = min(self.hedge_after, remaining) if queue else remaining
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f'{provider.name}: {e}')
+            # Slow or failed so far: bring in the next provider
+            launch()
+        raise LLMUnavailable('; '.join(errors) or 'deadline exceeded')
+
+    def stream(self, messages, max_tokens=500, prefer=None, deadline=None):
+        """Generator of text deltas; fails over between providers until the first token arrives"""
+        deadline = time.monotonic() + (deadline or self.deadline)
+        errors = []
+        for provider in self._candidates(prefer):
+            if not provider.breaker.allow():
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                provider.acquire(min(self.queue_timeout, remaining))
+            except ProviderBusy as e:
+                provider.breaker.release_probe()
+                errors.append(f'{provider.name}: {e}')
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                provider.release()
+                provider.breaker.release_probe()
+                errors.append(f'{provider.name}: deadline exceeded')
+                break
+            stream = None
+            started = False
+            try:
+                provider._count('requests')
+                stream = provider.stream(messages, max_tokens, min(provider.timeout, remaining))
+                for token in stream:
+                    started = True
+                    yield token
+                provider.breaker.record_success()
+                return
+            except GeneratorExit:
+                # Client went away: the provider did nothing wrong
+                if started:
+                    provider.breaker.record_success()
+                else:
+                    provider.breaker.release_probe()
+                raise
+            except Exception as e:
+                provider._count('failures')
+                provider.breaker.record_failure()
+                if started:
+                    raise
+                errors.append(f'{provider.name}: {e}')
+            finally:
+                if stream is not None:
+                    stream.close()
+                provider.release()
+        raise LLMUnavailable('; '.join(errors) or 'all LLM providers are circuit-open')
+
+    def stats(self):
+        return {
+            provider.name: dict(provider.stats, model=provider.model, circuit=provider.breaker.state,
+                                max_concurrency=provider.max_concurrency)
+            for provider in self.providers
+        }
@@ -0,0 +1,155 @@
+"""
+Full-text search over community posts.
+
+SQLite uses an external-content FTS5 table (``post_fts``) kept in sync with
+the ``post`` table by triggers, so every insert/update/delete done by
+``create_post``/``delete_post`` (or anything else) updates the index inside
+the same transaction. Postgres uses a generated ``tsvector`` column with a
+GIN index, which the database maintains on its own.
+
+Results are ranked by relevance (bm25 / ts_rank_cd) and paginated with an
+opaque keyset cursor over (rank, post id).
+"""
+import base64
+import json
+import re
+
+from sqlalchemy import text, bindparam
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_QUERY_TOKENS = 16
+
+SQLITE_INDEX_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(
+        title, content,
+        content='post', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN
+        INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF title, content ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+POSTGRES_INDEX_DDL = [
+    """
+    ALTER TABLE post ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_post_search_vector ON post USING GIN (search_vector)",
+]
+
+# Inner queries return (id, rank) with "higher rank = better match" on both backends
+SQLITE_RANKED = """
+    SELECT post.id AS id, -bm25(post_fts, 10.0, 1.0) AS rank
+    FROM post_fts JOIN post ON post.id = post_fts.rowid
+    WHERE post_fts MATCH :match {category_filter}
+"""
+
+POSTGRES_RANKED = """
+    SELECT post.id AS id, ts_rank_cd(post.search_vector, q.query) AS rank
+    FROM post, websearch_to_tsquery('english', :match) AS q(query)
+    WHERE post.search_vector @@ q.query {category_filter}
+"""
+
+
+class InvalidSearchQuery(ValueError):
+    pass
+
+
+def _dialect(connection):
+    return connection.dialect.name
+
+
+def create_search_index(connection):
+    """Create the search index if missing and backfill it from existing posts"""
+    if _dialect(connection) == 'postgresql':
+        for ddl in POSTGRES_INDEX_DDL:
+            connection.execute(text(ddl))
+        return
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_fts'")
+    ).first()
+    for ddl in SQLITE_INDEX_DDL:
+        connection.execute(text(ddl))
+    if not exists:
+        connection.execute(text("INSERT INTO post_fts(post_fts) VALUES ('rebuild')"))
+
+
+def build_match_expression(query, dialect='sqlite'):
+    """Turn free user text into a safe full-text expression (AND of terms, prefix on the last)"""
+    tokens = TOKEN_RE.findall((query or '').lower())[:MAX_QUERY_TOKENS]
+    if not tokens:
+        raise InvalidSearchQuery('Search query must contain at least one word')
+    if dialect == 'postgresql':
+        # websearch_to_tsquery already tolerates arbitrary input
+        return ' '.join(tokens)
+    quoted = ['"%s"' % token for token in tokens]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def encode_cursor(rank, post_id):
+    raw = json.dumps([rank, post_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, post_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return float(rank), int(post_id)
+    except (ValueError, TypeError):
+        raise InvalidSearchQuery('Invalid cursor')
+
+
+def search_posts(connection, query, categories=None, cursor=None, limit=20):
+    """
+    Return ([(post_id, rank), ...], next_cursor) for the best matches of ``query``.
+    ``next_cursor`` is None on the last page.
+    """
+    dialect = _dialect(connection)
+    params = {'match': build_match_expression(query, dialect), 'limit': limit + 1}
+
+    category_filter = ''
+    if categories:
+        category_filter = 'AND post.category IN :categories'
+        params['categories'] = list(categories)
+
+    ranked = (POSTGRES_RANKED if dialect == 'postgresql' else SQLITE_RANKED).format(
+        category_filter=category_filter
+    )
+    sql = 'SELECT id, rank FROM (%s) AS ranked' % ranked
+    if cursor:
+        params['cursor_rank'], params['cursor_id'] = decode_cursor(cursor)
+        sql += ' WHERE rank < :cursor_rank OR (rank = :cursor_rank AND id < :cursor_id)'
+    sql += ' ORDER BY rank DESC, id DESC LIMIT :limit'
+
+    stmt = text(sql)
+    if categories:
+        stmt = stmt.bindparams(bindparam('categories', expanding=True))
+
+    rows = [(row.id, row.rank) for row in connection.execute(stmt, params)]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return rows, next_cursor
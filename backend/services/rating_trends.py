@@ -0,0 +1,65 @@
+"""
+Rolling-window and monthly company rating trends from daily rollups.
+
+Input rows are (day, total_ratings, safety_sum, pay_equality_sum,
+culture_sum) as read from company_rating_daily, already summed over the
+companies of interest, so a trend costs at most one row per day and never
+touches the ratings themselves. Days are the UTC date a rating was first
+submitted; later edits to a rating stay in its original day.
+"""
+from datetime import timedelta
+
+from services.leaderboard import METRICS
+
+WINDOWS = (30, 90, 365)
+
+
+def _totals(rows):
+    total = sum(row[1] for row in rows)
+    sums = [sum(row[2 + i] for row in rows) for i in range(len(METRICS))]
+    return total, sums
+
+
+def summarize(rows):
+    total, sums = _totals(rows)
+    summary = {'total_ratings': total}
+    for metric, metric_sum in zip(METRICS, sums):
+        summary[f'avg_{metric}'] = round(metric_sum / total, 2) if total else None
+    return summary
+
+
+def window_summaries(rows, today, windows=WINDOWS):
+    """
+    {days: summary of the last ``days`` days (today included), the ``days``
+    before that, and the change in each average}; ``rows`` must cover twice
+    the largest window
+    """
+    result = {}
+    for days in windows:
+        since = today - timedelta(days=days - 1)
+        before = since - timedelta(days=days)
+        current = summarize([row for row in rows if row[0] >= since])
+        previous = summarize([row for row in rows if before <= row[0] < since])
+        change = {}
+        for metric in METRICS:
+            now, then = current[f'avg_{metric}'], previous[f'avg_{metric}']
+            change[metric] = round(now - then, 2) if now is not None and then is not None else None
+        result[days] = {'since': since.isoformat(), 'current': current, 'previous': previous, 'change': change}
+    return result
+
+
+def month_start(day, months_back=0):
+    month = day.year * 12 + day.month - 1 - months_back
+    return day.replace(year=month // 12, month=month % 12 + 1, day=1)
+
+
+def monthly_series(rows, today, months):
+    """One summary per calendar month, oldest first, for the ``months`` months up to today's (empty months included)"""
+    buckets = {}
+    for row in rows:
+        buckets.setdefault(row[0].strftime('%Y-%m'), []).append(row)
+    series = []
+    for back in range(months - 1, -1, -1):
+        month = month_start(today, back).strftime('%Y-%m')
+        series.append(dict(month=month, **summarize(buckets.get(month, []))))
+    return series
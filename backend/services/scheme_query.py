@@ -0,0 +1,163 @@
+"""
+Structured scheme lookups for /ask.
+
+A question is mapped onto a fixed, read-only query shape over the scheme
+table: an optional category, an optional location (national schemes always
+match too) and free keywords matched against name, description and
+eligibility. Values are bound parameters, never SQL text, and results are
+cached per parsed query for a short TTL.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import case, func, literal, or_, select
+
+SchemeQuery = namedtuple('SchemeQuery', 'category location keywords')
+
+NATIONWIDE = ('all india', 'india', 'national')
+STATES = (
+    'andhra pradesh', 'arunachal pradesh', 'assam', 'bihar', 'chhattisgarh', 'goa', 'gujarat',
+    'haryana', 'himachal pradesh', 'jharkhand', 'karnataka', 'kerala', 'madhya pradesh',
+    'maharashtra', 'manipur', 'meghalaya', 'mizoram', 'nagaland', 'odisha', 'punjab', 'rajasthan',
+    'sikkim', 'tamil nadu', 'telangana', 'tripura', 'uttar pradesh', 'uttarakhand', 'west bengal',
+    'delhi', 'jammu and kashmir', 'ladakh', 'puducherry', 'chandigarh',
+)
+# Question words that point at a category, keyed by the category they imply
+CATEGORY_HINTS = {
+    'education': ('education', 'school', 'study', 'studies', 'college', 'scholarship', 'scholarships', 'student'),
+    'financial': ('financial', 'finance', 'loan', 'loans', 'money', 'savings', 'deposit', 'credit'),
+    'health': ('health', 'maternity', 'pregnant', 'pregnancy', 'nutrition', 'medical', 'hospital'),
+    'employment': ('employment', 'job', 'jobs', 'work', 'skill', 'skills', 'training', 'entrepreneur', 'entrepreneurs', 'business'),
+    'safety': ('safety', 'protection', 'violence', 'legal', 'shelter'),
+}
+STOPWORDS = frozenset(
+    'a about all an and any are available can could details do does for from get give have '
+    'how i in is it list me my of on or please scheme schemes show tell the there to under '
+    'what which who with women woman girl girls government govt policy policies program programs '
+    'programme yojana benefit benefits apply eligible eligibility find search are there info'.split()
+)
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def parse_question(text, categories=(), locations=()):
+    """
+    Map a question onto a SchemeQuery. ``categories`` and ``locations`` are the
+    values present in the table, so only filters that can match are produced.
+    """
+    lowered = (text or '').lower()
+    words = WORD_RE.findall(lowered)
+    consumed = set()
+
+    category = None
+    known = {value.lower(): value for value in categories if value}
+    for word in words:
+        if word in known:
+            category = known[word]
+            consumed.add(word)
+            break
+    if category is None:
+        for implied, hints in CATEGORY_HINTS.items():
+            if implied in known and any(word in hints for word in words):
+                category = known[implied]
+                consumed.update(word for word in words if word in hints)
+                break
+
+    location = None
+    candidates = {value.lower() for value in locations if value} | set(STATES)
+    for candidate in sorted(candidates, key=len, reverse=True):
+        if candidate not in NATIONWIDE and re.search(r'\b%s\b' % re.escape(candidate), lowered):
+            location = candidate
+            consumed.update(candidate.split())
+            break
+
+    keywords = []
+    for word in words:
+        if word in consumed or word in STOPWORDS or len(word) < 3 or word in keywords:
+            continue
+        keywords.append(word)
+    return SchemeQuery(category, location, tuple(keywords[:6]))
+
+
+def build_select(table, query, limit=10):
+    """Parameterized SELECT over the scheme table for a SchemeQuery"""
+    c = table.c
+    statement = select(c.id, c.name, c.description, c.eligibility, c.application_process,
+                       c.contact_info, c.location, c.category)
+    if query.category:
+        statement = statement.where(func.lower(c.category) == query.category.lower())
+
+    order_by = []
+    if query.location:
+        local = c.location.icontains(query.location, autoescape=True)
+        nationwide = or_(c.location.is_(None), func.lower(c.location).in_(NATIONWIDE))
+        statement = statement.where(or_(local, nationwide))
+        order_by.append(case((local, 0), else_=1))
+
+    if query.keywords:
+        matches = [
+            or_(
+                c.name.icontains(keyword, autoescape=True),
+                c.description.icontains(keyword, autoescape=True),
+                c.eligibility.icontains(keyword, autoescape=True),
+            )
+            for keyword in query.keywords
+        ]
+        score = sum((case((match, 1), else_=0) for match in matches), literal(0))
+        # Keywords narrow the result only when at least one of them matches something
+        if query.category is None and query.location is None:
+            statement = statement.where(or_(*matches))
+        order_by.append(score.desc())
+
+    return statement.order_by(*order_by, c.id).limit(limit)
+
+
+class SchemeQueryEngine:
+    def __init__(self, table, ttl_seconds=300, max_entries=500):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._results = OrderedDict()  # (SchemeQuery, limit) -> (expires_at, rows)
+        self._vocabulary = None        # (expires_at, categories, locations)
+        self._lock = threading.Lock()
+
+    def vocabulary(self, connection):
+        """Distinct categories and locations present in the table (cached)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._vocabulary and self._vocabulary[0] > now:
+                return self._vocabulary[1], self._vocabulary[2]
+        c = self.table.c
+        categories = [row[0] for row in connection.execute(select(c.category).distinct())]
+        locations = [row[0] for row in connection.execute(select(c.location).distinct()) if row[0]]
+        with self._lock:
+            self._vocabulary = (now + self.ttl_seconds, categories, locations)
+        return categories, locations
+
+    def parse(self, connection, text):
+        categories, locations = self.vocabulary(connection)
+        return parse_question(text, categories, locations)
+
+    def search(self, connection, query, limit=10):
+        """Matching schemes as a list of dicts"""
+        key = (query, limit)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > now:
+                self._results.move_to_end(key)
+                return entry[1]
+        rows = [dict(row._mapping) for row in connection.execute(build_select(self.table, query, limit))]
+        with self._lock:
+            self._results[key] = (now + self.ttl_seconds, rows)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return rows
+
+    def invalidate(self):
+        """Forget cached results, e.g. after schemes were added or edited"""
+        with self._lock:
+            self._results.clear()
+            self._vocabulary = None
@@ -0,0 +1,174 @@
+"""
+In-memory BM25 index over government schemes, used to ground chatbot answers.
+
+Each scheme is indexed on its name (weighted double), description,
+eligibility and location. The index is updated one scheme at a time as rows
+are committed, so it never needs a full rebuild after startup. ``context``
+renders the best matches into a compact block that fits a token budget, to
+be placed in the prompt of a single LLM call.
+"""
+import heapq
+import math
+import threading
+from collections import Counter
+
+from services.intent_classifier import tokenize
+
+FIELD_WEIGHTS = {'name': 2, 'description': 1, 'eligibility': 1, 'location': 1}
+STOPWORDS = frozenset(
+    'a an and any are as at be by can do doe for from get give have how i in is it me my of on or '
+    'please show tell the there to under what which who with you your about'.split()
+)
+
+
+def index_terms(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS]
+
+
+def estimate_tokens(text):
+    """Rough token count for English prompts (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+class SchemeIndex:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings = {}   # term -> {scheme_id: term frequency}
+        self._lengths = {}    # scheme_id -> weighted document length
+        self._terms = {}      # scheme_id -> Counter of its terms, to undo on update/delete
+        self._documents = {}  # scheme_id -> fields used to render context
+        self._total_length = 0
+        self._norms = {}      # scheme_id -> k1 * (1 - b + b * length / average length)
+        self._norms_average = None
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._documents)
+
+    def load(self, schemes):
+        """Replace the index contents with ``schemes`` (iterable of field dicts with an 'id')"""
+        with self._lock:
+            self._postings, self._lengths, self._terms, self._documents = {}, {}, {}, {}
+            self._norms, self._norms_average = {}, None
+            self._total_length = 0
+            for scheme in schemes:
+                self._add(scheme)
+            self.loaded = True
+
+    def upsert(self, scheme):
+        with self._lock:
+            self._remove(scheme['id'])
+            self._add(scheme)
+
+    def remove(self, scheme_id):
+        with self._lock:
+            self._remove(scheme_id)
+
+    def search(self, query, limit=5):
+        """[(scheme_id, bm25 score)] best first"""
+        terms = set(index_terms(query))
+        with self._lock:
+            n = len(self._documents)
+            if not n or not terms:
+                return []
+            norms = self._length_norms()
+            k1_plus_1 = self.k1 + 1
+            scores = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                get = scores.get
+                for scheme_id, tf in postings.items():
+                    scores[scheme_id] = get(scheme_id, 0.0) + idf * tf * k1_plus_1 / (tf + norms[scheme_id])
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def documents(self, scheme_ids):
+        with self._lock:
+            return [self._documents[scheme_id] for scheme_id in scheme_ids if scheme_id in self._documents]
+
+    def context(self, query, max_tokens=600, limit=5, min_score=1.0, extra=()):
+        """
+        Prompt-ready text for the schemes most relevant to ``query`` (plus any
+        ``extra`` scheme dicts, which come first), cut to ``max_tokens``.
+        Returns (text, [scheme ids included]); text is '' when nothing is relevant.
+        """
+        hits = [scheme_id for scheme_id, score in self.search(query, limit) if score >= min_score]
+        schemes = list(extra)
+        seen = {scheme['id'] for scheme in schemes}
+        schemes.extend(scheme for scheme in self.documents(hits) if scheme['id'] not in seen)
+
+        lines, used, included = [], 0, []
+        for scheme in schemes:
+            line = render_scheme(scheme)
+            cost = estimate_tokens(line) + 1
+            if used + cost > max_tokens:
+                remaining = (max_tokens - used - 1) * 4
+                if not lines and remaining > 40:
+                    lines.append(line[:remaining].rstrip() + '…')
+                    included.append(scheme['id'])
+                break
+            lines.append(line)
+            included.append(scheme['id'])
+            used += cost
+        return '\n'.join(lines), included
+
+    # Internals (callers hold self._lock)
+    def _length_norms(self):
+        """BM25 length normalization per scheme, recomputed only when the average length drifts by >2%"""
+        average = self._total_length / len(self._documents)
+        if self._norms_average is None:
+            drifted = True
+        elif not self._norms_average:
+            # All schemes were empty (no indexable text): any new text is drift
+            drifted = average != self._norms_average
+        else:
+            drifted = abs(average - self._norms_average) > 0.02 * self._norms_average
+        if drifted:
+            k1, b = self.k1, self.b
+            self._norms = {
+                scheme_id: k1 * (1 - b + b * length / (average or 1)) for scheme_id, length in self._lengths.items()
+            }
+            self._norms_average = average
+        return self._norms
+
+    def _add(self, scheme):
+        terms = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in index_terms(scheme.get(field) or ''):
+                terms[term] += weight
+        scheme_id = scheme['id']
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[scheme_id] = tf
+        length = sum(terms.values())
+        self._terms[scheme_id] = terms
+        self._lengths[scheme_id] = length
+        self._total_length += length
+        if self._norms_average:
+            self._norms[scheme_id] = self.k1 * (1 - self.b + self.b * length / self._norms_average)
+        self._documents[scheme_id] = dict(scheme)
+
+    def _remove(self, scheme_id):
+        terms = self._terms.pop(scheme_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(scheme_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(scheme_id)
+        self._norms.pop(scheme_id, None)
+        del self._documents[scheme_id]
+
+
+def render_scheme(scheme):
+    return (
+        f"- {scheme['name']} ({scheme.get('category') or 'General'}, {scheme.get('location') or 'All India'}): "
+        f"{scheme.get('description') or ''} Eligibility: {scheme.get('eligibility') or 'n/a'}. "
+        f"How to apply: {scheme.get('application_process') or 'n/a'}. Contact: {scheme.get('contact_info') or 'n/a'}"
+    )
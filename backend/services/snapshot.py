@@ -0,0 +1,59 @@
+"""
+A computed JSON payload served from memory until it is invalidated or expires.
+
+``get()`` returns (payload, etag); the payload is rebuilt by one caller at a
+time while the others keep getting the previous snapshot. ``invalidate()``
+is cheap enough to call after every write. The TTL bounds staleness across
+worker processes, where another process's writes are not seen.
+"""
+import hashlib
+import json
+import threading
+import time
+
+
+class Snapshot:
+    def __init__(self, build_fn, ttl_seconds=60.0):
+        self._build_fn = build_fn
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._payload = None
+        self._etag = None
+        self._built_at = 0.0
+        self._built_version = -1
+        self._version = 0
+        self.builds = 0
+
+    def _fresh(self):
+        return (self._payload is not None and self._built_version == self._version
+                and time.monotonic() - self._built_at < self._ttl)
+
+    def get(self):
+        with self._lock:
+            if self._fresh():
+                return self._payload, self._etag
+            stale = self._payload, self._etag
+        # Someone else is rebuilding: serve the previous snapshot rather than wait
+        if not self._build_lock.acquire(blocking=stale[0] is None):
+            return stale
+        try:
+            with self._lock:
+                if self._fresh():
+                    return self._payload, self._etag
+                version = self._version
+            payload = self._build_fn()
+            etag = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:20]
+            with self._lock:
+                # A write that landed during the build leaves the snapshot stale for the next reader
+                self._payload, self._etag = payload, etag
+                self._built_at = time.monotonic()
+                self._built_version = version
+                self.builds += 1
+            return payload, etag
+        finally:
+            self._build_lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
@@ -0,0 +1,57 @@
+"""
+Per-table change counters for invalidating caches of derived data.
+
+``watch()`` hooks a Session class so that every committed ORM change
+(added, modified or deleted objects) and every INSERT/UPDATE/DELETE
+statement run through ``session.execute`` (bulk upserts, ``query.delete()``)
+on a watched table bumps that table's version. A cache stores the versions
+it was computed from and is stale once they differ. Versions are
+per-process: other workers' writes are only seen through a cache's TTL.
+"""
+import threading
+from itertools import chain
+
+from sqlalchemy import event
+
+
+class TableVersions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, *names):
+        with self._lock:
+            return tuple(self._versions.get(name, 0) for name in names)
+
+    def bump(self, *names):
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def watch(self, session_class, names):
+        names = frozenset(names)
+
+        def changed(session, table):
+            name = getattr(table, 'name', None)
+            if name in names:
+                session.info.setdefault('changed_tables', set()).add(name)
+
+        @event.listens_for(session_class, 'after_flush')
+        def track_flush(session, flush_context):
+            for obj in chain(session.new, session.dirty, session.deleted):
+                changed(session, getattr(obj, '__table__', None))
+
+        @event.listens_for(session_class, 'do_orm_execute')
+        def track_statement(state):
+            if state.is_insert or state.is_update or state.is_delete:
+                changed(state.session, getattr(state.statement, 'table', None))
+
+        @event.listens_for(session_class, 'after_commit')
+        def apply_changes(session):
+            tables = session.info.pop('changed_tables', None)
+            if tables:
+                self.bump(*tables)
+
+        @event.listens_for(session_class, 'after_rollback')
+        def discard_changes(session):
+            session.info.pop('changed_tables', None)
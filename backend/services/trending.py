@@ -0,0 +1,184 @@
+"""
+Incrementally maintained trending-posts ranking.
+
+Each post carries a time-decayed score: every event (create, like, comment)
+adds ``weight * 2 ** ((t - epoch) / half_life)``. Because all scores share
+the same epoch, comparing them is equivalent to comparing the decayed
+values at any later instant, so nothing has to be re-decayed as time passes;
+only the epoch is rebased once the exponent gets large.
+
+Scores are kept for posts younger than ``horizon`` and a bounded top-K map is
+maintained per category (plus one for all categories), so serving the
+trending tab is a dictionary lookup of an already sorted list.
+
+The index is per-process: events are recorded only by the worker that
+handled them, so other workers' activity is only seen after the next
+``load()`` from the DB, which the app repeats on a timer.
+"""
+import threading
+import time
+from datetime import timezone
+
+ALL_CATEGORIES = '__all__'
+REBASE_EXPONENT = 512
+
+
+def to_timestamp(dt):
+    """Naive UTC datetimes (as stored by the models) to epoch seconds"""
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TrendingIndex:
+    def __init__(self, half_life_hours=12, horizon_hours=72, top_k=100,
+                 post_weight=1.0, like_weight=1.0, comment_weight=2.0):
+        self.half_life = half_life_hours * 3600
+        self.horizon = horizon_hours * 3600
+        self.top_k = top_k
+        self.post_weight = post_weight
+        self.like_weight = like_weight
+        self.comment_weight = comment_weight
+        self._lock = threading.Lock()
+        self._epoch = time.time()
+        self._last_prune = self._epoch
+        self._scores = {}      # post_id -> growth-form score
+        self._posts = {}       # post_id -> (category, created_ts)
+        self._top = {}         # category -> {post_id: score}, at most top_k entries
+        self._stale = set()    # categories whose top-K must be recomputed from _scores
+        self._ranked = {}      # category -> cached [(post_id, score)] sorted best first
+        self._like_times = {}  # post_id -> {user_id: ts the like was credited at}, for likes recorded since load
+        self.loaded = False
+
+    # Events
+    def record_post(self, post_id, category, created_at):
+        self._record(post_id, category, created_at, self.post_weight, to_timestamp(created_at))
+
+    def record_like(self, post_id, category, created_at, liked, user_id=None, at=None):
+        """
+        A like is credited at the time it happens. An unlike takes back exactly
+        that credit: the growth at the time this index recorded the like, or at
+        the post's creation time, where load() credits likes read from the DB
+        """
+        at_ts = to_timestamp(at) if at is not None else time.time()
+        with self._lock:
+            if liked:
+                self._like_times.setdefault(post_id, {})[user_id] = at_ts
+            else:
+                at_ts = self._like_times.get(post_id, {}).pop(user_id, None) or to_timestamp(created_at)
+        weight = self.like_weight if liked else -self.like_weight
+        self._record(post_id, category, created_at, weight, at_ts)
+
+    def record_comment(self, post_id, category, created_at, at=None):
+        self._record(post_id, category, created_at, self.comment_weight, to_timestamp(at) if at is not None else None)
+
+    def remove(self, post_id):
+        with self._lock:
+            self._scores.pop(post_id, None)
+            self._like_times.pop(post_id, None)
+            category, _ = self._posts.pop(post_id, (None, None))
+            for key in (category, ALL_CATEGORIES):
+                if self._top.get(key, {}).pop(post_id, None) is not None:
+                    self._stale.add(key)
+                    self._ranked.pop(key, None)
+
+    def load(self, events):
+        """Rebuild from (post_id, category, created_ts, weight, at_ts) tuples, e.g. read from the DB on startup"""
+        with self._lock:
+            self._scores, self._posts, self._top, self._ranked, self._like_times = {}, {}, {}, {}, {}
+            self._stale = set()
+            self._epoch = time.time()
+            cutoff = self._epoch - self.horizon
+            for post_id, category, created_ts, weight, at_ts in events:
+                if created_ts < cutoff:
+                    continue
+                self._posts[post_id] = (category, created_ts)
+                self._scores[post_id] = self._scores.get(post_id, 0.0) + self._growth(weight, at_ts)
+            categories = {category for category, _ in self._posts.values()}
+            self._stale = categories | {ALL_CATEGORIES}
+            self.loaded = True
+
+    # Reads
+    def top(self, category=None, limit=20):
+        """[(post_id, current decayed score)] best first"""
+        key = category or ALL_CATEGORIES
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune > 600:
+                self._prune(now)
+            ranked = self._ranked.get(key)
+            if ranked is None:
+                if key in self._stale:
+                    self._rebuild_top(key)
+                top = self._top.get(key, {})
+                ranked = sorted(top.items(), key=lambda item: item[1], reverse=True)
+                self._ranked[key] = ranked
+            decay = 2 ** ((now - self._epoch) / self.half_life)
+        return [(post_id, score / decay) for post_id, score in ranked[:limit]]
+
+    # Internals (callers hold self._lock)
+    def _growth(self, weight, at_ts):
+        return weight * 2 ** ((at_ts - self._epoch) / self.half_life)
+
+    def _record(self, post_id, category, created_at, weight, at_ts):
+        created_ts = to_timestamp(created_at)
+        if at_ts is None:
+            at_ts = time.time()
+        with self._lock:
+            if created_ts < time.time() - self.horizon:
+                return
+            if (at_ts - self._epoch) / self.half_life > REBASE_EXPONENT:
+                self._rebase(at_ts)
+            self._posts[post_id] = (category, created_ts)
+            score = self._scores.get(post_id, 0.0) + self._growth(weight, at_ts)
+            self._scores[post_id] = score
+            for key in (category, ALL_CATEGORIES):
+                self._offer(key, post_id, score, decreased=weight < 0)
+
+    def _offer(self, key, post_id, score, decreased):
+        self._ranked.pop(key, None)
+        if key in self._stale:
+            return
+        top = self._top.setdefault(key, {})
+        if post_id in top:
+            top[post_id] = score
+            if decreased:
+                # A member dropped: someone outside the top-K may now outrank it
+                self._stale.add(key)
+            return
+        if len(top) < self.top_k:
+            top[post_id] = score
+            return
+        floor_id = min(top, key=top.get)
+        if score > top[floor_id]:
+            del top[floor_id]
+            top[post_id] = score
+
+    def _rebuild_top(self, key):
+        members = (
+            (post_id, score) for post_id, score in self._scores.items()
+            if key == ALL_CATEGORIES or self._posts[post_id][0] == key
+        )
+        self._top[key] = dict(sorted(members, key=lambda item: item[1], reverse=True)[:self.top_k])
+        self._stale.discard(key)
+
+    def _rebase(self, now):
+        factor = 2 ** ((now - self._epoch) / self.half_life)
+        self._epoch = now
+        self._scores = {post_id: score / factor for post_id, score in self._scores.items()}
+        for top in self._top.values():
+            for post_id in top:
+                top[post_id] /= factor
+        self._ranked = {}
+
+    def _prune(self, now):
+        self._last_prune = now
+        cutoff = now - self.horizon
+        expired = [post_id for post_id, (_, created_ts) in self._posts.items() if created_ts < cutoff]
+        for post_id in expired:
+            category, _ = self._posts.pop(post_id)
+            self._scores.pop(post_id, None)
+            self._like_times.pop(post_id, None)
+            for key in (category, ALL_CATEGORIES):
+                if self._top.get(key, {}).pop(post_id, None) is not None:
+                    self._stale.add(key)
+        if expired:
+            self._ranked = {}
@@ -0,0 +1,34 @@
+"""
+Dialect-aware INSERT ... ON CONFLICT helpers (SQLite and Postgres both support it).
+"""
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(bind, table):
+    """Return an ``insert()`` for ``table`` that exposes ``on_conflict_do_*`` for the bound dialect"""
+    if bind.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def insert_ignore(bind, table, conflict_columns):
+    """INSERT that silently skips rows violating the unique key on ``conflict_columns``"""
+    return dialect_insert(bind, table).on_conflict_do_nothing(index_elements=conflict_columns)
+
+
+def upsert(bind, table, conflict_columns, update_columns):
+    """INSERT that overwrites ``update_columns`` with the new values when the unique key already exists"""
+    stmt = dialect_insert(bind, table)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={column: stmt.excluded[column] for column in update_columns},
+    )
+
+
+def upsert_increment(bind, table, conflict_columns, increment_columns):
+    """INSERT that adds the new values to ``increment_columns`` when the unique key already exists"""
+    stmt = dialect_insert(bind, table)
+    return stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={column: table.c[column] + stmt.excluded[column] for column in increment_columns},
+    )
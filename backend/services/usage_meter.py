@@ -0,0 +1,141 @@
+"""
+Per-subject LLM token accounting with daily quotas.
+
+Usage is added to in-memory counters on every LLM call and written to the
+database in batches by a background thread (one increment-upsert per
+subject/endpoint/day per flush). Quota checks read the subject's persisted
+total for the day, cached for ``refresh`` seconds, plus whatever is still
+buffered, so rejecting an over-quota request costs a dictionary lookup.
+
+Subjects are opaque strings such as ``user:42`` or ``ip:203.0.113.7``; days
+are UTC dates.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def utc_today():
+    return datetime.now(timezone.utc).date()
+
+
+def seconds_until_utc_midnight():
+    now = datetime.now(timezone.utc)
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+class UsageMeter:
+    def __init__(self, flush_fn, load_fn, interval=15.0, refresh=60.0):
+        """
+        ``flush_fn(rows)`` persists a list of dicts (subject, endpoint, day,
+        prompt_tokens, completion_tokens, requests) as increments, raising on
+        failure. ``load_fn(subject, day)`` returns the persisted token total.
+        """
+        self._flush_fn = flush_fn
+        self._load_fn = load_fn
+        self._interval = interval
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        # (subject, endpoint, day) -> [prompt_tokens, completion_tokens, requests]
+        self._pending = {}
+        self._inflight = {}
+        # (subject, day) -> tokens in _pending and _inflight, so quota checks need not scan them
+        self._buffered_tokens = {}
+        # (subject, day) -> (loaded_at, persisted tokens)
+        self._persisted = {}
+
+    def record(self, subject, endpoint, prompt_tokens, completion_tokens, day=None):
+        key = (subject, endpoint, day or utc_today())
+        with self._lock:
+            counters = self._pending.setdefault(key, [0, 0, 0])
+            counters[0] += prompt_tokens
+            counters[1] += completion_tokens
+            counters[2] += 1
+            buffered_key = (subject, key[2])
+            self._buffered_tokens[buffered_key] = (
+                self._buffered_tokens.get(buffered_key, 0) + prompt_tokens + completion_tokens
+            )
+        self._ensure_started()
+
+    def used_today(self, subject):
+        """Tokens used by ``subject`` today, persisted plus buffered"""
+        day = utc_today()
+        with self._lock:
+            cached = self._persisted.get((subject, day))
+        if cached is None or time.monotonic() - cached[0] > self._refresh:
+            cached = (time.monotonic(), self._load_fn(subject, day) or 0)
+            with self._lock:
+                self._persisted[(subject, day)] = cached
+        with self._lock:
+            return cached[1] + self._buffered_tokens.get((subject, day), 0)
+
+    def flush(self):
+        """Persist buffered counters; safe to call from any thread"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._inflight, self._pending = self._pending, {}
+                rows = [
+                    {'subject': subject, 'endpoint': endpoint, 'day': day,
+                     'prompt_tokens': counters[0], 'completion_tokens': counters[1], 'requests': counters[2]}
+                    for (subject, endpoint, day), counters in self._inflight.items()
+                ]
+
+            try:
+                self._flush_fn(rows)
+            except Exception as e:
+                print(f"Usage flush error: {e}")
+                with self._lock:
+                    for key, counters in self._inflight.items():
+                        pending = self._pending.setdefault(key, [0, 0, 0])
+                        for i in range(3):
+                            pending[i] += counters[i]
+                    self._inflight = {}
+                return 0
+
+            with self._lock:
+                # Fold what was written into the cached persisted totals, so quota checks
+                # stay exact without reloading from the database
+                for (subject, _, day), counters in self._inflight.items():
+                    tokens = counters[0] + counters[1]
+                    remaining = self._buffered_tokens.get((subject, day), 0) - tokens
+                    if remaining > 0:
+                        self._buffered_tokens[(subject, day)] = remaining
+                    else:
+                        self._buffered_tokens.pop((subject, day), None)
+                    cached = self._persisted.get((subject, day))
+                    if cached is not None:
+                        self._persisted[(subject, day)] = (cached[0], cached[1] + tokens)
+                self._inflight = {}
+                today = utc_today()
+                self._persisted = {key: value for key, value in self._persisted.items() if key[1] >= today}
+            return len(rows)
+
+    def _ensure_started(self):
+        # Started lazily so the thread lives in the serving process, not a pre-fork parent
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='usage-meter-flush', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def stop(self):
+        """Stop the flush thread and write what is buffered, e.g. before the database goes away"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+        atexit.unregister(self.flush)
+        self.flush()
+
+    def _run(self):
+        while not self._stopping.wait(self._interval):
+            self.flush()
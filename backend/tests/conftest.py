@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time: point it at a throwaway
+# database and the deterministic stub LLM before it is imported
+_tmpdir = tempfile.mkdtemp(prefix='her-voice-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'test.db')
+os.environ['CHATBOT_LLM'] = 'fake'
+os.environ['LLM_PROVIDERS'] = 'stub'
+os.environ['LLM_STUB_LATENCY_MS'] = '0'
+os.environ['INTENT_LOG_PATH'] = ''
+os.environ.setdefault('TWILIO_ACCOUNT_SID', 'AC' + '0' * 32)
+os.environ.setdefault('TWILIO_AUTH_TOKEN', 'test')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as appmod  # noqa: E402
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    appmod.app.config['TESTING'] = True
+    with appmod.app.app_context():
+        appmod.db.drop_all()
+        appmod.db.create_all()
+    yield appmod.app
+    with appmod.app.app_context():
+        appmod.db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    with app.app_context():
+        user = appmod.User(username='tester', email='tester@example.com', password_hash='x', is_verified=True)
+        appmod.db.session.add(user)
+        appmod.db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def auth_headers(app, user):
+    with app.app_context():
+        return {'Authorization': 'Bearer ' + create_access_token(identity=user)}
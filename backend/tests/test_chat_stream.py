@@ -0,0 +1,83 @@
+"""Server-Sent Events relay of chatbot responses, against the stub LLM provider"""
+import json
+
+import app as appmod
+from services.chat_stream import FAKE_RESPONSE, sse_event
+
+
+def parse_events(body):
+    """[(event, data)] from an SSE body; event is None for unnamed frames"""
+    events = []
+    for frame in body.split('\n\n'):
+        if not frame:
+            continue
+        event = None
+        data = None
+        for line in frame.split('\n'):
+            field, _, value = line.partition(': ')
+            if field == 'event':
+                event = value
+            elif field == 'data':
+                data = json.loads(value)
+        events.append((event, data))
+    return events
+
+
+def chat_messages(app):
+    with app.app_context():
+        return appmod.ChatMessage.query.order_by(appmod.ChatMessage.id).all()
+
+
+def test_sse_event_framing():
+    assert sse_event({'token': 'hi'}) == 'data: {"token": "hi"}\n\n'
+    assert sse_event({'id': 1}, event='done') == 'event: done\ndata: {"id": 1}\n\n'
+
+
+def test_stream_relays_tokens_and_persists_reply(app, client, auth_headers):
+    response = client.post('/api/chatbot/query', json={'message': 'What is the helpline?', 'stream': True},
+                           headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    body = response.get_data(as_text=True)
+    assert body.endswith('\n\n')
+    events = parse_events(body)
+
+    tokens = [data['token'] for event, data in events[:-1]]
+    assert all(event is None for event, _ in events[:-1])
+    reply = ''.join(tokens)
+    assert reply.startswith('You asked: What is the helpline?.')
+    assert reply.endswith(FAKE_RESPONSE.split(' ')[-1])
+
+    event, done = events[-1]
+    assert event == 'done'
+    saved = chat_messages(app)
+    assert len(saved) == 1
+    assert done == {'id': saved[0].id, 'thread_id': saved[0].thread_id}
+    assert saved[0].message == 'What is the helpline?'
+    assert saved[0].response == reply
+
+
+def test_stream_accept_header_selects_sse(app, client, auth_headers):
+    headers = dict(auth_headers, Accept='text/event-stream')
+    response = client.post('/api/chatbot/query', json={'message': 'Where can I get legal aid?'}, headers=headers)
+
+    assert response.mimetype == 'text/event-stream'
+    assert parse_events(response.get_data(as_text=True))[-1][0] == 'done'
+
+
+def test_disconnect_stops_stream_and_keeps_partial_reply(app, client, auth_headers):
+    response = client.post('/api/chatbot/query', json={'message': 'How do I file a complaint?', 'stream': True},
+                           headers=auth_headers, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks)
+    first = first.decode() if isinstance(first, bytes) else first
+    response.close()  # what the WSGI server does when the client goes away
+
+    event, data = parse_events(first)[0]
+    assert event is None
+    saved = chat_messages(app)
+    assert len(saved) == 1
+    assert saved[0].response == data['token']
+    assert len(saved[0].response) < len(FAKE_RESPONSE)